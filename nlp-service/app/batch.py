@@ -0,0 +1,328 @@
+"""
+Riassunto offline di interi corpora di documenti, senza passare dal server HTTP.
+
+Estrazione e pulizia avvengono in un pool di processi; i chunk di più documenti
+vengono raccolti in batch pieni per il modello. I risultati sono scritti man mano
+in un file JSONL, che fa anche da checkpoint: rilanciando lo stesso comando i
+documenti già riassunti vengono saltati, quelli falliti ritentati (per ogni id
+vale l'ultima riga dell'output).
+
+Utilizzo (dalla cartella nlp-service):
+    python app/batch.py archivio/ riassunti.jsonl
+    python app/batch.py documenti.jsonl riassunti.jsonl --workers 8 --batch-size 16
+    python app/batch.py archivio/ riassunti.jsonl --replicas 4
+
+L'input può essere una cartella (file PDF, DOCX, HTML, TXT, anche in sottocartelle)
+oppure un file JSONL con un oggetto {"id": ..., "text": ...} per riga.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from itertools import groupby
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from cleaning import clean_text_and_acronyms
+from dedup import PageDeduplicator, deduplicate_text
+from extractor import detect_format, iter_text, prefer_backends
+from replicas import create_replica_scheduler, replica_split
+import config
+
+
+# Backend di estrazione scelti da configurazione (vale anche nei processi del pool)
+prefer_backends(config.EXTRACTOR_BACKENDS)
+
+
+# Documento da preparare: (id, percorso del file oppure None, testo oppure None)
+_Source = Tuple[str, Optional[str], Optional[str]]
+
+
+def iter_sources(input_path: str) -> Iterator[_Source]:
+    """
+    Documenti in ingresso da una cartella (un documento per file) o da un file JSONL.
+    """
+    path = Path(input_path)
+    if path.is_dir():
+        for file in sorted(p for p in path.rglob("*") if p.is_file()):
+            if detect_format(file.name) is not None:
+                yield file.relative_to(path).as_posix(), str(file), None
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield str(record.get("id", line_number)), None, record["text"]
+
+
+def prepare_document(source: _Source) -> Tuple[str, str, FrozenSet[str], int, Optional[str]]:
+    """
+    Estrazione, deduplicazione e pulizia di un documento, eseguita nei processi del pool.
+
+    Returns:
+        Id, testo pulito, acronimi, lunghezza del testo estratto, eventuale errore
+    """
+    doc_id, file_path, text = source
+    try:
+        # Documenti impaginati: NLP_DEDUP; testi semplici (JSONL, TXT): NLP_DEDUP_TEXT
+        dedup = config.DEDUP_TEXT_ENABLED
+        if file_path is not None:
+            fmt = detect_format(file_path)
+            if fmt != "txt":
+                dedup = config.DEDUP_ENABLED
+            with open(file_path, "rb") as f:
+                text = "\n\n".join(iter_text(fmt, f))
+        original_length = len(text)
+        if dedup:
+            text, _ = deduplicate_text(text, PageDeduplicator(config.DEDUP_SIMILARITY, config.DEDUP_MIN_CHARS))
+        cleaned_text, acronyms = clean_text_and_acronyms(text)
+        return doc_id, cleaned_text, acronyms, original_length, None
+    except Exception as e:
+        return doc_id, "", frozenset(), 0, f"Errore nella preparazione: {e}"
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """
+    Id dei documenti già riassunti nell'output; quelli con un errore vengono
+    ritentati. Un'ultima riga incompleta (interruzione durante la scrittura)
+    viene rimossa.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                doc_id = record["id"]
+            except (ValueError, KeyError):
+                break
+            if "error" in record:
+                done.discard(doc_id)
+            else:
+                done.add(doc_id)
+            valid_bytes += len(line)
+
+    if valid_bytes < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+class CorpusSummarizer:
+    """
+    Raccoglie i chunk di più documenti e li riassume in batch pieni,
+    scrivendo ogni documento nell'output appena tutti i suoi chunk sono pronti.
+    Con un pool di repliche (`scheduler`) i chunk vengono eseguiti in parallelo.
+    """
+
+    def __init__(
+        self, summarizer, output, batch_size: int, max_length: int, min_length: int, profile: str, scheduler=None
+    ):
+        self.summarizer = summarizer
+        self.scheduler = scheduler
+        # Chunk riassunti per volta: più micro-batch, per ogni replica
+        self.group_size = batch_size * 4 * (len(scheduler.replicas) if scheduler is not None else 1)
+        self.output = output
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.min_length = min_length
+        self.profile = profile
+
+        # Chunk in attesa: (id documento, indice del chunk, chunk, acronimi)
+        self._pending: List[Tuple[str, int, object, FrozenSet[str]]] = []
+        # Documenti incompleti: id -> [riassunti dei chunk, chunk mancanti, lunghezza originale]
+        self._documents: Dict[str, list] = {}
+        self.completed = 0
+        self.failed = 0
+
+
+    def add(self, doc_id: str, cleaned_text: str, acronyms: FrozenSet[str], original_length: int):
+        """
+        Aggiunge un documento preparato; esegue un batch se ci sono abbastanza chunk.
+        """
+        chunks = self.summarizer.chunk(cleaned_text, overlap=config.CHUNK_OVERLAP_TOKENS)
+        if not chunks:
+            self._write({"id": doc_id, "summary": "", "original_length": original_length, "summary_length": 0})
+            return
+
+        self._documents[doc_id] = [[None] * len(chunks), len(chunks), original_length]
+        self._pending.extend((doc_id, i, chunk, acronyms) for i, chunk in enumerate(chunks))
+
+        # Più micro-batch alla volta: summarize_batch ordina per lunghezza e riduce il padding
+        while len(self._pending) >= self.group_size:
+            self._run(self._pending[:self.group_size])
+            del self._pending[:self.group_size]
+
+
+    def fail(self, doc_id: str, error: str):
+        self._write({"id": doc_id, "error": error})
+        self.failed += 1
+
+
+    def flush(self):
+        """
+        Riassume i chunk rimasti in attesa.
+        """
+        if self._pending:
+            self._run(self._pending)
+            self._pending = []
+
+
+    def _run(self, items: List[Tuple[str, int, object, FrozenSet[str]]]):
+        if self.scheduler is not None:
+            summaries = self._run_replicas(items)
+        else:
+            summaries = self.summarizer.summarize_batch(
+                [chunk.text for _, _, chunk, _ in items],
+                max_length=self.max_length,
+                min_length=self.min_length,
+                batch_size=self.batch_size,
+                token_ids=[chunk.input_ids for _, _, chunk, _ in items],
+                profile=self.profile,
+                acronyms=[acronyms for _, _, _, acronyms in items]
+            )
+
+        for (doc_id, index, _, _), summary in zip(items, summaries):
+            document = self._documents[doc_id]
+            document[0][index] = summary
+            document[1] -= 1
+            if document[1] == 0:
+                del self._documents[doc_id]
+                final_summary = " ".join(document[0])
+                self._write({
+                    "id": doc_id,
+                    "summary": final_summary,
+                    "original_length": document[2],
+                    "summary_length": len(final_summary)
+                })
+
+
+    def _run_replicas(self, items: List[Tuple[str, int, object, FrozenSet[str]]]) -> List[str]:
+        """
+        Distribuisce i chunk (di tutti i documenti) tra le repliche e ne attende i riassunti.
+        """
+        futures = []
+        # Un invio per documento: gli acronimi sono quelli del documento
+        for _, group in groupby(items, key=lambda item: item[0]):
+            group = list(group)
+            futures.extend(self.scheduler.submit(
+                [chunk.text for _, _, chunk, _ in group],
+                max_length=self.max_length,
+                min_length=self.min_length,
+                token_ids=[chunk.input_ids for _, _, chunk, _ in group],
+                profile=self.profile,
+                acronyms=group[0][3]
+            ))
+        return [future.result() for future in futures]
+
+
+    def _write(self, record: dict):
+        # Una riga completa per documento, subito su disco: è anche il checkpoint
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
+        if "error" not in record:
+            self.completed += 1
+
+
+def run(args):
+    done = load_checkpoint(args.output)
+    sources = (source for source in iter_sources(args.input) if source[0] not in done)
+    if done:
+        print(f"Ripresa dal checkpoint: {len(done)} documenti già riassunti")
+
+    # I processi del pool nascono al primo submit, quando modello e thread delle
+    # repliche esistono già: niente fork, che ne copierebbe lock e stato
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context(method))
+
+    from summarizer import Summarizer
+    summarizer = Summarizer(
+        args.model,
+        num_threads=config.TORCH_NUM_THREADS,
+        backend=config.MODEL_BACKEND,
+        onnx_dir=config.ONNX_DIR or None,
+        snapshot_dir=config.MODEL_SNAPSHOT_DIR or None
+    )
+
+    # Pool di repliche con i core partizionati (0 = split dalla calibrazione)
+    scheduler = None
+    replicas, threads = replica_split(
+        summarizer, args.replicas, args.replica_threads, config.REPLICA_TUNING_PATH,
+        max_batch_size=args.batch_size, pin_cores=config.PIN_WORKERS
+    )
+    if replicas > 1:
+        scheduler = create_replica_scheduler(
+            summarizer, replicas, threads, pin_cores=config.PIN_WORKERS,
+            max_batch_size=args.batch_size, max_wait_ms=config.SCHEDULER_MAX_WAIT_MS, max_queue_size=0
+        )
+        print(f"{replicas} repliche del modello, core: {[replica.cores for replica in scheduler.replicas]}")
+
+    started = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as output:
+        corpus = CorpusSummarizer(
+            summarizer, output, args.batch_size, args.max_length, args.min_length, args.profile, scheduler
+        )
+
+        # Finestra limitata di documenti in preparazione: la memoria resta costante
+        in_flight = set()
+        exhausted = False
+        while not exhausted or in_flight:
+            while not exhausted and len(in_flight) < args.workers * 4:
+                source = next(sources, None)
+                if source is None:
+                    exhausted = True
+                else:
+                    in_flight.add(pool.submit(prepare_document, source))
+            if not in_flight:
+                break
+
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                doc_id, cleaned_text, acronyms, original_length, error = future.result()
+                if error is not None:
+                    corpus.fail(doc_id, error)
+                else:
+                    corpus.add(doc_id, cleaned_text, acronyms, original_length)
+
+            total = corpus.completed + corpus.failed
+            if total and total % 100 == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{total} documenti ({corpus.completed / elapsed * 3600:.0f} documenti/ora)")
+
+        corpus.flush()
+
+    pool.shutdown()
+    if scheduler is not None:
+        scheduler.shutdown()
+    elapsed = time.perf_counter() - started
+    rate = corpus.completed / elapsed * 3600 if elapsed else 0.0
+    print(f"✓ {corpus.completed} documenti riassunti, {corpus.failed} errori in {elapsed:.1f}s ({rate:.0f} documenti/ora)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Riassunto offline di un corpus di documenti")
+    parser.add_argument("input", help="Cartella di documenti oppure file JSONL con id e text")
+    parser.add_argument("output", help="File JSONL dei risultati (e checkpoint)")
+    parser.add_argument("--model", default=config.MODEL_NAME)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processi per estrazione e pulizia")
+    parser.add_argument("--batch-size", type=int, default=config.SCHEDULER_MAX_BATCH_SIZE)
+    parser.add_argument("--max-length", type=int, default=150)
+    parser.add_argument("--min-length", type=int, default=50)
+    parser.add_argument("--profile", default="quality", choices=["fast", "balanced", "quality"])
+    parser.add_argument("--replicas", type=int, default=config.REPLICAS,
+                        help="Repliche del modello, ognuna sui propri core (0 = split dalla calibrazione)")
+    parser.add_argument("--replica-threads", type=int, default=config.REPLICA_THREADS,
+                        help="Core e thread torch per replica (0 = core disponibili / repliche)")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Cache dei riassunti indirizzata per contenuto.
+Livello in memoria (LRU limitato in byte) con livello persistente opzionale su SQLite.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+
+def make_cache_key(level: str, text: str, model_name: str, params: Dict) -> str:
+    """
+    Calcola la chiave di cache per un testo e i parametri di generazione.
+
+    Args:
+        level: Livello della cache ("doc" per il documento intero, "chunk" per il singolo chunk)
+        text: Testo pulito (documento o chunk)
+        model_name: Nome del modello usato per il riassunto
+        params: Parametri di generazione (max_length, min_length, num_beams, ...)
+
+    Returns:
+        Digest SHA-256 esadecimale
+    """
+    hasher = hashlib.sha256()
+    header = json.dumps([level, model_name, params], sort_keys=True, ensure_ascii=False)
+    hasher.update(header.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(text.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class SummaryCache:
+    """
+    Cache LRU dei riassunti con limite in byte e livello SQLite opzionale.
+
+    Il livello in memoria è consultato per primo; in caso di miss si prova il
+    livello persistente e il valore trovato viene promosso in memoria.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, db_path: Optional[str] = None):
+        """
+        Inizializza la cache.
+
+        Args:
+            max_bytes: Dimensione massima (in byte) dei valori tenuti in memoria
+            db_path: Percorso del database SQLite persistente (None = solo memoria)
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+        self._evictions = 0
+
+        # La connessione SQLite viene aperta al primo uso e riaperta nei processi
+        # figli dopo un fork (una connessione non va condivisa tra processi)
+        self.db_path = db_path
+        self._db = None
+        self._db_pid = None
+
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """
+        Restituisce la connessione al livello persistente del processo corrente.
+        """
+        if not self.db_path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key) + len(value.encode("utf-8"))
+
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Restituisce il riassunto associato alla chiave, se presente.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits["memory"] += 1
+                return value
+
+            db = self._connection()
+            if db is not None:
+                row = db.execute(
+                    "SELECT summary FROM summaries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._hits["disk"] += 1
+                    self._store_in_memory(key, row[0])
+                    return row[0]
+
+            self._misses += 1
+            return None
+
+
+    def put(self, key: str, value: str):
+        """
+        Memorizza un riassunto in memoria e, se configurato, su disco.
+        """
+        with self._lock:
+            self._store_in_memory(key, value)
+
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)", (key, value)
+                )
+                db.commit()
+
+
+    def _store_in_memory(self, key: str, value: str):
+        """
+        Inserisce una voce nel livello LRU ed espelle le meno recenti oltre il limite.
+        """
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= self._entry_size(key, previous)
+
+        self._entries[key] = value
+        self._size += size
+
+        while self._size > self.max_bytes:
+            old_key, old_value = self._entries.popitem(last=False)
+            self._size -= self._entry_size(old_key, old_value)
+            self._evictions += 1
+
+
+    def stats(self) -> dict:
+        """
+        Restituisce statistiche di utilizzo della cache.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "memory_hits": self._hits["memory"],
+                "disk_hits": self._hits["disk"],
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "persistent": bool(self.db_path)
+            }
+
+
+    def close(self):
+        """
+        Chiude il livello persistente.
+        """
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+            self.db_path = None
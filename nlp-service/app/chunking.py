@@ -1,8 +1,54 @@
 """
 Gestione dello chunking del testo per rispettare il limite di token di BART (~1024).
 """
-from typing import List
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterator, List, Optional, Tuple
 import re
+import zlib
+
+
+# Fine frase candidata: parola, terminatori, eventuali virgolette/parentesi di chiusura e spazi
+_SENTENCE_END_RE = re.compile(r'(?<!\S)(\S*?)([.!?…]+[\'"»”’)\]]*)\s+')
+_NON_SPACE_RE = re.compile(r'\S')
+
+# Abbreviazioni (minuscole, senza punto finale) dopo le quali il punto non chiude la frase
+ITALIAN_ABBREVIATIONS = frozenset({
+    # Titoli
+    "sig", "sigg", "sig.ra", "sig.na", "dott", "dott.ssa", "dr", "prof", "prof.ssa",
+    "ing", "avv", "arch", "geom", "rag", "on", "mons", "gen", "col", "sen", "egr", "gent",
+    "mr", "mrs", "ms", "st",
+    # Riferimenti a testi e documenti
+    "art", "artt", "pag", "pagg", "p", "pp", "cap", "capp", "par", "cfr", "vol", "voll",
+    "fig", "figg", "tab", "all", "lett", "co", "comma", "n", "nn", "nr", "num", "rif",
+    "op", "cit", "ibid", "ed", "cod", "reg", "sez", "tit",
+    # Norme
+    "d.lgs", "d.l", "d.p.r", "dpr", "l", "r.d", "g.u",
+    # Varie
+    "es", "ca", "c.a", "tel", "fax", "ecc", "etc", "ss", "seg", "segg", "vs", "min",
+    "max", "sec", "spett", "c.so", "v.le", "p.za", "e.g", "i.e", "s.p.a", "s.r.l"
+})
+
+# Abbreviazioni che possono anche chiudere una frase: fine frase solo se segue una maiuscola
+_SENTENCE_FINAL_ABBREVIATIONS = frozenset({"ecc", "etc", "ss", "segg"})
+
+
+@dataclass
+class TokenChunk:
+    """
+    Chunk prodotto dal chunking basato sul tokenizer.
+    
+    Attributes:
+        text: Testo del chunk (porzione del documento originale)
+        input_ids: Token del chunk, senza token speciali (None se non calcolati)
+        start: Offset (in caratteri) di inizio nel documento
+        end: Offset (in caratteri) di fine nel documento
+    """
+    text: str
+    input_ids: Optional[List[int]]
+    start: int
+    end: int
 
 
 def chunk_text(
@@ -36,119 +82,381 @@ def chunk_text(
         # Il testo è abbastanza corto, restituisce un singolo chunk
         return [text]
     
-    chunks = []
+    return list(iter_chunk_text(text, max_chars, overlap_chars, preserve_sentences))
+
+
+def iter_chunk_text(
+    text: str,
+    max_chars: int,
+    overlap_chars: int,
+    preserve_sentences: bool = True
+) -> Iterator[str]:
+    """
+    Versione lazy del chunking per caratteri: ogni chunk viene restituito appena
+    pronto, così l'elaborazione a valle può iniziare prima della fine del testo.
     
+    Args:
+        text: Testo da dividere
+        max_chars: Numero massimo di caratteri per chunk
+        overlap_chars: Caratteri di sovrapposizione tra chunk consecutivi
+        preserve_sentences: Se True, cerca di non spezzare le frasi
+        
+    Yields:
+        Chunk di testo
+    """
     if preserve_sentences:
         # Divide per frasi
-        sentences = split_into_sentences(text)
-        chunks = _chunk_by_sentences(sentences, max_chars, overlap_chars)
+        spans = _iter_sentence_chunk_spans(text, max_chars, overlap_chars)
     else:
         # Divide per caratteri con overlap
-        chunks = _chunk_by_chars(text, max_chars, overlap_chars)
+        spans = _iter_char_spans(text, 0, len(text), max_chars, overlap_chars)
+    
+    for start, end in spans:
+        yield text[start:end]
+
+
+def chunk_by_tokens(
+    text: str,
+    tokenizer,
+    max_tokens: int,
+    overlap: int = 32
+) -> List[TokenChunk]:
+    """
+    Divide il testo in chunk usando il tokenizer reale del modello.
+    
+    Il documento viene tokenizzato una sola volta (tokenizer "fast" con offset):
+    ogni chunk contiene al più `max_tokens` token e termina, quando possibile,
+    alla fine di una frase. I token di ogni chunk vengono restituiti insieme al
+    testo, così il Summarizer non deve ritokenizzarlo.
+    
+    Args:
+        text: Testo da dividere
+        tokenizer: Tokenizer Hugging Face "fast" (supporta return_offsets_mapping)
+        max_tokens: Numero massimo di token per chunk (esclusi i token speciali)
+        overlap: Numero di token di sovrapposizione tra chunk consecutivi
+        
+    Returns:
+        Lista di TokenChunk
+    """
+    if not text or not text.strip():
+        return []
+    
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    ids = encoding["input_ids"]
+    offsets = encoding["offset_mapping"]
+    n_tokens = len(ids)
+    if n_tokens == 0:
+        return []
+    
+    # Confini di frase espressi come indice del primo token della frase successiva
+    token_starts = [start for start, _ in offsets]
+    boundaries = sorted({
+        bisect_left(token_starts, start)
+        for start, _ in iter_sentence_spans(text)
+    } - {0, n_tokens})
+    
+    max_tokens = max(1, max_tokens)
+    overlap = max(0, min(overlap, max_tokens - 1))
+    
+    chunks = []
+    start = 0
+    while start < n_tokens:
+        limit = start + max_tokens
+        if limit >= n_tokens:
+            end = n_tokens
+        else:
+            # Ultimo confine di frase che rientra nel limite, altrimenti taglio netto
+            i = bisect_right(boundaries, limit) - 1
+            end = boundaries[i] if i >= 0 and boundaries[i] > start else limit
+        
+        chunks.append(_make_token_chunk(text, ids, offsets, start, end))
+        if end >= n_tokens:
+            break
+        
+        # Il chunk successivo riparte dalla prima frase che rientra nell'overlap
+        next_start = end - overlap
+        i = bisect_left(boundaries, next_start)
+        if i < len(boundaries) and boundaries[i] < end:
+            next_start = boundaries[i]
+        start = max(next_start, start + 1)
     
     return chunks
 
 
+def chunk_by_content(
+    text: str,
+    tokenizer,
+    max_tokens: int,
+    overlap: int = 32,
+    target_tokens: Optional[int] = None
+) -> List[TokenChunk]:
+    """
+    Variante di chunk_by_tokens con confini definiti dal contenuto.
+    
+    Ogni fine frase è un confine "di contenuto" se l'hash della frase stessa
+    soddisfa una condizione, con probabilità proporzionale alla sua lunghezza
+    (in media un confine ogni `target_tokens` token). La scelta dipende solo
+    dalla frase, non dalla sua posizione: dopo un'inserzione o una cancellazione
+    i confini successivi restano gli stessi, e così i chunk e i loro riassunti.
+    Se nessun confine di contenuto rientra nel limite si taglia come in
+    chunk_by_tokens, e i confini si riallineano al primo confine di contenuto.
+    
+    Args:
+        text: Testo da dividere
+        tokenizer: Tokenizer Hugging Face "fast" (supporta return_offsets_mapping)
+        max_tokens: Numero massimo di token per chunk (esclusi i token speciali)
+        overlap: Numero di token di sovrapposizione tra chunk consecutivi
+        target_tokens: Dimensione media desiderata dei chunk (default: 2/3 di max_tokens)
+        
+    Returns:
+        Lista di TokenChunk
+    """
+    if not text or not text.strip():
+        return []
+    
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    ids = encoding["input_ids"]
+    offsets = encoding["offset_mapping"]
+    n_tokens = len(ids)
+    if n_tokens == 0:
+        return []
+    
+    max_tokens = max(1, max_tokens)
+    overlap = max(0, min(overlap, max_tokens - 1))
+    target_tokens = max(1, target_tokens or max_tokens * 2 // 3)
+    # Chunk minimo tra due confini di contenuto, per evitare chunk di una frase breve
+    min_tokens = target_tokens // 4
+    
+    # Confini di frase (primo token della frase successiva); un confine è anche
+    # di contenuto se lo decide l'hash della frase che lo precede
+    token_starts = [start for start, _ in offsets]
+    boundaries = []
+    content_cuts = []
+    previous_boundary = 0
+    previous_span = None
+    for start, end in iter_sentence_spans(text):
+        boundary = bisect_left(token_starts, start)
+        if previous_span is not None and previous_boundary < boundary < n_tokens:
+            boundaries.append(boundary)
+            sentence = text[previous_span[0]:previous_span[1]].encode("utf-8")
+            if zlib.crc32(sentence) % target_tokens < boundary - previous_boundary:
+                content_cuts.append(boundary)
+            previous_boundary = boundary
+        previous_span = (start, end)
+    
+    chunks = []
+    start = 0
+    previous_end = 0
+    while start < n_tokens:
+        limit = start + max_tokens
+        if limit >= n_tokens:
+            end = n_tokens
+        else:
+            # Primo confine di contenuto dopo la fine del chunk precedente (e oltre il minimo)
+            i = bisect_right(content_cuts, max(start, previous_end + min_tokens - 1))
+            if i < len(content_cuts) and content_cuts[i] <= limit:
+                end = content_cuts[i]
+            else:
+                # Nessun confine di contenuto nel limite: ultimo confine di frase o taglio netto
+                i = bisect_right(boundaries, limit) - 1
+                end = boundaries[i] if i >= 0 and boundaries[i] > start else limit
+        
+        chunks.append(_make_token_chunk(text, ids, offsets, start, end))
+        if end >= n_tokens:
+            break
+        
+        # Il chunk successivo riparte dalla prima frase che rientra nell'overlap
+        next_start = end - overlap
+        i = bisect_left(boundaries, next_start)
+        if i < len(boundaries) and boundaries[i] < end:
+            next_start = boundaries[i]
+        start = max(next_start, start + 1)
+        previous_end = end
+    
+    return chunks
+
+
+def _make_token_chunk(text: str, ids: List[int], offsets: List, start: int, end: int) -> TokenChunk:
+    """
+    Costruisce un TokenChunk dai token [start, end) del documento.
+    """
+    char_start = offsets[start][0]
+    char_end = offsets[end - 1][1]
+    return TokenChunk(
+        text=text[char_start:char_end].strip(),
+        input_ids=list(ids[start:end]),
+        start=char_start,
+        end=char_end
+    )
+
+
 def split_into_sentences(text: str) -> List[str]:
     """
     Divide il testo in frasi.
     Gestisce abbreviazioni comuni e casi edge.
     """
-    # Pattern per split delle frasi (gestisce abbreviazioni comuni)
-    sentence_endings = r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s'
-    sentences = re.split(sentence_endings, text)
+    return [text[start:end] for start, end in iter_sentence_spans(text)]
+
+
+def iter_sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Individua le frasi del testo in un'unica passata, senza copiarle.
+    
+    Un punto non chiude la frase dopo un'abbreviazione italiana (es. "Dott.",
+    "art.", "pag."), dopo un'iniziale maiuscola ("A. Manzoni"), dopo una sigla
+    puntata ("S.p.A.") o se la parola successiva inizia con una minuscola.
+    
+    Args:
+        text: Testo da dividere
+        
+    Yields:
+        Coppie (inizio, fine) di offset in caratteri, senza spazi ai bordi
+    """
+    first = _NON_SPACE_RE.search(text)
+    if first is None:
+        return
+    start = first.start()
+    
+    for match in _SENTENCE_END_RE.finditer(text, start):
+        next_start = match.end()
+        if next_start >= len(text):
+            break
+        
+        if _is_sentence_end(match.group(1), match.group(2), text[next_start]):
+            yield start, match.end(2)
+            start = next_start
+    
+    end = len(text.rstrip())
+    if end > start:
+        yield start, end
+
+
+def _is_sentence_end(word: str, terminator: str, next_char: str) -> bool:
+    """
+    Decide se il terminatore che segue `word` chiude la frase.
+    
+    Args:
+        word: Parola che precede il terminatore
+        terminator: Terminatore (con eventuali virgolette o parentesi di chiusura)
+        next_char: Primo carattere della parola successiva
+    """
+    # "!", "?" e "..." chiudono sempre la frase
+    if terminator[0] != '.' or terminator.startswith('..'):
+        return True
+    
+    if next_char.islower():
+        return False
+    
+    # Senza punteggiatura di apertura né elisione ("dell'art.", "l’ing.")
+    word = word.lstrip('(["\'«“‘')
+    word = word.rsplit("'", 1)[-1].rsplit("’", 1)[-1]
+    
+    if not word:
+        return True
+    # Iniziale di un nome ("A. Manzoni")
+    if len(word) == 1 and word.isupper():
+        return False
     
-    # Rimuove frasi vuote
-    sentences = [s.strip() for s in sentences if s.strip()]
+    word = word.lower()
+    if word in _SENTENCE_FINAL_ABBREVIATIONS:
+        return next_char.isupper()
+    if word in ITALIAN_ABBREVIATIONS:
+        return False
+    # Sigla puntata ("S.p.A.", "U.S.A.")
+    if '.' in word and all(part.isalpha() and len(part) <= 3 for part in word.split('.')):
+        return False
     
-    return sentences
+    return True
 
 
-def _chunk_by_sentences(
-    sentences: List[str], 
-    max_chars: int, 
+def _iter_sentence_chunk_spans(
+    text: str,
+    max_chars: int,
     overlap_chars: int
-) -> List[str]:
+) -> Iterator[Tuple[int, int]]:
     """
-    Crea chunk preservando le frasi intere.
+    Crea chunk preservando le frasi intere, lavorando sugli offset delle frasi.
+    
+    Le frasi del chunk corrente stanno in una deque: la lunghezza del chunk è
+    data dagli offset della prima e dell'ultima frase, e l'overlap si ottiene
+    scartando frasi da sinistra. Ogni frase entra ed esce dalla deque una sola
+    volta, quindi il costo è lineare nel numero di frasi.
     """
-    chunks = []
-    current_chunk = []
-    current_length = 0
+    current: Deque[Tuple[int, int]] = deque()
     
-    for sentence in sentences:
-        sentence_length = len(sentence)
-        
+    for sentence_start, sentence_end in iter_sentence_spans(text):
         # Se una singola frase è troppo lunga, la divide
-        if sentence_length > max_chars:
+        if sentence_end - sentence_start > max_chars:
             # Salva il chunk corrente se non vuoto
-            if current_chunk:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = []
-                current_length = 0
+            if current:
+                yield current[0][0], current[-1][1]
+                current.clear()
             
-            # Divide la frase lunga
-            sub_chunks = _chunk_by_chars(sentence, max_chars, overlap_chars)
-            chunks.extend(sub_chunks)
+            yield from _iter_char_spans(text, sentence_start, sentence_end, max_chars, overlap_chars)
             continue
         
         # Se aggiungere questa frase supera il limite
-        if current_length + sentence_length > max_chars:
+        if current and sentence_end - current[0][0] > max_chars:
             # Salva il chunk corrente
-            chunks.append(" ".join(current_chunk))
-            
-            # Inizia un nuovo chunk con overlap
-            # Trova le ultime frasi che rientrano nell'overlap
-            overlap_chunk = []
-            overlap_length = 0
-            for prev_sentence in reversed(current_chunk):
-                if overlap_length + len(prev_sentence) <= overlap_chars:
-                    overlap_chunk.insert(0, prev_sentence)
-                    overlap_length += len(prev_sentence)
-                else:
-                    break
+            yield current[0][0], current[-1][1]
             
-            current_chunk = overlap_chunk
-            current_length = overlap_length
+            # Le ultime frasi che rientrano nell'overlap aprono il nuovo chunk
+            while current and current[-1][1] - current[0][0] > overlap_chars:
+                current.popleft()
+            # Il nuovo chunk deve comunque poter contenere la frase corrente
+            while current and sentence_end - current[0][0] > max_chars:
+                current.popleft()
         
         # Aggiunge la frase al chunk corrente
-        current_chunk.append(sentence)
-        current_length += sentence_length
+        current.append((sentence_start, sentence_end))
     
     # Aggiunge l'ultimo chunk
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    
-    return chunks
+    if current:
+        yield current[0][0], current[-1][1]
 
 
-def _chunk_by_chars(text: str, max_chars: int, overlap_chars: int) -> List[str]:
+def _iter_char_spans(
+    text: str,
+    start: int,
+    end: int,
+    max_chars: int,
+    overlap_chars: int
+) -> Iterator[Tuple[int, int]]:
     """
-    Divide il testo per numero di caratteri con overlap.
-    Usato come fallback quando preserve_sentences=False.
+    Divide text[start:end] per numero di caratteri con overlap, senza spezzare le parole
+    quando possibile. Restituisce gli offset dei chunk, senza spazi ai bordi.
     """
-    chunks = []
-    start = 0
-    text_length = len(text)
-    
-    while start < text_length:
-        end = start + max_chars
+    while start < end:
+        chunk_end = min(start + max_chars, end)
         
         # Se non siamo alla fine, cerca uno spazio per non spezzare parole
-        if end < text_length:
+        if chunk_end < end:
             # Cerca lo spazio più vicino prima del limite
-            space_pos = text.rfind(' ', start, end)
+            space_pos = text.rfind(' ', start, chunk_end)
             if space_pos > start:
-                end = space_pos
+                chunk_end = space_pos
         
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+        # Offset senza spazi ai bordi
+        span_start = _NON_SPACE_RE.search(text, start, chunk_end)
+        if span_start is not None:
+            span_end = chunk_end
+            while text[span_end - 1].isspace():
+                span_end -= 1
+            yield span_start.start(), span_end
+        
+        if chunk_end >= end:
+            break
         
         # Move start forward, accounting for overlap
-        start = end - overlap_chars
-    
-    return chunks
+        start = max(chunk_end - overlap_chars, start + 1)
+
+
+def _chunk_by_chars(text: str, max_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Divide il testo per numero di caratteri con overlap.
+    Usato come fallback quando preserve_sentences=False.
+    """
+    return [text[start:end] for start, end in _iter_char_spans(text, 0, len(text), max_chars, overlap_chars)]
 
 
 def estimate_token_count(text: str) -> int:
@@ -2,7 +2,81 @@
 Pulizia e normalizzazione del testo prima della summarization.
 """
 import re
-from typing import Optional
+from typing import FrozenSet, Iterable, Iterator, Optional, Tuple
+
+
+# Pattern precompilati (usati a ogni richiesta)
+_SPACES_RE = re.compile(r' (?:( *)(?=[.,!?;:])| +)')
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_REPEATED_PUNCT_RE = re.compile(r'([!?.])\1+')
+_PAGE_HEADER_RE = re.compile(r'^\s*(?:Page|Pagina|Pag\.)\s*\d+(?:\s+(?:of|di)\s+\d+)?\s*$', flags=re.MULTILINE | re.IGNORECASE)
+_PAGE_NUMBER_RE = re.compile(r'^\s*\d+\s*/\s*\d+\s*$', flags=re.MULTILINE)
+_MULTIPLE_PUNCT_RE = re.compile(r'([.,!?;:]){2,}')
+_ACRONYM_RE = re.compile(r'\b[A-Z]{2,5}\b')
+
+# Caratteri prima dei quali uno spazio non va mai spezzato in iter_clean_text
+_NO_CUT_BEFORE = frozenset(' .,!?;:')
+
+
+class _CharTable(dict):
+    """
+    Tabella per str.translate calcolata su richiesta: rimuove i caratteri non
+    stampabili e trasforma tab e newline in spazi. Ogni carattere viene
+    classificato una sola volta, alla prima occorrenza.
+    """
+    
+    def __missing__(self, code: int) -> Optional[int]:
+        char = chr(code)
+        if char in '\n\t':
+            value = ord(' ')
+        elif char.isprintable():
+            value = code
+        else:
+            value = None
+        self[code] = value
+        return value
+
+
+_CHAR_TABLE = _CharTable()
+
+
+def _collapse_space(match: re.Match) -> str:
+    # Spazi prima della punteggiatura: rimossi; spazi multipli: uno solo
+    return '' if match.group(1) is not None else ' '
+
+
+def _normalize_chars(text: str) -> str:
+    """
+    Rimuove caratteri di controllo e invisibili; tab e newline diventano spazi.
+    """
+    # Caso comune: oltre a tab e newline non ci sono caratteri da rimuovere
+    normalized = text.replace('\n', ' ').replace('\t', ' ')
+    if normalized.isprintable():
+        return normalized
+    
+    return text.translate(_CHAR_TABLE)
+
+
+def _clean_normalized(text: str) -> str:
+    """
+    Applica le regole di pulizia a un testo già passato da _normalize_chars (senza strip).
+    """
+    # Spazi multipli e spazi prima della punteggiatura in un solo passaggio
+    text = _SPACES_RE.sub(_collapse_space, text)
+    
+    # Rimuove URL (opzionale)
+    if 'http' in text:
+        text = _URL_RE.sub('', text)
+    
+    # Rimuove email (opzionale)
+    if '@' in text:
+        text = _EMAIL_RE.sub('', text)
+    
+    # Rimuove caratteri speciali ripetuti
+    text = _REPEATED_PUNCT_RE.sub(r'\1', text)
+    
+    return text
 
 
 def clean_text(text: str) -> str:
@@ -18,31 +92,84 @@ def clean_text(text: str) -> str:
     if not text or not text.strip():
         return ""
     
-    # Rimuove caratteri di controllo e caratteri invisibili
-    text = ''.join(char for char in text if char.isprintable() or char in '\n\t ')
-    
-    # Normalizza gli spazi bianchi multipli
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Normalizza le newline multiple
-    text = re.sub(r'\n\s*\n', '\n\n', text)
+    # Trim spazi iniziali e finali
+    return _clean_normalized(_normalize_chars(text)).strip()
+
+
+def clean_text_and_acronyms(text: str) -> Tuple[str, FrozenSet[str]]:
+    """
+    Pulisce il testo e ne estrae gli acronimi nello stesso passaggio di preprocessing,
+    così il documento viene scandito una sola volta per tutta la richiesta.
     
-    # Rimuove spazi prima della punteggiatura
-    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
+    Returns:
+        Testo pulito e insieme degli acronimi (vedi extract_acronyms)
+    """
+    cleaned = clean_text(text)
+    return cleaned, extract_acronyms(cleaned)
+
+
+def extract_acronyms(text: str) -> FrozenSet[str]:
+    """
+    Estrae gli acronimi (parole tutte maiuscole di 2-5 lettere) dal testo.
+    """
+    return frozenset(_ACRONYM_RE.findall(text))
+
+
+def iter_clean_text(blocks: Iterable[str]) -> Iterator[str]:
+    """
+    Variante incrementale di clean_text: pulisce il testo a blocchi.
     
-    # Rimuove URL (opzionale)
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    I blocchi vengono spezzati solo all'inizio di una sequenza di spazi seguita
+    da un carattere che non è punteggiatura, dove nessuna regola di pulizia può
+    agire a cavallo del taglio: la concatenazione dei frammenti restituiti è
+    identica a clean_text applicato al testo completo.
     
-    # Rimuove email (opzionale)
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
+    Args:
+        blocks: Blocchi di testo grezzo (es. pagine o porzioni di file)
+        
+    Yields:
+        Frammenti di testo pulito
+    """
+    pending = ""
+    held_spaces = ""
+    started = False
     
-    # Rimuove caratteri speciali ripetuti
-    text = re.sub(r'([!?.])\1+', r'\1', text)
+    def _emit(segment: str):
+        nonlocal held_spaces, started
+        piece = _clean_normalized(segment)
+        if not started:
+            piece = piece.lstrip()
+        body = piece.rstrip()
+        if body:
+            # Gli spazi finali vengono restituiti solo se segue altro testo
+            yield held_spaces + body
+            held_spaces = piece[len(body):]
+            started = True
+        else:
+            held_spaces += piece
     
-    # Trim spazi iniziali e finali
-    text = text.strip()
+    for block in blocks:
+        pending += _normalize_chars(block)
+        cut = _find_safe_cut(pending)
+        if cut > 0:
+            yield from _emit(pending[:cut])
+            pending = pending[cut:]
     
-    return text
+    if pending:
+        yield from _emit(pending)
+
+
+def _find_safe_cut(text: str) -> int:
+    """
+    Restituisce l'inizio dell'ultima sequenza di spazi seguita da un carattere
+    diverso da spazio e punteggiatura (0 se non esiste).
+    """
+    pos = text.rfind(' ')
+    while pos != -1:
+        if pos + 1 < len(text) and text[pos + 1] not in _NO_CUT_BEFORE:
+            return len(text[:pos].rstrip(' '))
+        pos = text.rfind(' ', 0, pos)
+    return 0
 
 
 def remove_headers_footers(text: str) -> str:
@@ -51,8 +178,8 @@ def remove_headers_footers(text: str) -> str:
     Utile per PDF e documenti formattati.
     """
     # Rimuove pattern comuni di header/footer (numeri di pagina, ecc.)
-    text = re.sub(r'^\s*Page\s+\d+\s*$', '', text, flags=re.MULTILINE | re.IGNORECASE)
-    text = re.sub(r'^\s*\d+\s*/\s*\d+\s*$', '', text, flags=re.MULTILINE)
+    text = _PAGE_HEADER_RE.sub('', text)
+    text = _PAGE_NUMBER_RE.sub('', text)
     
     return text
 
@@ -73,6 +200,6 @@ def remove_excessive_punctuation(text: str) -> str:
     Rimuove punteggiatura eccessiva o non necessaria.
     """
     # Rimuove punteggiatura multipla
-    text = re.sub(r'([.,!?;:]){2,}', r'\1', text)
+    text = _MULTIPLE_PUNCT_RE.sub(r'\1', text)
     
     return text
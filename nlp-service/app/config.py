@@ -0,0 +1,107 @@
+"""
+Configurazione del servizio NLP.
+I valori possono essere sovrascritti tramite variabili d'ambiente.
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Legge un intero da una variabile d'ambiente, con valore di default.
+    """
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Legge un numero decimale da una variabile d'ambiente, con valore di default.
+    """
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Modello di summarization
+MODEL_NAME = os.getenv("NLP_MODEL_NAME", "ARTeLab/it5-summarization-mlsum")
+
+# Backend di inferenza ("torch", "torch-int8", "onnx") e cartella del modello ONNX esportato
+MODEL_BACKEND = os.getenv("NLP_MODEL_BACKEND", "torch")
+ONNX_DIR = os.getenv("NLP_ONNX_DIR", "")
+
+# Snapshot locale del modello (safetensors): caricato se presente, creato altrimenti
+MODEL_SNAPSHOT_DIR = os.getenv("NLP_MODEL_SNAPSHOT_DIR", "")
+
+# Warm-up all'avvio: dimensioni dei batch fittizi, separate da virgola (vuoto = nessun warm-up)
+WARMUP_BATCH_SIZES = [
+    int(size) for size in os.getenv("NLP_WARMUP_BATCH_SIZES", "1").split(",") if size.strip()
+]
+
+# Sovrapposizione (in token) tra chunk consecutivi
+CHUNK_OVERLAP_TOKENS = _env_int("NLP_CHUNK_OVERLAP_TOKENS", 32)
+
+# Numero massimo di livelli nella modalità "hierarchical"
+HIERARCHICAL_MAX_LEVELS = _env_int("NLP_HIERARCHICAL_MAX_LEVELS", 5)
+
+# Pre-filtraggio estrattivo: metodo di punteggio delle frasi ("textrank" o "centroid")
+EXTRACTIVE_METHOD = os.getenv("NLP_EXTRACTIVE_METHOD", "textrank")
+
+# Profilo "auto": profondità della coda (in chunk) oltre cui si passa a "balanced" e a "fast"
+AUTO_PROFILE_BALANCED_DEPTH = _env_int("NLP_AUTO_PROFILE_BALANCED_DEPTH", 32)
+AUTO_PROFILE_FAST_DEPTH = _env_int("NLP_AUTO_PROFILE_FAST_DEPTH", 128)
+
+# Scheduler di batching dinamico tra richieste
+SCHEDULER_MAX_BATCH_SIZE = _env_int("NLP_SCHEDULER_MAX_BATCH_SIZE", 16)
+SCHEDULER_MAX_WAIT_MS = _env_float("NLP_SCHEDULER_MAX_WAIT_MS", 20.0)
+SCHEDULER_MAX_QUEUE_SIZE = _env_int("NLP_SCHEDULER_MAX_QUEUE_SIZE", 256)
+
+# Esecuzione: thread intra-op di torch e worker per pulizia/chunking (0 = default di torch)
+TORCH_NUM_THREADS = _env_int("NLP_TORCH_NUM_THREADS", 0)
+PREPROCESS_WORKERS = _env_int("NLP_PREPROCESS_WORKERS", 2)
+
+# Launcher multi-worker (app/launcher.py): processi, thread torch per worker
+# (0 = core disponibili / worker) e pinning di ogni worker ai propri core
+WORKERS = _env_int("NLP_WORKERS", 1)
+WORKER_THREADS = _env_int("NLP_WORKER_THREADS", 0)
+PIN_WORKERS = os.getenv("NLP_PIN_WORKERS", "1") == "1"
+
+# Repliche del modello per processo, ognuna con i propri core e thread torch
+# (1 = un solo summarizer; "auto" = split repliche × thread calibrato per la
+# macchina con app/replicas.py, salvato in NLP_REPLICA_TUNING_PATH) e core per
+# replica (0 = core disponibili / repliche). Il pinning segue NLP_PIN_WORKERS
+_replicas = os.getenv("NLP_REPLICAS", "1").strip().lower()
+REPLICAS = 0 if _replicas == "auto" else int(_replicas or 1)
+REPLICA_THREADS = _env_int("NLP_REPLICA_THREADS", 0)
+REPLICA_TUNING_PATH = os.getenv("NLP_REPLICA_TUNING_PATH", "replicas.json")
+
+# Cache dei riassunti: limite in memoria e database SQLite opzionale (vuoto = disabilitato)
+CACHE_MAX_BYTES = _env_int("NLP_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+CACHE_DB_PATH = os.getenv("NLP_CACHE_DB_PATH", "")
+
+# Job asincroni (/jobs): database SQLite della coda, job elaborati in parallelo
+# per processo e secondi senza heartbeat dopo cui un job interrotto viene ripreso
+JOBS_DB_PATH = os.getenv("NLP_JOBS_DB_PATH", "jobs.db")
+JOB_WORKERS = _env_int("NLP_JOB_WORKERS", 2)
+JOB_LEASE_SECONDS = _env_float("NLP_JOB_LEASE_SECONDS", 60.0)
+
+# Deduplicazione dei segmenti ripetuti tra pagine (header, footer, disclaimer) prima
+# dello chunking: attiva di default sui documenti impaginati (PDF, DOCX, HTML),
+# disattivata sui testi semplici (JSON, TXT), dove le "pagine" sono paragrafi;
+# similarità MinHash dei quasi-duplicati e lunghezza minima (in caratteri) dei segmenti
+DEDUP_ENABLED = os.getenv("NLP_DEDUP", "1") == "1"
+DEDUP_TEXT_ENABLED = os.getenv("NLP_DEDUP_TEXT", "0") == "1"
+DEDUP_SIMILARITY = _env_float("NLP_DEDUP_SIMILARITY", 0.8)
+DEDUP_MIN_CHARS = _env_int("NLP_DEDUP_MIN_CHARS", 20)
+
+# Riassunto incrementale (document_id): database SQLite con chunk e riassunti
+# dell'ultima versione di ogni documento
+DOCUMENTS_DB_PATH = os.getenv("NLP_DOCUMENTS_DB_PATH", "documents.db")
+
+# Backend di estrazione preferiti per formato, es. "pdf=pypdf2,html=bs4"
+# (vuoto = per ogni formato il più veloce tra quelli installati)
+EXTRACTOR_BACKENDS = dict(
+    item.strip().split("=", 1) for item in os.getenv("NLP_EXTRACTOR_BACKENDS", "").split(",") if "=" in item
+)
+
+# Estrazione parallela dei PDF: processi (0 = sequenziale) e tempo massimo per pagina
+PDF_WORKERS = _env_int("NLP_PDF_WORKERS", 0)
+PDF_PAGE_TIMEOUT = _env_float("NLP_PDF_PAGE_TIMEOUT", 30.0)
@@ -0,0 +1,255 @@
+"""
+Rimozione dei contenuti ripetuti tra pagine (header e footer, disclaimer, righe
+di tabella) prima dello chunking: meno token in ingresso significa meno chunk e
+meno chiamate a generate().
+
+Le righe (o le frasi, per le righe molto lunghe) già comparse in una pagina
+precedente vengono rimosse: prima con un hash esatto del testo normalizzato,
+poi cercando quasi-duplicati con MinHash sugli shingle di caratteri (es. un
+footer che cambia solo per numero di pagina o data). La prima occorrenza resta.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import re
+
+import numpy as np
+
+from chunking import estimate_token_count, iter_sentence_spans
+from cleaning import remove_headers_footers
+
+
+# Segmenti più corti (in caratteri, testo normalizzato) non vengono mai rimossi
+MIN_SEGMENT_CHARS = 20
+
+# Righe più lunghe (tipicamente paragrafi interi) vengono confrontate frase per frase
+LONG_LINE_CHARS = 300
+
+# MinHash: permutazioni, suddivise in bande per la ricerca dei candidati (LSH)
+NUM_PERMUTATIONS = 64
+BANDS = 16
+SHINGLE_SIZE = 5
+# Finestre elaborate insieme (memoria: NUM_PERMUTATIONS × blocco valori a 64 bit)
+MINHASH_BLOCK = 16384
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+# Separatore di pagina nei testi semplici (form feed), altrimenti righe vuote
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+
+@dataclass
+class DedupStats:
+    segments_total: int = 0
+    segments_removed: int = 0
+    near_duplicates: int = 0
+    tokens_removed: int = 0
+
+
+def _normalize(segment: str) -> str:
+    return " ".join(segment.lower().split())
+
+
+def _minhash(segments: List[str]) -> np.ndarray:
+    """
+    Firme MinHash degli shingle di caratteri di più segmenti normalizzati (una
+    riga per segmento). Gli shingle sono finestre di SHINGLE_SIZE byte con hash
+    polinomiale; le finestre a cavallo tra due segmenti non partecipano al
+    minimo. Le finestre vengono elaborate a blocchi di MINHASH_BLOCK con un
+    minimo progressivo, così la memoria resta limitata anche su testi enormi.
+    """
+    encoded = [segment.encode("utf-8") for segment in segments]
+    data = np.frombuffer(b"\0".join(encoded), dtype=np.uint8)
+    windows = len(data) - SHINGLE_SIZE + 1
+    # Inizio di ogni segmento: ogni finestra appartiene al segmento in cui inizia
+    offsets = np.cumsum([0] + [len(segment) + 1 for segment in encoded[:-1]])
+
+    signatures = np.full((len(segments), NUM_PERMUTATIONS), _MERSENNE_PRIME, dtype=np.uint64)
+    for start in range(0, windows, MINHASH_BLOCK):
+        end = min(start + MINHASH_BLOCK, windows)
+        block = data[start:end + SHINGLE_SIZE - 1].astype(np.uint64)
+        count = end - start
+
+        hashes = np.zeros(count, dtype=np.uint64)
+        for k in range(SHINGLE_SIZE):
+            hashes = hashes * np.uint64(257) + block[k:k + count]
+        hashes %= np.uint64(_MERSENNE_PRIME)
+
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % np.uint64(_MERSENNE_PRIME)
+        # Finestre che contengono il separatore: valore massimo, non vincono mai il minimo
+        separators = np.concatenate(([0], np.cumsum(block == 0)))
+        crossing = separators[SHINGLE_SIZE:] != separators[:count]
+        permuted[:, crossing] = np.uint64(_MERSENNE_PRIME)
+
+        # Minimo per segmento all'interno del blocco, poi combinato con i blocchi precedenti
+        owners = np.searchsorted(offsets, np.arange(start, end), side="right") - 1
+        starts = np.flatnonzero(np.concatenate(([True], owners[1:] != owners[:-1])))
+        ids = owners[starts]
+        minima = np.minimum.reduceat(permuted, starts, axis=1).T
+        signatures[ids] = np.minimum(signatures[ids], minima)
+
+    return signatures
+
+
+class PageDeduplicator:
+    """
+    Deduplicazione incrementale, una pagina alla volta: ogni pagina viene
+    confrontata solo con le precedenti, quindi può essere usata in streaming.
+    """
+
+    def __init__(
+        self,
+        similarity: float = 0.8,
+        min_chars: int = MIN_SEGMENT_CHARS,
+        token_counter: Optional[Callable[[List[str]], List[int]]] = None
+    ):
+        """
+        Args:
+            similarity: Similarità di Jaccard stimata oltre cui un segmento è un quasi-duplicato
+            min_chars: Lunghezza minima dei segmenti da confrontare
+            token_counter: Funzione che conta i token di una lista di segmenti; di default
+                si usa una stima senza tokenizer
+        """
+        self.similarity = similarity
+        # Ogni segmento confrontato deve contenere almeno uno shingle
+        self.min_chars = max(min_chars, SHINGLE_SIZE)
+        self.token_counter = token_counter
+        self.stats = DedupStats()
+
+        self._seen: set = set()
+        # Firme MinHash delle pagine precedenti e indice LSH: (banda, valori) -> firme
+        self._signatures: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+
+    def process(self, page: str) -> str:
+        """
+        Restituisce la pagina senza i segmenti già comparsi nelle pagine precedenti.
+        """
+        page = remove_headers_footers(page)
+        lines = []
+        # Segmenti da confrontare: (riga, posizione nella riga, testo normalizzato)
+        candidates = []
+
+        for line in page.split("\n"):
+            if len(line) > LONG_LINE_CHARS:
+                segments = [line[start:end] for start, end in iter_sentence_spans(line)]
+            else:
+                segments = [line]
+            for position, segment in enumerate(segments):
+                normalized = _normalize(segment)
+                if len(normalized) >= self.min_chars:
+                    candidates.append((len(lines), position, normalized))
+            lines.append(segments)
+
+        removed = set()
+        page_hashes = []
+        unseen = []
+        for line_index, position, normalized in candidates:
+            key = hash(normalized)
+            if key in self._seen:
+                removed.add((line_index, position))
+            else:
+                page_hashes.append(key)
+                unseen.append((line_index, position, normalized))
+
+        page_signatures = []
+        if unseen:
+            signatures = _minhash([normalized for _, _, normalized in unseen])
+            for (line_index, position, _), signature in zip(unseen, signatures):
+                if self._is_near_duplicate(signature):
+                    self.stats.near_duplicates += 1
+                    removed.add((line_index, position))
+                else:
+                    page_signatures.append(signature)
+
+        # I segmenti della pagina contano solo per le pagine successive
+        self._seen.update(page_hashes)
+        for signature in page_signatures:
+            self._index(signature)
+
+        self.stats.segments_total += len(candidates)
+        if not removed:
+            return page
+
+        kept_lines = []
+        removed_segments = []
+        for line_index, segments in enumerate(lines):
+            kept = []
+            for position, segment in enumerate(segments):
+                if (line_index, position) in removed:
+                    removed_segments.append(segment)
+                else:
+                    kept.append(segment)
+            if kept or not segments:
+                kept_lines.append(" ".join(kept))
+
+        self.stats.segments_removed += len(removed_segments)
+        if self.token_counter is not None:
+            self.stats.tokens_removed += sum(self.token_counter(removed_segments))
+        else:
+            self.stats.tokens_removed += sum(estimate_token_count(segment) for segment in removed_segments)
+
+        return "\n".join(kept_lines)
+
+
+    def process_text(self, text: str) -> str:
+        """
+        Come process, per un testo che può contenere più pagine o paragrafi
+        (vedi split_pages), ciascuno confrontato con i precedenti.
+        """
+        pages = [self.process(page) for page in split_pages(text)]
+        return "\n\n".join(page for page in pages if page.strip())
+
+
+    def _bands(self, signature: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        rows = NUM_PERMUTATIONS // BANDS
+        for band in range(BANDS):
+            yield band, signature[band * rows:(band + 1) * rows].tobytes()
+
+
+    def _is_near_duplicate(self, signature: np.ndarray) -> bool:
+        candidates = set()
+        for band in self._bands(signature):
+            candidates.update(self._buckets.get(band, ()))
+        return any(
+            np.mean(self._signatures[i] == signature) >= self.similarity
+            for i in candidates
+        )
+
+
+    def _index(self, signature: np.ndarray):
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, []).append(index)
+
+
+def split_pages(text: str) -> List[str]:
+    """
+    Pagine di un testo semplice: separate da form feed se presenti, altrimenti
+    da righe vuote (paragrafi).
+    """
+    if "\f" in text:
+        return text.split("\f")
+    return _PARAGRAPH_BREAK_RE.split(text)
+
+
+def deduplicate_text(
+    text: str,
+    deduplicator: Optional[PageDeduplicator] = None
+) -> Tuple[str, DedupStats]:
+    """
+    Rimuove da un testo semplice i segmenti ripetuti tra pagine (o paragrafi).
+
+    Args:
+        text: Testo grezzo, con le righe originali
+        deduplicator: Deduplicatore da usare (default: parametri predefiniti)
+
+    Returns:
+        Testo deduplicato e statistiche della rimozione
+    """
+    deduplicator = deduplicator or PageDeduplicator()
+    return deduplicator.process_text(text), deduplicator.stats
@@ -0,0 +1,100 @@
+"""
+Versioni dei documenti per il riassunto incrementale (SQLite).
+
+Per ogni documento (id e parametri di generazione) si conserva l'ultima
+versione: confini dei chunk, chiave di contenuto e riassunto di ciascuno.
+Quando arriva una nuova versione si rigenerano solo i chunk il cui contenuto
+non compare nella precedente.
+"""
+from typing import Dict, List
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    document_id TEXT NOT NULL,
+    chunks TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class DocumentStore:
+    """
+    Ultima versione riassunta di ogni documento, condivisibile tra più processi worker.
+
+    Una versione è una lista di chunk nell'ordine del documento, ciascuno come
+    dizionario {"key", "start", "end", "summary"}: "key" è la chiave del chunk
+    (contenuto e parametri richiesti), "start"/"end" gli offset in caratteri,
+    "summary" il riassunto grezzo (senza post-processing).
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Inizializza l'archivio.
+
+        Args:
+            db_path: Percorso del database SQLite
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connessione del processo corrente, aperta al primo uso (e dopo un fork).
+        """
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None, timeout=30.0
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._db_pid = os.getpid()
+        return self._db
+
+
+    def get(self, key: str) -> List[dict]:
+        """
+        Chunk dell'ultima versione salvata (lista vuota se il documento è nuovo).
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT chunks FROM documents WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else []
+
+
+    def put(self, key: str, document_id: str, chunks: List[dict]):
+        """
+        Sostituisce la versione salvata con quella appena riassunta.
+        """
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO documents (key, document_id, chunks, updated_at) VALUES (?, ?, ?, ?)",
+                (key, document_id, json.dumps(chunks, ensure_ascii=False), time.time())
+            )
+
+
+    def summaries(self, key: str) -> Dict[str, str]:
+        """
+        Riassunti dell'ultima versione indicizzati per chiave di contenuto del chunk.
+        """
+        return {chunk["key"]: chunk["summary"] for chunk in self.get(key)}
+
+
+    def stats(self) -> dict:
+        """
+        Numero di documenti con una versione salvata.
+        """
+        with self._lock:
+            count = self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"documents": count}
+
@@ -0,0 +1,199 @@
+"""
+Pre-filtraggio estrattivo: seleziona le frasi più rappresentative del documento
+prima dello chunking, per ridurre i token inviati al modello abstractive.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+
+import numpy as np
+
+from chunking import estimate_token_count, iter_sentence_spans
+
+
+_WORD_RE = re.compile(r"\w+")
+
+# Parole italiane troppo frequenti per distinguere le frasi
+_STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai anche che chi ci come con cui da dal dalla dalle dallo dai dagli
+degli dei del della delle dello di e ed è era erano essere fra gli ha hanno i il in io la le lo
+loro lui ma mi ne nei nel nella nelle nello noi non o per più però perché poi quale quali quando
+quella quelle quelli quello questa queste questi questo se si sia sono su sua sue sui sul sulla
+suo suoi tra tu un una uno vi voi
+""".split())
+
+# Dimensione massima del vocabolario (termini con document frequency più alta)
+MAX_VOCABULARY = 4096
+
+
+def select_sentences(
+    text: str,
+    ratio: float = 0.3,
+    max_tokens: Optional[int] = None,
+    method: str = "textrank",
+    token_counter: Optional[Callable[[List[str]], List[int]]] = None
+) -> Tuple[str, int, int]:
+    """
+    Mantiene solo le frasi più rilevanti del testo, nell'ordine originale.
+
+    Args:
+        text: Testo pulito
+        ratio: Frazione di frasi da mantenere (0 < ratio <= 1)
+        max_tokens: Budget massimo di token delle frasi mantenute (None = nessun limite)
+        method: "textrank" (centralità nel grafo di similarità) o "centroid"
+            (similarità con il vettore medio del documento)
+        token_counter: Funzione che conta i token di una lista di frasi; di default
+            si usa una stima senza tokenizer
+
+    Returns:
+        Testo ridotto, numero di frasi mantenute, numero di frasi totali
+    """
+    spans = list(iter_sentence_spans(text))
+    total = len(spans)
+    if total <= 3 or (ratio >= 1 and max_tokens is None):
+        return text, total, total
+
+    sentences = [text[start:end] for start, end in spans]
+    matrix = _tfidf_matrix(sentences)
+
+    if method == "textrank":
+        scores = _textrank_scores(matrix)
+    else:
+        scores = _centroid_scores(matrix)
+
+    if token_counter is not None:
+        lengths = token_counter(sentences)
+    else:
+        lengths = [estimate_token_count(sentence) for sentence in sentences]
+
+    # Frasi in ordine di punteggio, finché non si raggiunge il numero o il budget di token
+    limit = max(1, int(round(total * min(ratio, 1.0))))
+    selected = []
+    used_tokens = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if len(selected) >= limit:
+            break
+        if max_tokens is not None and used_tokens + lengths[index] > max_tokens:
+            continue
+        selected.append(int(index))
+        used_tokens += lengths[index]
+
+    if not selected:
+        selected = [int(np.argmax(scores))]
+
+    selected.sort()
+    return " ".join(sentences[i] for i in selected), len(selected), total
+
+
+@dataclass
+class _SparseMatrix:
+    """
+    Matrice sparsa (frasi x termini) in coordinate, ordinate per riga: solo le
+    occorrenze non nulle, così la memoria cresce con il testo e non con il vocabolario.
+    """
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+    shape: Tuple[int, int]
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """
+        Prodotto matrice x vettore (un valore per frase).
+        """
+        return np.bincount(self.rows, weights=self.values * vector[self.cols], minlength=self.shape[0])
+
+
+    def transpose_dot(self, vector: np.ndarray) -> np.ndarray:
+        """
+        Prodotto trasposta x vettore (un valore per termine).
+        """
+        return np.bincount(self.cols, weights=self.values * vector[self.rows], minlength=self.shape[1])
+
+
+    def row_norms(self) -> np.ndarray:
+        return np.sqrt(np.bincount(self.rows, weights=self.values ** 2, minlength=self.shape[0]))
+
+
+def _tfidf_matrix(sentences: List[str]) -> _SparseMatrix:
+    """
+    Matrice TF-IDF sparsa (frasi x termini) con righe normalizzate L2.
+    """
+    tokenized = [
+        [word for word in _WORD_RE.findall(sentence.lower()) if word not in _STOPWORDS and not word.isdigit()]
+        for sentence in sentences
+    ]
+
+    # Document frequency e vocabolario ridotto ai termini più diffusi
+    document_frequency: Dict[str, int] = {}
+    for words in tokenized:
+        for word in set(words):
+            document_frequency[word] = document_frequency.get(word, 0) + 1
+    vocabulary = sorted(document_frequency, key=lambda w: -document_frequency[w])[:MAX_VOCABULARY]
+    term_index = {word: i for i, word in enumerate(vocabulary)}
+    shape = (len(sentences), max(1, len(vocabulary)))
+
+    # Coordinate (frase, termine) delle occorrenze
+    rows, cols = [], []
+    for row, words in enumerate(tokenized):
+        for word in words:
+            col = term_index.get(word)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return _SparseMatrix(empty, empty, np.zeros(0, dtype=np.float64), shape)
+
+    # Occorrenze ripetute sommate: le coordinate uniche, ordinate per riga, sono i valori non nulli
+    cells, counts = np.unique(np.asarray(rows, dtype=np.int64) * shape[1] + np.asarray(cols), return_counts=True)
+    matrix = _SparseMatrix(cells // shape[1], cells % shape[1], counts.astype(np.float64), shape)
+
+    df = np.array([document_frequency[word] for word in vocabulary], dtype=np.float64)
+    idf = np.log((1.0 + len(sentences)) / (1.0 + df)) + 1.0
+    matrix.values *= idf[matrix.cols]
+
+    norms = matrix.row_norms()
+    norms[norms == 0] = 1.0
+    matrix.values /= norms[matrix.rows]
+    return matrix
+
+
+def _centroid_scores(matrix: _SparseMatrix) -> np.ndarray:
+    """
+    Similarità coseno di ogni frase con il centroide del documento.
+    """
+    centroid = matrix.transpose_dot(np.ones(matrix.shape[0]))
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(matrix.shape[0])
+    return matrix.dot(centroid / norm)
+
+
+def _textrank_scores(matrix: _SparseMatrix, damping: float = 0.85, iterations: int = 30) -> np.ndarray:
+    """
+    TextRank: PageRank sul grafo delle similarità coseno tra frasi.
+
+    La matrice delle similarità S = M M^T (diagonale esclusa) non viene costruita:
+    ogni prodotto S x passa da M (M^T x), in tempo proporzionale ai valori non nulli.
+    """
+    n = matrix.shape[0]
+    # Diagonale di M M^T: 1 per le frasi con termini (righe normalizzate), 0 per le altre
+    diagonal = matrix.row_norms() ** 2
+
+    def _similarity_dot(vector: np.ndarray) -> np.ndarray:
+        return matrix.dot(matrix.transpose_dot(vector)) - diagonal * vector
+
+    # Peso uscente di ogni frase; le frasi isolate distribuiscono il punteggio in modo uniforme
+    out_weight = _similarity_dot(np.ones(n))
+    linked = out_weight > 1e-9
+    inverse_weight = np.divide(1.0, out_weight, out=np.zeros(n), where=linked)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        spread = _similarity_dot(scores * inverse_weight) + scores[~linked].sum() / n
+        updated = (1 - damping) / n + damping * spread
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
@@ -1,14 +1,301 @@
 """
 Modulo per l'estrazione di testo da vari formati di file.
+
+Gli estrattori sono registrati per formato (con estensioni e MIME type) e il
+loro modulo viene importato solo al primo utilizzo: un processo che non legge
+PDF non carica PyPDF2. Per lo stesso formato possono esistere più backend;
+viene usato il più veloce (priorità più alta) tra quelli con le dipendenze
+installate, salvo preferenze esplicite (vedi prefer_backends).
 """
-from .pdf_extractor import extract_from_pdf
-from .docx_extractor import extract_from_docx
-from .html_extractor import extract_from_html
-from .txt_extractor import extract_from_txt
+from concurrent.futures import BrokenExecutor
+from dataclasses import dataclass
+from importlib import import_module
+from importlib.util import find_spec
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import threading
 
 __all__ = [
     'extract_from_pdf',
-    'extract_from_docx', 
+    'extract_from_docx',
     'extract_from_html',
-    'extract_from_txt'
+    'extract_from_txt',
+    'detect_format',
+    'iter_text',
+    'register_format',
+    'register_extractor',
+    'prefer_backends',
+    'get_extractor',
+    'available_backends',
+    'ExtractionError'
 ]
+
+
+@dataclass
+class ExtractorBackend:
+    """
+    Backend di estrazione per un formato, importato al primo utilizzo.
+    """
+    name: str
+    fmt: str
+    # Modulo (relativo al package) e funzione: file -> iteratore di porzioni di testo
+    module: str
+    function: str
+    # Pacchetti di terze parti richiesti (verificati senza importarli)
+    requires: Tuple[str, ...] = ()
+    # A parità di disponibilità vince la priorità più alta (backend più veloce)
+    priority: int = 0
+    # La funzione riceve il documento intero (bytes) invece del file aperto
+    whole_document: bool = False
+    # Funzione alternativa per l'estrazione su più processi (solo PDF)
+    parallel_function: Optional[str] = None
+    
+    
+    def available(self) -> bool:
+        return all(find_spec(package) is not None for package in self.requires)
+    
+    
+    def load(self, function: Optional[str] = None) -> Callable[..., Iterator[str]]:
+        return getattr(import_module(self.module, __name__), function or self.function)
+
+
+# Formati riconosciuti per estensione e per MIME type
+_EXTENSIONS: Dict[str, str] = {}
+_MIME_TYPES: Dict[str, str] = {}
+
+# Backend registrati per formato, backend preferiti e backend già risolti
+_BACKENDS: Dict[str, List[ExtractorBackend]] = {}
+_PREFERRED: Dict[str, str] = {}
+_RESOLVED: Dict[str, ExtractorBackend] = {}
+_lock = threading.Lock()
+
+
+def register_format(fmt: str, extensions: Iterable[str] = (), mime_types: Iterable[str] = ()):
+    """
+    Associa estensioni e MIME type a un formato.
+    """
+    for extension in extensions:
+        _EXTENSIONS[extension.lower()] = fmt
+    for mime_type in mime_types:
+        _MIME_TYPES[mime_type.lower()] = fmt
+
+
+def register_extractor(
+    fmt: str,
+    name: str,
+    module: str,
+    function: str,
+    requires: Iterable[str] = (),
+    priority: int = 0,
+    whole_document: bool = False,
+    parallel_function: Optional[str] = None
+):
+    """
+    Registra un backend di estrazione per un formato.
+    
+    Args:
+        fmt: Formato (es. "pdf")
+        name: Nome del backend (es. "pypdf2")
+        module: Modulo da importare al primo utilizzo (assoluto, o relativo al package)
+        function: Funzione del modulo che restituisce le porzioni di testo del file
+        requires: Pacchetti necessari; senza di essi il backend non viene scelto
+        priority: Priorità tra i backend disponibili (più alta = preferito)
+        whole_document: True se la funzione vuole il contenuto intero invece del file
+        parallel_function: Funzione per l'estrazione su più processi, se supportata
+    """
+    backend = ExtractorBackend(
+        name, fmt, module, function, tuple(requires), priority, whole_document, parallel_function
+    )
+    with _lock:
+        backends = [b for b in _BACKENDS.get(fmt, []) if b.name != name]
+        backends.append(backend)
+        backends.sort(key=lambda b: -b.priority)
+        _BACKENDS[fmt] = backends
+        _RESOLVED.pop(fmt, None)
+
+
+def prefer_backends(preferences: Dict[str, str]):
+    """
+    Imposta il backend preferito per formato (es. {"pdf": "pypdf2"}), usato se disponibile.
+    """
+    with _lock:
+        _PREFERRED.clear()
+        _PREFERRED.update(preferences)
+        _RESOLVED.clear()
+
+
+def get_extractor(fmt: str) -> ExtractorBackend:
+    """
+    Restituisce il backend da usare per un formato: il preferito se disponibile,
+    altrimenti quello con priorità più alta tra i disponibili.
+    
+    Raises:
+        ValueError: Formato non registrato
+        ImportError: Nessun backend del formato ha le dipendenze installate
+    """
+    with _lock:
+        backend = _RESOLVED.get(fmt)
+        if backend is not None:
+            return backend
+        
+        backends = _BACKENDS.get(fmt)
+        if not backends:
+            raise ValueError(f"Formato non supportato: {fmt}")
+        
+        candidates = [b for b in backends if b.name == _PREFERRED.get(fmt)] + backends
+        for candidate in candidates:
+            if candidate.available():
+                _RESOLVED[fmt] = candidate
+                return candidate
+        
+        missing = ", ".join(f"{b.name} ({' '.join(b.requires)})" for b in backends)
+        raise ImportError(f"Nessun estrattore disponibile per {fmt}: installare uno tra {missing}")
+
+
+def available_backends() -> Dict[str, List[dict]]:
+    """
+    Backend registrati per formato, con disponibilità e backend selezionato.
+    """
+    report = {}
+    for fmt in list(_BACKENDS):
+        try:
+            selected = get_extractor(fmt).name
+        except ImportError:
+            selected = None
+        report[fmt] = [
+            {"name": b.name, "available": b.available(), "selected": b.name == selected}
+            for b in _BACKENDS[fmt]
+        ]
+    return report
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None, head: bytes = b'') -> Optional[str]:
+    """
+    Riconosce il formato di un file da estensione, MIME type o primi byte.
+    
+    Args:
+        filename: Nome del file (può essere None)
+        content_type: MIME type dichiarato (può essere None)
+        head: Primi byte del file, per il riconoscimento dal contenuto
+    
+    Returns:
+        "pdf", "docx", "html", "txt" oppure None se il formato non è riconosciuto
+    """
+    if filename:
+        fmt = _EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if fmt:
+            return fmt
+    
+    if content_type:
+        fmt = _MIME_TYPES.get(content_type.split(';')[0].strip().lower())
+        if fmt:
+            return fmt
+    
+    # Firme dei file
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(b'PK'):
+        return 'docx'
+    if head.lstrip()[:15].lower().startswith((b'<!doctype html', b'<html')):
+        return 'html'
+    
+    return None
+
+
+class ExtractionError(Exception):
+    """
+    Sollevata quando il file non può essere letto dal backend di estrazione
+    (file malformato, corrotto o non del formato dichiarato).
+    """
+
+
+def _guarded(fmt: str, extract: Callable[[], Iterator[str]]) -> Iterator[str]:
+    """
+    Porzioni di testo di `extract()`, con gli errori di parsing del backend
+    convertiti in ExtractionError. Gli errori di sistema (I/O, memoria, pool
+    di processi) restano invariati.
+    """
+    try:
+        yield from extract()
+    except (ExtractionError, OSError, MemoryError, BrokenExecutor):
+        raise
+    except Exception as e:
+        raise ExtractionError(f"File {fmt.upper()} non leggibile: {e}") from e
+
+
+def iter_text(fmt: str, file: BinaryIO, pdf_workers: int = 0, pdf_page_timeout: float = 30.0) -> Iterator[str]:
+    """
+    Estrae il testo di un file in modo incrementale (pagina, paragrafo o blocco).
+    
+    Args:
+        fmt: Formato del file, come restituito da detect_format
+        file: File binario aperto
+        pdf_workers: Processi per l'estrazione parallela dei PDF (0 = sequenziale)
+        pdf_page_timeout: Tempo massimo per pagina nell'estrazione parallela (in secondi)
+    
+    Yields:
+        Porzioni di testo nell'ordine del documento
+    
+    Raises:
+        ExtractionError: durante l'iterazione, se il file è malformato o corrotto
+    """
+    backend = get_extractor(fmt)
+    
+    if pdf_workers > 0:
+        # Estrazione su più processi (con timeout per pagina) solo con i backend che la supportano
+        parallel = [b for b in [backend] + _BACKENDS[fmt] if b.parallel_function and b.available()]
+        if parallel:
+            extract = parallel[0].load(parallel[0].parallel_function)
+            return _guarded(fmt, lambda: extract(file, workers=pdf_workers, page_timeout=pdf_page_timeout))
+    
+    extract = backend.load()
+    if backend.whole_document:
+        # Es. BeautifulSoup e lxml richiedono il documento intero
+        return _guarded(fmt, lambda: extract(file.read()))
+    return _guarded(fmt, lambda: extract(file))
+
+
+register_format('pdf', ['.pdf'], ['application/pdf'])
+register_format(
+    'docx', ['.docx'], ['application/vnd.openxmlformats-officedocument.wordprocessingml.document']
+)
+register_format('html', ['.html', '.htm'], ['text/html', 'application/xhtml+xml'])
+register_format('txt', ['.txt', '.md'], ['text/plain'])
+
+register_extractor(
+    'pdf', 'pdfium', '.pdfium_extractor', 'iter_pdf_pages_pdfium', ['pypdfium2'], priority=10,
+    parallel_function='iter_pdf_pages_pdfium_parallel'
+)
+register_extractor(
+    'pdf', 'pypdf2', '.pdf_extractor', 'iter_pdf_pages', ['PyPDF2'],
+    parallel_function='iter_pdf_pages_parallel'
+)
+register_extractor('docx', 'python-docx', '.docx_extractor', 'iter_docx_blocks', ['docx'])
+register_extractor(
+    'html', 'lxml', '.lxml_html_extractor', 'iter_html_lines_lxml', ['lxml'], priority=10, whole_document=True
+)
+register_extractor('html', 'bs4', '.html_extractor', 'iter_html_lines', ['bs4'], whole_document=True)
+register_extractor('txt', 'text', '.txt_extractor', 'iter_txt_blocks')
+
+
+# Funzioni pubbliche dei singoli estrattori, importate al primo accesso
+_LAZY_ATTRIBUTES = {
+    'extract_from_pdf': '.pdf_extractor',
+    'iter_pdf_pages': '.pdf_extractor',
+    'iter_pdf_pages_parallel': '.pdf_extractor',
+    'extract_from_docx': '.docx_extractor',
+    'iter_docx_blocks': '.docx_extractor',
+    'extract_from_html': '.html_extractor',
+    'iter_html_lines': '.html_extractor',
+    'extract_from_txt': '.txt_extractor',
+    'iter_txt_blocks': '.txt_extractor'
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -1,11 +1,37 @@
 """
 Estrattore di testo da file DOCX (Microsoft Word).
 """
-from typing import Optional
+from typing import BinaryIO, Iterator, Optional, Union
 from docx import Document
 from io import BytesIO
 
 
+def iter_docx_blocks(file: Union[bytes, BinaryIO]) -> Iterator[str]:
+    """
+    Estrae il testo di un DOCX un blocco alla volta: prima i paragrafi, poi le righe delle tabelle.
+    
+    Args:
+        file: Contenuto binario del DOCX oppure file binario aperto
+        
+    Yields:
+        Testo di ogni paragrafo o riga di tabella non vuoti
+    """
+    source = BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+    doc = Document(source)
+    
+    # Paragrafi
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            yield paragraph.text
+    
+    # Tabelle (una riga alla volta)
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = [cell.text for cell in row.cells if cell.text.strip()]
+            if row_text:
+                yield " | ".join(row_text)
+
+
 def extract_from_docx(file_content: bytes) -> str:
     """
     Estrae il testo da un file DOCX.
@@ -17,23 +43,8 @@ def extract_from_docx(file_content: bytes) -> str:
         Testo estratto dal documento
     """
     try:
-        docx_file = BytesIO(file_content)
-        doc = Document(docx_file)
-        
-        # Estrae il testo da tutti i paragrafi
-        paragraphs = [paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip()]
-        
-        # Estrae il testo dalle tabelle (opzionale)
-        tables_text = []
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = [cell.text for cell in row.cells if cell.text.strip()]
-                if row_text:
-                    tables_text.append(" | ".join(row_text))
-        
         # Combina paragrafi e tabelle
-        all_text = paragraphs + tables_text
-        full_text = "\n\n".join(all_text)
+        full_text = "\n\n".join(iter_docx_blocks(file_content))
         
         return full_text
     
@@ -1,10 +1,32 @@
 """
 Estrattore di testo da file HTML e pagine web.
 """
-from typing import Optional
+from typing import Iterator, Optional, Union
 from bs4 import BeautifulSoup
 
 
+def iter_html_lines(html_content: Union[str, bytes]) -> Iterator[str]:
+    """
+    Estrae il testo da contenuto HTML una riga alla volta.
+    
+    Args:
+        html_content: Contenuto HTML (stringa o byte)
+        
+    Yields:
+        Righe di testo non vuote (senza tag)
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # Rimuove script, style e altri elementi non testuali
+    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
+        element.decompose()
+    
+    for text in soup.stripped_strings:
+        for line in text.split('\n'):
+            if line.strip():
+                yield line.strip()
+
+
 def extract_from_html(html_content: str) -> str:
     """
     Estrae il testo da contenuto HTML.
@@ -16,18 +38,8 @@ def extract_from_html(html_content: str) -> str:
         Testo estratto dall'HTML (senza tag)
     """
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Rimuove script, style e altri elementi non testuali
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-            element.decompose()
-        
-        # Estrae il testo
-        text = soup.get_text(separator='\n', strip=True)
-        
-        # Pulisce linee vuote multiple
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        text = '\n'.join(lines)
+        # Una riga per ogni blocco di testo, senza linee vuote
+        text = '\n'.join(iter_html_lines(html_content))
         
         return text
     
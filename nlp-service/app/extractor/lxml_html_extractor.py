@@ -0,0 +1,60 @@
+"""
+Estrattore di testo HTML basato direttamente su lxml, più veloce di
+BeautifulSoup con html.parser a parità di righe estratte.
+"""
+from typing import Iterator, Union
+from lxml import html
+
+
+# Elementi non testuali rimossi insieme al loro contenuto (come in html_extractor)
+_SKIPPED_TAGS = ('script', 'style', 'nav', 'footer', 'header', 'aside')
+
+_UTF8_PARSER = html.HTMLParser(encoding='utf-8')
+
+
+def iter_html_lines_lxml(html_content: Union[str, bytes]) -> Iterator[str]:
+    """
+    Estrae il testo da contenuto HTML una riga alla volta.
+    
+    Args:
+        html_content: Contenuto HTML (stringa o byte)
+    
+    Yields:
+        Righe di testo non vuote (senza tag)
+    """
+    if not html_content or not html_content.strip():
+        return
+    
+    # Senza charset dichiarato lxml assume latin-1: i byte validi in UTF-8 si leggono come UTF-8
+    parser = _UTF8_PARSER
+    if isinstance(html_content, str):
+        html_content = html_content.encode('utf-8')
+    else:
+        try:
+            html_content.decode('utf-8')
+        except UnicodeDecodeError:
+            parser = None
+    
+    root = html.fromstring(html_content, parser=parser)
+    
+    for text in _iter_strings(root):
+        for line in text.split('\n'):
+            if line.strip():
+                yield line.strip()
+
+
+def _iter_strings(element) -> Iterator[str]:
+    """
+    Testi dell'elemento e dei discendenti nell'ordine del documento, uno per nodo
+    di testo come stripped_strings di BeautifulSoup. Commenti, istruzioni di
+    elaborazione ed elementi non testuali vengono saltati, ma non il testo che li segue.
+    """
+    if not isinstance(element.tag, str) or element.tag in _SKIPPED_TAGS:
+        return
+    
+    if element.text:
+        yield element.text
+    for child in element:
+        yield from _iter_strings(child)
+        if child.tail:
+            yield child.tail
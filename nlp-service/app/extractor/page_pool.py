@@ -0,0 +1,124 @@
+"""
+Estrazione parallela delle pagine di un PDF su un pool di processi condiviso
+dai backend (PyPDF2, PDFium).
+
+I processi del pool non vengono creati con fork: il servizio ha già avviato
+thread (pool di torch, scheduler, executor) e un fork ne copierebbe lock e
+stato in modo inconsistente. Si usa forkserver dove disponibile, altrimenti spawn.
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+
+
+# Pool di processi condiviso per l'estrazione parallela (creato al primo utilizzo)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Restituisce il pool di processi condiviso, ricreandolo se cambia il numero di worker.
+    """
+    global _pool, _pool_workers
+    
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_workers = workers
+        return _pool
+
+
+def as_file_path(file: Union[str, bytes, BinaryIO]) -> Tuple[str, bool]:
+    """
+    Restituisce un percorso su disco per il PDF, creando un file temporaneo se necessario.
+    
+    Returns:
+        Percorso del file e True se il file è temporaneo (da eliminare)
+    """
+    if isinstance(file, str):
+        return file, False
+    
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        if isinstance(file, (bytes, bytearray)):
+            tmp.write(file)
+        else:
+            shutil.copyfileobj(file, tmp)
+        return tmp.name, True
+
+
+def iter_parallel_pages(
+    file: Union[str, bytes, BinaryIO],
+    count_pages: Callable[[str], int],
+    extract_range: Callable[[str, int, int, float], List[str]],
+    workers: int = 4,
+    pages_per_task: int = 8,
+    page_timeout: float = 30.0,
+    interruptible: bool = True
+) -> Iterator[str]:
+    """
+    Distribuisce gli intervalli di pagine di un PDF sul pool e ne restituisce il
+    testo nell'ordine del documento, appena è pronto l'intervallo che lo contiene.
+    
+    Args:
+        file: Percorso del PDF, contenuto binario oppure file binario aperto
+        count_pages: Funzione che legge il numero di pagine dal percorso
+        extract_range: Task del pool (funzione di modulo): testo delle pagine [start, end)
+        workers: Numero di processi del pool
+        pages_per_task: Numero di pagine assegnate a ogni task
+        page_timeout: Tempo massimo (in secondi) per una singola pagina (0 = nessun limite)
+        interruptible: True se il task applica da sé il limite per pagina (SIGALRM);
+            altrimenti il limite vale per l'intero task, misurato dal processo principale
+    
+    Yields:
+        Testo di ogni pagina non vuota, nell'ordine del documento
+    """
+    path, temporary = as_file_path(file)
+    futures = []
+    
+    try:
+        page_count = count_pages(path)
+        pool = get_pool(workers)
+        
+        ranges = [
+            (start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, max(1, pages_per_task))
+        ]
+        futures = [
+            pool.submit(extract_range, path, start, end, page_timeout)
+            for start, end in ranges
+        ]
+        
+        # Senza SIGALRM (es. Windows) o con codice nativo non interrompibile
+        # il limite viene applicato dal processo principale
+        wait_timeout = None
+        if page_timeout > 0 and not (interruptible and hasattr(signal, "SIGALRM")):
+            wait_timeout = page_timeout * pages_per_task
+        
+        for future in futures:
+            try:
+                texts = future.result(timeout=wait_timeout)
+            except FuturesTimeout:
+                texts = []
+            
+            for text in texts:
+                if text:
+                    yield text
+    
+    finally:
+        for future in futures:
+            future.cancel()
+        if temporary:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -1,9 +1,117 @@
 """
 Estrattore di testo da file PDF.
 """
-from typing import Optional
+from typing import BinaryIO, Iterator, List, Union
 import PyPDF2
 from io import BytesIO
+import mmap
+import signal
+
+from .page_pool import iter_parallel_pages
+
+
+def iter_pdf_pages(file: Union[bytes, BinaryIO]) -> Iterator[str]:
+    """
+    Estrae il testo di un PDF una pagina alla volta.
+    
+    Args:
+        file: Contenuto binario del PDF oppure file binario aperto (non viene copiato in memoria)
+        
+    Yields:
+        Testo di ogni pagina non vuota, nell'ordine del documento
+    """
+    source = BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+    pdf_reader = PyPDF2.PdfReader(source)
+    
+    for page in pdf_reader.pages:
+        text = page.extract_text()
+        
+        if text:
+            yield text
+
+
+def iter_pdf_pages_parallel(
+    file: Union[str, bytes, BinaryIO],
+    workers: int = 4,
+    pages_per_task: int = 8,
+    page_timeout: float = 30.0
+) -> Iterator[str]:
+    """
+    Estrae il testo di un PDF distribuendo gli intervalli di pagine su un pool di processi.
+    
+    Ogni worker apre il PDF tramite un memory map dello stesso file su disco, quindi
+    il contenuto non viene copiato verso i processi. Le pagine vengono restituite
+    nell'ordine del documento, appena è pronto l'intervallo che le contiene.
+    Una pagina che supera `page_timeout` secondi viene saltata.
+    
+    Args:
+        file: Percorso del PDF, contenuto binario oppure file binario aperto
+        workers: Numero di processi del pool
+        pages_per_task: Numero di pagine assegnate a ogni task
+        page_timeout: Tempo massimo (in secondi) per una singola pagina (0 = nessun limite)
+        
+    Yields:
+        Testo di ogni pagina non vuota, nell'ordine del documento
+    """
+    return iter_parallel_pages(
+        file, _read_page_count, _extract_page_range, workers, pages_per_task, page_timeout
+    )
+
+
+def _read_page_count(path: str) -> int:
+    """
+    Legge il numero di pagine del PDF (solo la struttura, senza estrarre testo).
+    """
+    with open(path, 'rb') as pdf_file:
+        buffer = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return len(PyPDF2.PdfReader(buffer).pages)
+        finally:
+            buffer.close()
+
+
+class _PageTimeout(Exception):
+    pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise _PageTimeout()
+
+
+def _extract_page_text(page, page_timeout: float) -> str:
+    """
+    Estrae il testo di una pagina, interrompendola dopo `page_timeout` secondi
+    (dove SIGALRM è disponibile; i task del pool girano nel thread principale del worker).
+    """
+    if page_timeout <= 0 or not hasattr(signal, "SIGALRM"):
+        return page.extract_text() or ""
+    
+    previous = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+    try:
+        return page.extract_text() or ""
+    except _PageTimeout:
+        return ""
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_page_range(path: str, start: int, end: int, page_timeout: float) -> List[str]:
+    """
+    Task del pool: estrae le pagine [start, end) leggendo il PDF tramite memory map.
+    """
+    with open(path, 'rb') as pdf_file:
+        buffer = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pdf_reader = PyPDF2.PdfReader(buffer)
+            return [
+                _extract_page_text(pdf_reader.pages[page_num], page_timeout)
+                for page_num in range(start, end)
+            ]
+        finally:
+            pdf_reader = None
+            buffer.close()
 
 
 def extract_from_pdf(file_content: bytes) -> str:
@@ -16,22 +124,9 @@ def extract_from_pdf(file_content: bytes) -> str:
     Returns:
         Testo estratto dal PDF
     """
-    text_parts = []
-    
     try:
-        pdf_file = BytesIO(file_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        # Estrae il testo da ogni pagina
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-            
-            if text:
-                text_parts.append(text)
-        
         # Combina il testo di tutte le pagine
-        full_text = "\n\n".join(text_parts)
+        full_text = "\n\n".join(iter_pdf_pages(file_content))
         
         return full_text
     
@@ -1,7 +1,58 @@
 """
 Estrattore di testo da file di testo semplice.
 """
-from typing import Optional
+from typing import BinaryIO, Iterator, Optional, Union
+import codecs
+
+
+def iter_txt_blocks(
+    file: Union[bytes, BinaryIO],
+    encoding: str = 'utf-8',
+    block_size: int = 64 * 1024
+) -> Iterator[str]:
+    """
+    Decodifica un file di testo a blocchi, senza caricarlo tutto in memoria.
+    
+    L'encoding viene verificato sul primo blocco: se non è valido si usa il primo
+    encoding alternativo che lo decodifica. Eventuali errori nei blocchi successivi
+    vengono sostituiti con il carattere di rimpiazzo.
+    
+    Args:
+        file: Contenuto binario del file oppure file binario aperto
+        encoding: Encoding del testo (default: utf-8)
+        block_size: Dimensione in byte di ogni blocco letto
+        
+    Yields:
+        Blocchi di testo decodificato
+    """
+    if isinstance(file, (bytes, bytearray)):
+        yield extract_from_txt(bytes(file), encoding)
+        return
+    
+    first = file.read(block_size)
+    block = file.read(block_size)
+    
+    for candidate in [encoding, 'latin-1', 'cp1252', 'iso-8859-1']:
+        decoder = codecs.getincrementaldecoder(candidate)(errors='strict')
+        try:
+            text = decoder.decode(first, final=not block)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise Exception("Impossibile decodificare il file di testo")
+    
+    # Dopo il primo blocco l'encoding è fissato: gli errori vengono rimpiazzati
+    decoder.errors = 'replace'
+    if text:
+        yield text
+    
+    while block:
+        next_block = file.read(block_size)
+        text = decoder.decode(block, final=not next_block)
+        if text:
+            yield text
+        block = next_block
 
 
 def extract_from_txt(file_content: bytes, encoding: str = 'utf-8') -> str:
@@ -0,0 +1,264 @@
+"""
+Coda persistente dei job di summarization asincroni (SQLite).
+
+Ogni job conserva la richiesta originale, il profilo di decoding scelto al
+primo avvio e, man mano che vengono generati, i riassunti dei singoli chunk:
+dopo un crash il job torna disponibile alla scadenza del lease e riparte con
+lo stesso profilo, saltando i chunk già completati.
+"""
+from typing import Dict, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    request TEXT NOT NULL,
+    profile TEXT,
+    chunks_total INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (job_id, level, idx)
+);
+"""
+
+
+class JobStore:
+    """
+    Job e riassunti parziali su SQLite, condivisibili tra più processi worker.
+
+    Stati di un job: "queued" -> "running" -> "done" oppure "failed".
+    Un job "running" il cui lease non viene rinnovato entro `lease_seconds`
+    (processo terminato) può essere preso in carico da un altro worker.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 60.0, max_attempts: int = 3):
+        """
+        Inizializza la coda.
+
+        Args:
+            db_path: Percorso del database SQLite
+            lease_seconds: Secondi senza heartbeat dopo cui un job "running" viene ripreso
+            max_attempts: Tentativi massimi per job prima di segnarlo come fallito
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connessione del processo corrente, aperta al primo uso (e dopo un fork).
+        """
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None, timeout=30.0
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            # Database creati prima della colonna del profilo
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+            if "profile" not in columns:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN profile TEXT")
+            self._db_pid = os.getpid()
+        return self._db
+
+
+    def create(self, request: dict, priority: int = 0) -> str:
+        """
+        Accoda un nuovo job e ne restituisce l'id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO jobs (id, status, priority, request, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, priority, json.dumps(request, ensure_ascii=False), now, now)
+            )
+        return job_id
+
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Stato e avanzamento di un job (None se non esiste).
+        """
+        with self._lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT id, status, priority, profile, chunks_total, level, attempts, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            chunks_done = db.execute(
+                "SELECT COUNT(*) FROM job_chunks WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+
+        keys = (
+            "id", "status", "priority", "profile", "chunks_total", "level", "attempts", "error",
+            "created_at", "updated_at"
+        )
+        return dict(zip(keys, row), chunks_done=chunks_done)
+
+
+    def result(self, job_id: str) -> Optional[dict]:
+        """
+        Risultato di un job completato (None se non disponibile).
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+
+    def claim(self) -> Optional[Tuple[str, dict]]:
+        """
+        Prende in carico il prossimo job: priorità più alta, poi il più vecchio.
+        Sono candidati i job in coda e quelli "running" con lease scaduto.
+
+        Returns:
+            Id e richiesta del job, oppure None se la coda è vuota
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            # BEGIN IMMEDIATE: un solo processo alla volta può prendere in carico un job
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Job abbandonati oltre il numero massimo di tentativi
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Numero massimo di tentativi superato', "
+                    "updated_at = ? WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                    (now, now - self.lease_seconds, self.max_attempts)
+                )
+                row = db.execute(
+                    "SELECT id, request FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (now - self.lease_seconds,)
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (now, row[0])
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+
+    def heartbeat(self, job_id: str):
+        """
+        Rinnova il lease di un job in esecuzione.
+        """
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            )
+
+
+    def pin_profile(self, job_id: str, profile: str) -> str:
+        """
+        Registra il profilo risolto al primo avvio del job e restituisce quello
+        registrato: dopo una ripresa il job continua con il profilo originale.
+        """
+        with self._lock:
+            db = self._connection()
+            db.execute("UPDATE jobs SET profile = COALESCE(profile, ?) WHERE id = ?", (profile, job_id))
+            row = db.execute("SELECT profile FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else profile
+
+
+    def set_progress(self, job_id: str, level: int, chunks_total: int):
+        """
+        Aggiorna livello corrente e numero totale di chunk noti del job.
+        """
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET level = ?, chunks_total = ?, updated_at = ? WHERE id = ?",
+                (level, chunks_total, time.time(), job_id)
+            )
+
+
+    def chunk_summaries(self, job_id: str) -> Dict[Tuple[int, int], str]:
+        """
+        Riassunti dei chunk già completati, indicizzati per (livello, indice).
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT level, idx, summary FROM job_chunks WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {(level, idx): summary for level, idx, summary in rows}
+
+
+    def save_chunk(self, job_id: str, level: int, idx: int, summary: str):
+        """
+        Salva il riassunto di un chunk e rinnova il lease del job.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO job_chunks (job_id, level, idx, summary) VALUES (?, ?, ?, ?)",
+                (job_id, level, idx, summary)
+            )
+            db.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+
+
+    def complete(self, job_id: str, result: dict):
+        """
+        Segna il job come completato e ne salva il risultato.
+        """
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = 'done', result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+            )
+
+
+    def fail(self, job_id: str, error: str):
+        """
+        Segna il job come fallito.
+        """
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+
+
+    def stats(self) -> dict:
+        """
+        Numero di job per stato.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
@@ -0,0 +1,179 @@
+"""
+Avvio multi-worker del servizio NLP con i pesi del modello condivisi.
+
+Il processo principale carica il modello una sola volta, apre il socket in
+ascolto e crea i worker con fork(): le pagine dei pesi restano condivise in
+copy-on-write, quindi N worker occupano circa la memoria di un solo modello.
+Ogni worker viene vincolato a un gruppo di core e usa un thread torch per core.
+Con NLP_REPLICAS=auto lo split repliche × thread viene calibrato una sola volta,
+prima dei worker, che poi leggono soltanto la calibrazione salvata.
+
+Utilizzo (dalla cartella nlp-service):
+    python app/launcher.py --workers 4
+    python app/launcher.py --workers 2 --threads-per-worker 4 --port 8000
+"""
+from typing import Dict, List
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+import torch
+import uvicorn
+
+from replicas import check_partitions, partition_cores, replica_split
+import config
+import main
+
+
+def _bind_worker(index: int, workers: int, threads: int) -> List[int]:
+    """
+    Vincola il processo corrente ai core del worker `index` e ne imposta i thread torch.
+    Anche senza pinning le repliche del worker si dividono solo i suoi core.
+    """
+    cores = partition_cores(index, workers, threads)
+    if config.PIN_WORKERS and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    main.worker_cores = cores
+    return cores
+
+
+def _run_worker(index: int, sock: socket.socket, workers: int, threads: int, log_level: str):
+    """
+    Corpo del processo worker: pinning, thread torch e server uvicorn sul socket condiviso.
+    """
+    # Segnali di default finché uvicorn non installa i propri
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    cores = _bind_worker(index, workers, threads)
+    print(f"Worker {index} (pid {os.getpid()}): core {cores}, {len(cores)} thread torch")
+
+    # Warm-up e scheduler vengono avviati dal lifespan dell'app, in ogni worker
+    server = uvicorn.Server(uvicorn.Config(main.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def _calibrate(workers: int, threads: int):
+    """
+    Calibra lo split repliche × thread (NLP_REPLICAS=auto) in un processo figlio
+    sui core di un worker (anche senza pinning), se manca una calibrazione valida.
+
+    Il padre non esegue mai inferenza: il pool di thread di torch creato qui
+    verrebbe ereditato in stato incoerente dai worker. I worker leggono poi la
+    calibrazione salvata invece di ripeterla ognuno per conto proprio.
+    """
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            cores = _bind_worker(0, workers, threads)
+            print(f"Calibrazione dello split repliche × thread su {len(cores)} core...")
+            replicas, replica_threads = replica_split(
+                main.preloaded, 0, 0, config.REPLICA_TUNING_PATH, cores=cores,
+                max_batch_size=config.SCHEDULER_MAX_BATCH_SIZE, pin_cores=config.PIN_WORKERS
+            )
+            print(f"✓ Split: {replicas} repliche × {replica_threads} thread ({config.REPLICA_TUNING_PATH})")
+        except Exception as e:
+            print(f"✗ Calibrazione fallita, i worker useranno una sola replica: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    os.waitpid(pid, 0)
+
+
+def serve(host: str, port: int, workers: int, threads: int = 0, log_level: str = "info"):
+    """
+    Avvia il servizio con `workers` processi che condividono il modello.
+    Con un solo worker, o dove fork() non è disponibile, avvia un processo singolo.
+    """
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(main.app, host=host, port=port, log_level=log_level)
+        return
+
+    if config.MODEL_BACKEND == "torch" and torch.cuda.is_available():
+        raise RuntimeError("Il launcher multi-worker supporta solo CPU: CUDA non sopravvive al fork")
+
+    # Worker con core sovrapposti si contenderebbero gli stessi core: errore prima di caricare il modello
+    check_partitions(workers, threads)
+
+    # Il padre carica i pesi con un solo thread: al momento del fork non esiste
+    # ancora un pool intra-op di torch che i figli erediterebbero in stato incoerente
+    config.TORCH_NUM_THREADS = 1
+    main.preload_model()
+    print(f"Modello caricato in {main.model_state['load_seconds']}s, avvio di {workers} worker")
+
+    if config.REPLICAS == 0:
+        _calibrate(workers, threads)
+
+    # Gli oggetti esistenti escono dalla garbage collection: i worker non ne
+    # riscrivono le intestazioni e le pagine condivise non vengono copiate
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def _spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(index, sock, workers, threads, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for index in range(workers):
+        _spawn(index)
+
+    # Supervisione: un worker terminato in modo inatteso viene ricreato dal padre,
+    # che possiede ancora i pesi condivisi
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"✗ Worker {index} (pid {pid}) terminato con stato {status}, riavvio")
+            time.sleep(1)
+            _spawn(index)
+
+    sock.close()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Avvio multi-worker del servizio NLP")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WORKERS)
+    parser.add_argument("--threads-per-worker", type=int, default=config.WORKER_THREADS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.threads_per_worker, args.log_level)
+
+
+if __name__ == "__main__":
+    main_cli()
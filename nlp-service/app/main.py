@@ -2,31 +2,266 @@
 Controller principale del servizio NLP.
 Gestisce le richieste HTTP e coordina le operazioni di summarization.
 """
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from functools import partial
+from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, AsyncIterator, Dict, FrozenSet, List, Literal, Optional, Tuple
+import asyncio
+import json
+import threading
+import time
 import uvicorn
 
-from summarizer import Summarizer
-from cleaning import clean_text
-from chunking import chunk_text
+from profiles import DECODING_PROFILES
+from scheduler import BatchScheduler, QueueFullError
+from replicas import create_replica_scheduler, replica_split
+from cache import SummaryCache, make_cache_key
+from jobs import JobStore
+from documents import DocumentStore
+from metrics import StageTimer
+import metrics
+from cleaning import clean_text_and_acronyms, extract_acronyms, iter_clean_text
+from dedup import PageDeduplicator, deduplicate_text
+from chunking import TokenChunk
+from extractor import ExtractionError, available_backends, detect_format, iter_text, prefer_backends
+from extractive import select_sentences
+import config
 
-app = FastAPI(title="NLP Summarization Service")
+# torch e transformers vengono importati solo al caricamento del modello (vedi _create_summarizer)
+if TYPE_CHECKING:
+    from summarizer import Summarizer
 
-# Inizializza il summarizer con mT5
-summarizer = Summarizer()
+# Modello e scheduler vengono creati in background all'avvio (vedi _load_model)
+summarizer: Optional["Summarizer"] = None
+scheduler: Optional[BatchScheduler] = None
+
+# Modello già caricato dal launcher prima del fork dei worker (vedi preload_model)
+preloaded: Optional["Summarizer"] = None
+# Core del worker assegnati dal launcher, anche senza pinning (None = core del processo)
+worker_cores: Optional[List[int]] = None
+
+# Stato del modello: "loading" -> "warming_up" (-> "tuning") -> "ready", oppure "failed"
+model_state = {
+    "status": "loading", "error": None, "import_seconds": None, "load_seconds": None, "warmup_seconds": None,
+    "replicas": None, "replica_threads": None
+}
+
+
+def _create_summarizer() -> "Summarizer":
+    """
+    Inizializza il summarizer con la configurazione del servizio e misura il caricamento
+    (import di torch e transformers compreso, riportato a parte).
+    """
+    started = time.perf_counter()
+    from summarizer import Summarizer
+    model_state["import_seconds"] = round(time.perf_counter() - started, 3)
+    
+    started = time.perf_counter()
+    loaded = Summarizer(
+        config.MODEL_NAME,
+        num_threads=config.TORCH_NUM_THREADS,
+        backend=config.MODEL_BACKEND,
+        onnx_dir=config.ONNX_DIR or None,
+        snapshot_dir=config.MODEL_SNAPSHOT_DIR or None
+    )
+    model_state["load_seconds"] = round(time.perf_counter() - started, 3)
+    return loaded
+
+
+def preload_model() -> "Summarizer":
+    """
+    Carica il modello nel processo corrente senza avviare thread né inferenza.
+    Usato dal launcher multi-worker: i processi creati dopo con fork condividono
+    le pagine dei pesi in copy-on-write invece di caricarne una copia ciascuno.
+    """
+    global preloaded
+    preloaded = _create_summarizer()
+    return preloaded
+
+
+def _create_scheduler(loaded: "Summarizer") -> BatchScheduler:
+    """
+    Crea lo scheduler condiviso: un solo summarizer oppure, con NLP_REPLICAS > 1,
+    un pool di repliche con i core partizionati. Con NLP_REPLICAS=auto lo split
+    repliche × thread viene dalla calibrazione salvata, eseguita ora se manca;
+    i worker del launcher (modello precaricato) la leggono soltanto.
+    """
+    scheduler_args = dict(
+        max_batch_size=config.SCHEDULER_MAX_BATCH_SIZE,
+        max_wait_ms=config.SCHEDULER_MAX_WAIT_MS,
+        max_queue_size=config.SCHEDULER_MAX_QUEUE_SIZE
+    )
+    
+    if config.REPLICAS == 0:
+        model_state["status"] = "tuning"
+    replicas, threads = replica_split(
+        loaded, config.REPLICAS, config.REPLICA_THREADS, config.REPLICA_TUNING_PATH,
+        tune=preloaded is None, cores=worker_cores,
+        max_batch_size=config.SCHEDULER_MAX_BATCH_SIZE, pin_cores=config.PIN_WORKERS
+    )
+    
+    model_state["replicas"] = max(1, replicas)
+    if replicas <= 1:
+        return BatchScheduler(loaded, **scheduler_args)
+    
+    pool = create_replica_scheduler(
+        loaded, replicas, threads, pin_cores=config.PIN_WORKERS, cores=worker_cores, **scheduler_args
+    )
+    model_state["replica_threads"] = len(pool.replicas[0].cores)
+    print(f"✓ {replicas} repliche del modello, core: {[replica.cores for replica in pool.replicas]}")
+    return pool
+
+
+def _load_model():
+    """
+    Carica il modello, esegue il warm-up e avvia lo scheduler.
+    Eseguito in un thread separato, così il processo risponde subito a /live.
+    """
+    global summarizer, scheduler
+    
+    try:
+        # Inizializza il summarizer con mT5 (se non già caricato dal launcher)
+        loaded = preloaded if preloaded is not None else _create_summarizer()
+        
+        # Warm-up: la prima richiesta reale non paga l'inizializzazione dei kernel
+        model_state["status"] = "warming_up"
+        model_state["warmup_seconds"] = round(loaded.warmup(config.WARMUP_BATCH_SIZES), 3)
+        
+        # Scheduler condiviso: raccoglie i chunk di tutte le richieste in batch
+        scheduler = _create_scheduler(loaded)
+        summarizer = loaded
+        model_state["status"] = "ready"
+    
+    except Exception as e:
+        model_state["status"] = "failed"
+        model_state["error"] = str(e)
+        print(f"✗ Caricamento del modello fallito: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=_load_model, name="model-loader", daemon=True).start()
+    # Worker dei job asincroni: attendono il modello, poi consumano la coda persistente
+    job_workers = [asyncio.create_task(_job_worker()) for _ in range(config.JOB_WORKERS)]
+    yield
+    for task in job_workers:
+        task.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    if scheduler is not None:
+        scheduler.shutdown()
+
+
+def _require_ready():
+    """
+    Interrompe la richiesta con 503 se il modello non è ancora pronto.
+    """
+    if model_state["status"] != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail=f"Modello non pronto (stato: {model_state['status']})",
+            headers={"Retry-After": "5"}
+        )
+
+
+app = FastAPI(title="NLP Summarization Service", lifespan=lifespan)
+
+# Backend di estrazione scelti da configurazione (gli altri formati usano il più veloce disponibile)
+prefer_backends(config.EXTRACTOR_BACKENDS)
+
+# Cache dei riassunti (documento intero e singoli chunk)
+summary_cache = SummaryCache(
+    max_bytes=config.CACHE_MAX_BYTES,
+    db_path=config.CACHE_DB_PATH or None
+)
+
+# Coda persistente dei job asincroni
+job_store = JobStore(config.JOBS_DB_PATH, lease_seconds=config.JOB_LEASE_SECONDS)
+# Ultima versione dei documenti riassunti con document_id (riassunto incrementale)
+document_store = DocumentStore(config.DOCUMENTS_DB_PATH)
+# Segnala ai worker l'arrivo di nuovi job (altrimenti controllano la coda periodicamente)
+job_available = asyncio.Event()
+
+# Pool limitato per pulizia e chunking, così l'event loop resta libero
+preprocess_executor = ThreadPoolExecutor(
+    max_workers=config.PREPROCESS_WORKERS,
+    thread_name_prefix="preprocess"
+)
+# Pool dedicato alle chiamate SQLite (cache, job, documenti): brevi, ma bloccanti
+# per l'event loop e da non accodare dietro a pulizia e chunking
+store_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="store")
 
 
 class SummarizationRequest(BaseModel):
     text: str
     max_length: Optional[int] = 150
     min_length: Optional[int] = 50
+    # "concat": unisce i riassunti dei chunk; "hierarchical": riassume ricorsivamente i riassunti
+    mode: Literal["concat", "hierarchical"] = "concat"
+    # Profilo di decoding; "auto" sceglie in base al carico dello scheduler
+    profile: Literal["auto", "fast", "balanced", "quality"] = "auto"
+    # Pre-filtraggio estrattivo: frazione di frasi da mantenere (None = disabilitato)
+    extractive_ratio: Optional[float] = Field(None, gt=0, le=1)
+    # Budget massimo di token delle frasi mantenute dal pre-filtraggio
+    extractive_max_tokens: Optional[int] = Field(None, gt=0)
+    # Identificativo del documento: rigenera solo i chunk cambiati rispetto alla versione precedente
+    document_id: Optional[str] = Field(None, min_length=1, max_length=256)
+    # Rimozione dei segmenti ripetuti tra paragrafi (None = NLP_DEDUP_TEXT)
+    dedup: Optional[bool] = None
+
+
+class LevelInfo(BaseModel):
+    level: int
+    chunks: int
+    seconds: float
+
+
+class ExtractiveInfo(BaseModel):
+    sentences_kept: int
+    sentences_total: int
+
+
+class DedupInfo(BaseModel):
+    segments_removed: int
+    tokens_removed: int
+
+
+class IncrementalInfo(BaseModel):
+    chunks_total: int
+    chunks_reused: int
 
 
 class SummarizationResponse(BaseModel):
     summary: str
     original_length: int
     summary_length: int
+    levels: Optional[List[LevelInfo]] = None
+    profile: Optional[str] = None
+    extractive: Optional[ExtractiveInfo] = None
+    incremental: Optional[IncrementalInfo] = None
+    dedup: Optional[DedupInfo] = None
+    # Durata degli stadi in millisecondi, solo con l'header X-Debug-Timing
+    timings: Optional[Dict[str, float]] = None
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    """
+    Conta le richieste per endpoint (percorso della route) e codice di stato.
+    """
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.REQUESTS.inc(endpoint=getattr(route, "path", "other"), status=response.status_code)
+    return response
+
+
+def _debug_timing(request: Request) -> bool:
+    """
+    True se il client ha chiesto il dettaglio dei tempi per stadio (X-Debug-Timing: 1).
+    """
+    return request.headers.get("x-debug-timing", "").lower() in ("1", "true", "yes")
 
 
 @app.get("/")
@@ -34,44 +269,1140 @@ async def root():
     return {"message": "NLP Summarization Service", "status": "running"}
 
 
+@app.get("/live")
+async def liveness():
+    """
+    Liveness probe: il processo risponde (anche durante il caricamento del modello).
+    """
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 200 solo quando il modello è caricato e riscaldato.
+    """
+    status_code = 200 if model_state["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=dict(model_state, model=config.MODEL_NAME))
+
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model": "ARTeLab/it5-summarization-mlsum"}
+    ready = model_state["status"] == "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "healthy" if ready else model_state["status"],
+            "model": config.MODEL_NAME,
+            "backend": config.MODEL_BACKEND,
+            "error": model_state["error"]
+        }
+    )
+
+
+@app.get("/stats")
+async def service_stats():
+    """
+    Metriche dello scheduler di batching e della cache dei riassunti.
+    """
+    return {
+        "model": model_state,
+        "scheduler": scheduler.stats() if scheduler is not None else None,
+        "cache": await _store_call(summary_cache.stats),
+        "jobs": await _store_call(job_store.stats),
+        "documents": await _store_call(document_store.stats),
+        "extractors": available_backends()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Metriche del processo in formato testuale Prometheus.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _resolve_profile(profile: str) -> str:
+    """
+    Risolve il profilo "auto": con la coda dello scheduler profonda si riduce la
+    beam search, per contenere la latenza di coda durante i picchi di carico.
+    """
+    if profile != "auto":
+        return profile
+    
+    depth = scheduler.queue_depth()
+    if depth >= config.AUTO_PROFILE_FAST_DEPTH:
+        return "fast"
+    if depth >= config.AUTO_PROFILE_BALANCED_DEPTH:
+        return "balanced"
+    return "quality"
+
+
+def _cache_key(level: str, text: str, max_length: int, min_length: int, profile: str) -> str:
+    """
+    Chiave di cache per un testo con i parametri di generazione del profilo.
+    """
+    params = dict(DECODING_PROFILES[profile], max_length=max_length, min_length=min_length)
+    # Backend diversi possono produrre riassunti diversi: fanno parte della chiave
+    return make_cache_key(level, text, f"{summarizer.model_name}:{summarizer.backend}", params)
+
+
+def _version_key(level: str, text: str, max_length: int, min_length: int, profile: str) -> str:
+    """
+    Chiave del riassunto incrementale con il profilo richiesto dal client (anche
+    "auto"): le versioni salvate restano valide quando il carico cambia la risoluzione.
+    """
+    params = dict(profile=profile, max_length=max_length, min_length=min_length)
+    return make_cache_key(level, text, f"{summarizer.model_name}:{summarizer.backend}", params)
+
+
+def _chunk(cleaned_text: str, content_defined: bool = False) -> List[TokenChunk]:
+    """
+    Chunking sul limite di input reale del modello (vedi Summarizer.chunk).
+    """
+    chunks = summarizer.chunk(
+        cleaned_text, overlap=config.CHUNK_OVERLAP_TOKENS, content_defined=content_defined
+    )
+    metrics.CHUNKS.inc(len(chunks))
+    return chunks
+
+
+def _count_tokens(sentences: List[str]) -> List[int]:
+    """
+    Conta i token di più frasi con un'unica chiamata al tokenizer.
+    """
+    encoded = summarizer.tokenizer(sentences, add_special_tokens=False)["input_ids"]
+    return [len(ids) for ids in encoded]
+
+
+def _token_counter():
+    """
+    Conteggio esatto dei token con un tokenizer "fast", altrimenti None (stima).
+    """
+    return _count_tokens if getattr(summarizer.tokenizer, "is_fast", False) else None
+
+
+def _deduplicator(enabled: Optional[bool], paged: bool = True) -> Optional[PageDeduplicator]:
+    """
+    Deduplicatore delle pagine se la deduplicazione è attiva (None = NLP_DEDUP per
+    i documenti impaginati, NLP_DEDUP_TEXT per i testi semplici).
+    """
+    if enabled is None:
+        enabled = config.DEDUP_ENABLED if paged else config.DEDUP_TEXT_ENABLED
+    if not enabled:
+        return None
+    return PageDeduplicator(
+        similarity=config.DEDUP_SIMILARITY,
+        min_chars=config.DEDUP_MIN_CHARS,
+        token_counter=_token_counter()
+    )
+
+
+def _dedup_info(deduplicator: Optional[PageDeduplicator]) -> Optional[DedupInfo]:
+    if deduplicator is None:
+        return None
+    metrics.DEDUP_TOKENS.inc(deduplicator.stats.tokens_removed)
+    return DedupInfo(
+        segments_removed=deduplicator.stats.segments_removed,
+        tokens_removed=deduplicator.stats.tokens_removed
+    )
+
+
+def _deduplicate(text: str, enabled: Optional[bool]) -> Tuple[str, Optional[DedupInfo]]:
+    """
+    Rimuove da un testo semplice i segmenti ripetuti tra paragrafi prima della
+    pulizia, che unisce le righe e renderebbe invisibili header e footer.
+    """
+    deduplicator = _deduplicator(enabled, paged=False)
+    if deduplicator is None:
+        return text, None
+    text, _ = deduplicate_text(text, deduplicator)
+    return text, _dedup_info(deduplicator)
+
+
+def _prefilter(
+    cleaned_text: str,
+    ratio: Optional[float],
+    max_tokens: Optional[int]
+) -> Tuple[str, Optional[ExtractiveInfo]]:
+    """
+    Pre-filtraggio estrattivo opzionale: mantiene solo le frasi più rilevanti
+    prima dello chunking, riducendo i token da generare con il modello.
+    """
+    if ratio is None and max_tokens is None:
+        return cleaned_text, None
+    
+    token_counter = _token_counter()
+    text, kept, total = select_sentences(
+        cleaned_text,
+        ratio=ratio if ratio is not None else 1.0,
+        max_tokens=max_tokens,
+        method=config.EXTRACTIVE_METHOD,
+        token_counter=token_counter
+    )
+    return text, ExtractiveInfo(sentences_kept=kept, sentences_total=total)
+
+
+async def _store_call(func, *args, **kwargs):
+    """
+    Esegue una chiamata a cache, job o documenti nel pool dei database, fuori dall'event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(store_executor, partial(func, *args, **kwargs))
+
+
+def _cache_get(level: str, keys: List[str]) -> List[Optional[str]]:
+    """
+    Consulta la cache dei riassunti registrando hit e miss per livello
+    (bloccante: va eseguita con _store_call).
+    """
+    values = [summary_cache.get(key) for key in keys]
+    for value in values:
+        metrics.CACHE_REQUESTS.inc(level=level, result="miss" if value is None else "hit")
+    return values
+
+
+def _store_summary(key: str, future: Future):
+    """
+    Callback: salva in cache il riassunto di un chunk appena generato
+    (nel pool dei database, non nel thread del modello).
+    """
+    if not future.cancelled() and future.exception() is None:
+        store_executor.submit(summary_cache.put, key, future.result())
+
+
+def _postprocessed(future: Future, text: str, acronyms: Optional[FrozenSet[str]] = None) -> asyncio.Future:
+    """
+    Future asyncio con il riassunto grezzo di `future` dopo _fix_capitalization.
+    Annullarlo annulla anche il chunk, se è ancora in coda.
+    """
+    loop = asyncio.get_running_loop()
+    source = asyncio.wrap_future(future)
+    result = loop.create_future()
+    
+    def _done(source: asyncio.Future):
+        if result.done():
+            return
+        if source.cancelled():
+            result.cancel()
+        elif source.exception() is not None:
+            result.set_exception(source.exception())
+        else:
+            result.set_result(summarizer._fix_capitalization(source.result(), text, acronyms))
+    
+    source.add_done_callback(_done)
+    result.add_done_callback(lambda _: source.cancel())
+    return result
+
+
+async def _submit_chunks(
+    chunks: List[TokenChunk],
+    max_length: int,
+    min_length: int,
+    profile: str,
+    acronyms: Optional[FrozenSet[str]] = None,
+    known: Optional[Dict[str, str]] = None,
+    admitted: bool = False,
+    postprocess: bool = True
+) -> List[asyncio.Future]:
+    """
+    Avvia il riassunto dei chunk e restituisce un future per ciascuno.
+    
+    I chunk presenti in `known` (riassunti per chiave, es. della versione
+    precedente del documento) o in cache sono già completati; gli altri vengono
+    accodati allo scheduler (che può sollevare QueueFullError) e salvati in cache
+    appena pronti. In cache vanno i riassunti grezzi: il post-processing con gli
+    acronimi del documento viene applicato dopo, così la chiave non dipende da essi.
+    Con admitted=True la richiesta è già stata accettata e non subisce la back-pressure;
+    con postprocess=False i future restituiscono i riassunti grezzi.
+    """
+    loop = asyncio.get_running_loop()
+    keys = [_cache_key("chunk", chunk.text, max_length, min_length, profile) for chunk in chunks]
+    known = known or {}
+    futures: List[Optional[asyncio.Future]] = []
+    missing = []
+    
+    lookup = [key for key in keys if key not in known]
+    found = dict(zip(lookup, await _store_call(_cache_get, "chunk", lookup) if lookup else []))
+    for i, key in enumerate(keys):
+        cached = known.get(key)
+        if cached is None:
+            cached = found[key]
+        if cached is None:
+            missing.append(i)
+            futures.append(None)
+        else:
+            future = loop.create_future()
+            if postprocess:
+                cached = summarizer._fix_capitalization(cached, chunks[i].text, acronyms)
+            future.set_result(cached)
+            futures.append(future)
+    
+    if missing:
+        submitted = scheduler.submit(
+            [chunks[i].text for i in missing],
+            max_length=max_length,
+            min_length=min_length,
+            token_ids=[chunks[i].input_ids for i in missing],
+            profile=profile,
+            postprocess=False,
+            admitted=admitted
+        )
+        for i, future in zip(missing, submitted):
+            future.add_done_callback(partial(_store_summary, keys[i]))
+            if postprocess:
+                futures[i] = _postprocessed(future, chunks[i].text, acronyms)
+            else:
+                futures[i] = asyncio.wrap_future(future)
+    
+    return futures
+
+
+async def _summarize_chunks(
+    chunks: List[TokenChunk],
+    max_length: int,
+    min_length: int,
+    profile: str,
+    acronyms: Optional[FrozenSet[str]] = None
+) -> List[str]:
+    """
+    Riassume i chunk, inviando allo scheduler solo quelli non presenti in cache.
+    """
+    return list(await asyncio.gather(*await _submit_chunks(chunks, max_length, min_length, profile, acronyms)))
+
+
+async def _summarize_incremental(
+    document_id: str,
+    cleaned_text: str,
+    max_length: int,
+    min_length: int,
+    profile: str,
+    requested_profile: str,
+    acronyms: Optional[FrozenSet[str]] = None,
+    timer: Optional[StageTimer] = None
+) -> Tuple[List[str], IncrementalInfo]:
+    """
+    Riassume i chunk di una nuova versione del documento, rigenerando solo quelli
+    cambiati. I confini definiti dal contenuto fanno sì che una modifica locale
+    cambi solo i chunk che la contengono; gli altri hanno la stessa chiave della
+    versione precedente e ne riusano il riassunto.
+    
+    Le versioni sono indicizzate con il profilo richiesto (`requested_profile`),
+    i nuovi chunk generati con quello risolto (`profile`). Come nella cache dei
+    chunk si salvano i riassunti grezzi, senza il post-processing degli acronimi.
+    """
+    loop = asyncio.get_running_loop()
+    timer = timer or StageTimer()
+    version_key = _version_key("version", document_id, max_length, min_length, requested_profile)
+    
+    with timer.stage("chunk"):
+        chunks = await loop.run_in_executor(preprocess_executor, _chunk, cleaned_text, True)
+    previous = await _store_call(document_store.summaries, version_key)
+    
+    with timer.stage("summarize"):
+        keys = [_version_key("chunk", chunk.text, max_length, min_length, requested_profile) for chunk in chunks]
+        # Riassunti della versione precedente sotto la chiave di cache del profilo risolto
+        known = {
+            _cache_key("chunk", chunk.text, max_length, min_length, profile): previous[key]
+            for key, chunk in zip(keys, chunks) if key in previous
+        }
+        raw = list(await asyncio.gather(*await _submit_chunks(
+            chunks, max_length, min_length, profile, acronyms, known=known, postprocess=False
+        )))
+    
+    await _store_call(document_store.put, version_key, document_id, [
+        {"key": key, "start": chunk.start, "end": chunk.end, "summary": summary}
+        for key, chunk, summary in zip(keys, chunks, raw)
+    ])
+    summaries = [
+        summarizer._fix_capitalization(summary, chunk.text, acronyms)
+        for chunk, summary in zip(chunks, raw)
+    ]
+    return summaries, IncrementalInfo(
+        chunks_total=len(chunks),
+        chunks_reused=sum(key in previous for key in keys)
+    )
+
+
+async def _summarize_hierarchical(
+    cleaned_text: str,
+    max_length: int,
+    min_length: int,
+    profile: str,
+    acronyms: Optional[FrozenSet[str]] = None,
+    timer: Optional[StageTimer] = None
+) -> Tuple[str, List[LevelInfo]]:
+    """
+    Riassunto map-reduce: i riassunti di un livello vengono uniti, ri-divisi in
+    chunk e riassunti di nuovo finché non rientrano in un'unica finestra del modello.
+    """
+    loop = asyncio.get_running_loop()
+    timer = timer or StageTimer()
+    levels = []
+    text = cleaned_text
+    
+    for level in range(config.HIERARCHICAL_MAX_LEVELS):
+        started = time.perf_counter()
+        with timer.stage("chunk"):
+            chunks = await loop.run_in_executor(preprocess_executor, _chunk, text)
+        # Tutti i chunk del livello passano insieme dallo scheduler (batch paralleli)
+        with timer.stage("summarize"):
+            summaries = await _summarize_chunks(chunks, max_length, min_length, profile, acronyms)
+        levels.append(LevelInfo(
+            level=level,
+            chunks=len(chunks),
+            seconds=round(time.perf_counter() - started, 4)
+        ))
+        
+        text = " ".join(summaries)
+        if len(chunks) <= 1:
+            break
+    
+    return text, levels
 
 
 @app.post("/summarize", response_model=SummarizationResponse)
-async def summarize_text(request: SummarizationRequest):
+async def summarize_text(request: SummarizationRequest, http_request: Request, response: Response):
     """
     Endpoint per riassumere un testo.
     """
+    _require_ready()
+    timer = StageTimer()
+    
     try:
-        # 1. Pulizia del testo
-        cleaned_text = clean_text(request.text)
-        
-        # 2. Chunking del testo (gestisce il limite di 1024 token)
-        chunks = chunk_text(cleaned_text)
-        
-        # 3. Riassunto di ogni chunk
-        summaries = []
-        for chunk in chunks:
-            summary = summarizer.summarize(
-                chunk, 
-                max_length=request.max_length,
-                min_length=request.min_length
+        loop = asyncio.get_running_loop()
+        levels = None
+        incremental = None
+        profile = _resolve_profile(request.profile)
+        
+        with timer.stage("total"):
+            # 1. Rimozione dei segmenti ripetuti tra pagine (header, footer, disclaimer)
+            with timer.stage("dedup"):
+                text, dedup = await loop.run_in_executor(
+                    preprocess_executor, _deduplicate, request.text, request.dedup
+                )
+            
+            # 1a. Pulizia del testo ed estrazione degli acronimi (una sola scansione del documento)
+            with timer.stage("clean"):
+                cleaned_text, acronyms = await loop.run_in_executor(
+                    preprocess_executor, clean_text_and_acronyms, text
+                )
+            
+            # 1b. Pre-filtraggio estrattivo (opzionale)
+            with timer.stage("prefilter"):
+                cleaned_text, extractive = await loop.run_in_executor(
+                    preprocess_executor,
+                    _prefilter, cleaned_text, request.extractive_ratio, request.extractive_max_tokens
+                )
+            
+            # Documento già riassunto con gli stessi parametri: risposta dalla cache.
+            # Con document_id la cache del documento non si usa: la nuova versione va
+            # sempre registrata e i chunk hanno confini definiti dal contenuto
+            final_summary = None
+            doc_key = _cache_key(
+                f"doc:{request.mode}:tokens", cleaned_text, request.max_length, request.min_length, profile
             )
-            summaries.append(summary)
+            if request.document_id is None:
+                final_summary = (await _store_call(_cache_get, "doc", [doc_key]))[0]
+            
+            if final_summary is None:
+                if request.document_id is not None:
+                    # 2-3. Riassunto incrementale: solo i chunk cambiati rispetto alla versione precedente
+                    started = time.perf_counter()
+                    summaries, incremental = await _summarize_incremental(
+                        request.document_id, cleaned_text, request.max_length, request.min_length,
+                        profile, request.profile, acronyms, timer
+                    )
+                    final_summary = " ".join(summaries)
+                    
+                    if request.mode == "hierarchical":
+                        levels = [LevelInfo(
+                            level=0,
+                            chunks=incremental.chunks_total,
+                            seconds=round(time.perf_counter() - started, 4)
+                        )]
+                        if incremental.chunks_total > 1:
+                            # I livelli successivi riassumono i riassunti, come in _summarize_hierarchical
+                            final_summary, upper = await _summarize_hierarchical(
+                                final_summary, request.max_length, request.min_length, profile, acronyms, timer
+                            )
+                            levels += [info.model_copy(update={"level": info.level + 1}) for info in upper]
+                elif request.mode == "hierarchical":
+                    # 2-4. Chunking e riassunto ricorsivo fino a un'unica finestra
+                    final_summary, levels = await _summarize_hierarchical(
+                        cleaned_text, request.max_length, request.min_length, profile, acronyms, timer
+                    )
+                else:
+                    # 2. Chunking del testo sul limite di token reale del modello
+                    with timer.stage("chunk"):
+                        chunks = await loop.run_in_executor(preprocess_executor, _chunk, cleaned_text)
+                    
+                    # 3. Riassunto dei chunk (cache per chunk + scheduler condiviso)
+                    with timer.stage("summarize"):
+                        summaries = await _summarize_chunks(
+                            chunks, request.max_length, request.min_length, profile, acronyms
+                        )
+                    
+                    # 4. Combina i riassunti
+                    final_summary = " ".join(summaries)
+                
+                if request.document_id is None:
+                    await _store_call(summary_cache.put, doc_key, final_summary)
         
-        # 4. Combina i riassunti
-        final_summary = " ".join(summaries)
+        timings = None
+        if _debug_timing(http_request):
+            timings = timer.breakdown()
+            response.headers["X-Debug-Timing"] = timer.header()
         
         return SummarizationResponse(
             summary=final_summary,
             original_length=len(request.text),
-            summary_length=len(final_summary)
+            summary_length=len(final_summary),
+            levels=levels,
+            profile=profile,
+            extractive=extractive,
+            incremental=incremental,
+            dedup=dedup,
+            timings=timings
+        )
+    
+    except QueueFullError as e:
+        # Servizio saturo: il client deve riprovare più tardi
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        timer.finish()
+
+
+class StreamRequest(SummarizationRequest):
+    # Se True, emette anche i frammenti di testo durante la generazione (decoding greedy)
+    tokens: bool = False
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _stream_chunk_events(futures: List[asyncio.Future]) -> AsyncIterator[dict]:
+    """
+    Emette il riassunto di ogni chunk nell'ordine di completamento.
+    """
+    async def _indexed(index: int, future: asyncio.Future):
+        return index, await future
+    
+    summaries: List[Optional[str]] = [None] * len(futures)
+    try:
+        for next_done in asyncio.as_completed([_indexed(i, f) for i, f in enumerate(futures)]):
+            index, summary = await next_done
+            summaries[index] = summary
+            yield {"type": "chunk", "index": index, "total": len(futures), "summary": summary}
+    finally:
+        # Client disconnesso: i chunk non ancora generati escono dalla coda
+        for future in futures:
+            future.cancel()
+    
+    yield {"type": "final", "summary": " ".join(summaries)}
+
+
+async def _submit_token_chunks(
+    chunks: List[TokenChunk],
+    max_length: int,
+    min_length: int
+) -> Tuple[List[Future], asyncio.Queue, threading.Event]:
+    """
+    Accoda allo scheduler i chunk da riassumere in streaming (può sollevare QueueFullError).
+    
+    Nella coda asyncio restituita arrivano, in ordine, le coppie (indice, frammento)
+    generate e (indice, None) quando il riassunto (grezzo, come in cache) di un
+    chunk è pronto; l'evento interrompe le generazioni in corso.
+    """
+    loop = asyncio.get_running_loop()
+    pieces: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    
+    def _push(index: int, piece: Optional[str]):
+        loop.call_soon_threadsafe(pieces.put_nowait, (index, piece))
+    
+    # Lo streaming dei token usa sempre il profilo "fast" (greedy)
+    keys = [_cache_key("chunk", chunk.text, max_length, min_length, "fast") for chunk in chunks]
+    futures: List[Optional[Future]] = []
+    missing = []
+    for i, cached in enumerate(await _store_call(_cache_get, "chunk", keys)):
+        if cached is None:
+            missing.append(i)
+            futures.append(None)
+        else:
+            future = Future()
+            future.set_result(cached)
+            futures.append(future)
+    
+    if missing:
+        submitted = scheduler.submit_stream(
+            [chunks[i].text for i in missing],
+            lambda position, piece: _push(missing[position], piece),
+            max_length=max_length,
+            min_length=min_length,
+            token_ids=[chunks[i].input_ids for i in missing],
+            stop=stop,
+            postprocess=False
+        )
+        for i, future in zip(missing, submitted):
+            future.add_done_callback(partial(_store_summary, keys[i]))
+            futures[i] = future
+    
+    for i, future in enumerate(futures):
+        future.add_done_callback(lambda _, index=i: _push(index, None))
+    return futures, pieces, stop
+
+
+async def _stream_token_events(
+    chunks: List[TokenChunk],
+    acronyms: Optional[FrozenSet[str]],
+    futures: List[Future],
+    pieces: asyncio.Queue,
+    stop: threading.Event
+) -> AsyncIterator[dict]:
+    """
+    Emette i frammenti di testo dei chunk durante la generazione e il riassunto
+    di ogni chunk appena completo, con il post-processing degli acronimi.
+    """
+    summaries: List[Optional[str]] = [None] * len(futures)
+    try:
+        for _ in range(len(futures)):
+            while True:
+                index, piece = await pieces.get()
+                if piece is None:
+                    break
+                yield {"type": "token", "index": index, "text": piece}
+            summaries[index] = summarizer._fix_capitalization(
+                futures[index].result(), chunks[index].text, acronyms
+            )
+            yield {"type": "chunk", "index": index, "total": len(futures), "summary": summaries[index]}
+    finally:
+        # Client disconnesso: si ferma la generazione in corso e i chunk in coda ne escono
+        stop.set()
+        for future in futures:
+            future.cancel()
+    
+    yield {"type": "final", "summary": " ".join(summaries)}
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(request: StreamRequest, http_request: Request):
+    """
+    Endpoint di streaming (NDJSON): un evento per ogni chunk riassunto non appena
+    pronto, eventualmente preceduto dai frammenti di testo, e un evento finale
+    con il riassunto completo.
+    """
+    _require_ready()
+    timer = StageTimer()
+    started = time.perf_counter()
+    
+    try:
+        loop = asyncio.get_running_loop()
+        with timer.stage("dedup"):
+            text, _ = await loop.run_in_executor(
+                preprocess_executor, _deduplicate, request.text, request.dedup
+            )
+        with timer.stage("clean"):
+            cleaned_text, acronyms = await loop.run_in_executor(
+                preprocess_executor, clean_text_and_acronyms, text
+            )
+        with timer.stage("prefilter"):
+            cleaned_text, _ = await loop.run_in_executor(
+                preprocess_executor,
+                _prefilter, cleaned_text, request.extractive_ratio, request.extractive_max_tokens
+            )
+        with timer.stage("chunk"):
+            chunks = await loop.run_in_executor(preprocess_executor, _chunk, cleaned_text)
+        
+        # Accodamento immediato: se la coda è piena si risponde 503 prima dello stream
+        if request.tokens:
+            events = _stream_token_events(
+                chunks, acronyms, *await _submit_token_chunks(chunks, request.max_length, request.min_length)
+            )
+        else:
+            profile = _resolve_profile(request.profile)
+            futures = await _submit_chunks(chunks, request.max_length, request.min_length, profile, acronyms)
+            events = _stream_chunk_events(futures)
+    
+    except QueueFullError as e:
+        timer.finish()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    except Exception as e:
+        timer.finish()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    debug = _debug_timing(http_request)
+    # L'header contiene solo gli stadi precedenti allo stream; l'evento finale anche la generazione
+    headers = {"X-Debug-Timing": timer.header()} if debug else None
+    
+    async def _body():
+        stream_started = time.perf_counter()
+        try:
+            async for event in events:
+                if event["type"] == "final":
+                    timer.add("summarize", time.perf_counter() - stream_started)
+                    timer.add("total", time.perf_counter() - started)
+                    if debug:
+                        event = dict(event, timings=timer.breakdown())
+                yield _ndjson(event)
+        except Exception as e:
+            yield _ndjson({"type": "error", "detail": str(e)})
+        finally:
+            # Chiusura esplicita: annulla subito i chunk ancora in coda o in generazione
+            await events.aclose()
+            timer.finish()
+    
+    return StreamingResponse(_body(), media_type="application/x-ndjson", headers=headers)
+
+
+async def _summarize_pages(
+    pages,
+    max_length: int,
+    min_length: int,
+    profile: str,
+    timer: Optional[StageTimer] = None,
+    deduplicator: Optional[PageDeduplicator] = None
+) -> Tuple[str, int]:
+    """
+    Pipeline incrementale: ogni pagina estratta viene pulita e aggiunta a un buffer;
+    i chunk completi vengono accodati subito allo scheduler, così la generazione
+    dei primi chunk inizia mentre il resto del documento è ancora in estrazione.
+    In memoria restano solo il buffer (circa un chunk) e la pagina corrente.
+    Con un deduplicatore ogni pagina perde i segmenti già visti nelle precedenti.
+    
+    Returns:
+        Riassunto finale e lunghezza (in caratteri) del testo estratto
+    """
+    loop = asyncio.get_running_loop()
+    timer = timer or StageTimer()
+    done = object()
+    futures: List[asyncio.Future] = []
+    buffer = ""
+    page_lengths = []
+    # Acronimi raccolti dai frammenti puliti: ogni chunk accodato li trova già tutti
+    acronyms = set()
+    
+    def _separated(pages):
+        # Le pagine sono separate da una riga vuota, come in extract_from_*
+        pages = iter(pages)
+        while True:
+            # L'estrazione avviene pagina per pagina, su richiesta della pulizia
+            started = time.perf_counter()
+            page = next(pages, None)
+            timer.add("extract", time.perf_counter() - started)
+            if page is None:
+                return
+            page_lengths.append(len(page))
+            if deduplicator is not None:
+                with timer.stage("dedup"):
+                    page = deduplicator.process_text(page)
+            yield page
+            yield "\n\n"
+    
+    # Pulizia incrementale: i frammenti concatenati equivalgono a clean_text sul testo intero
+    cleaned_pieces = iter_clean_text(_separated(pages))
+    
+    try:
+        while True:
+            # Estrazione e deduplicazione delle pagine avvengono dentro next(): misurate a parte
+            nested = timer.stages.get("extract", 0.0) + timer.stages.get("dedup", 0.0)
+            started = time.perf_counter()
+            cleaned = await loop.run_in_executor(preprocess_executor, next, cleaned_pieces, done)
+            elapsed = time.perf_counter() - started
+            # Il tempo della pulizia esclude quello dell'estrazione e della deduplicazione delle pagine lette
+            timer.add("clean", elapsed - (timer.stages.get("extract", 0.0) + timer.stages.get("dedup", 0.0) - nested))
+            if cleaned is done:
+                break
+            
+            buffer += cleaned
+            acronyms.update(extract_acronyms(cleaned))
+            with timer.stage("chunk"):
+                chunks = await loop.run_in_executor(preprocess_executor, _chunk, buffer)
+            
+            # Tutti i chunk tranne l'ultimo sono definitivi; l'ultimo (con il suo
+            # overlap) resta nel buffer in attesa delle pagine successive
+            if len(chunks) > 1 and chunks[-1].start >= 0:
+                # Solo il primo invio è soggetto alla back-pressure: altrimenti un file
+                # lungo verrebbe rifiutato a metà dai suoi stessi chunk in coda
+                futures.extend(await _submit_chunks(
+                    chunks[:-1], max_length, min_length, profile, frozenset(acronyms), admitted=bool(futures)
+                ))
+                buffer = buffer[chunks[-1].start:]
+        
+        if buffer:
+            with timer.stage("chunk"):
+                chunks = await loop.run_in_executor(preprocess_executor, _chunk, buffer)
+            futures.extend(await _submit_chunks(
+                chunks, max_length, min_length, profile, frozenset(acronyms), admitted=bool(futures)
+            ))
+        
+        # Attesa dei riassunti ancora in corso dopo la lettura dell'intero file
+        with timer.stage("summarize"):
+            summaries = await asyncio.gather(*futures)
+    
+    finally:
+        # In caso di errore i chunk ancora in coda non vanno generati
+        for future in futures:
+            future.cancel()
+    
+    return " ".join(summaries), sum(page_lengths)
+
+
+@app.post("/summarize/file", response_model=SummarizationResponse)
+async def summarize_file(
+    http_request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    max_length: int = Form(150),
+    min_length: int = Form(50),
+    profile: Literal["auto", "fast", "balanced", "quality"] = Form("auto"),
+    dedup: Optional[bool] = Form(None)
+):
+    """
+    Endpoint per riassumere un file (PDF, DOCX, HTML o TXT) caricato in multipart.
+    """
+    _require_ready()
+    timer = StageTimer()
+    started = time.perf_counter()
+    
+    head = await file.read(16)
+    await file.seek(0)
+    
+    fmt = detect_format(file.filename, file.content_type, head)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail=f"Formato non supportato: {file.filename}")
+    
+    try:
+        loop = asyncio.get_running_loop()
+        # Il file caricato viene letto direttamente dal file temporaneo, senza copiarlo
+        pages = await loop.run_in_executor(
+            preprocess_executor,
+            partial(
+                iter_text, fmt, file.file,
+                pdf_workers=config.PDF_WORKERS,
+                pdf_page_timeout=config.PDF_PAGE_TIMEOUT
+            )
+        )
+        profile = _resolve_profile(profile)
+        # I file TXT non hanno pagine: valgono le regole dei testi semplici
+        deduplicator = _deduplicator(dedup, paged=fmt != "txt")
+        final_summary, original_length = await _summarize_pages(
+            pages, max_length, min_length, profile, timer, deduplicator
+        )
+        timer.add("total", time.perf_counter() - started)
+        
+        timings = None
+        if _debug_timing(http_request):
+            timings = timer.breakdown()
+            response.headers["X-Debug-Timing"] = timer.header()
+        
+        return SummarizationResponse(
+            summary=final_summary,
+            original_length=original_length,
+            summary_length=len(final_summary),
+            profile=profile,
+            dedup=_dedup_info(deduplicator),
+            timings=timings
+        )
+    
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    except ExtractionError as e:
+        # File del formato riconosciuto ma malformato o corrotto: errore del client
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        timer.finish()
+        await file.close()
+
+
+class BatchDocument(BaseModel):
+    id: Optional[str] = None
+    text: str
+
+
+class BatchSummarizationRequest(BaseModel):
+    documents: List[BatchDocument]
+    max_length: Optional[int] = 150
+    min_length: Optional[int] = 50
+    profile: Literal["auto", "fast", "balanced", "quality"] = "auto"
+    dedup: Optional[bool] = None
+
+
+class BatchDocumentResult(BaseModel):
+    id: Optional[str] = None
+    summary: str
+    original_length: int
+    summary_length: int
+
+
+class BatchSummarizationResponse(BaseModel):
+    results: List[BatchDocumentResult]
+    profile: str
+
+
+def _prepare_documents(
+    texts: List[str],
+    dedup: Optional[bool] = None
+) -> List[Tuple[str, FrozenSet[str], List[TokenChunk]]]:
+    """
+    Deduplicazione, pulizia, estrazione degli acronimi e chunking di più documenti
+    in un'unica chiamata al pool di preprocessing.
+    """
+    prepared = []
+    for text in texts:
+        text, _ = _deduplicate(text, dedup)
+        cleaned_text, acronyms = clean_text_and_acronyms(text)
+        prepared.append((cleaned_text, acronyms, _chunk(cleaned_text)))
+    return prepared
+
+
+@app.post("/summarize/batch", response_model=BatchSummarizationResponse)
+async def summarize_batch(request: BatchSummarizationRequest):
+    """
+    Endpoint per riassumere molti documenti con una sola richiesta.
+    
+    I chunk di tutti i documenti vengono accodati insieme allo scheduler, che li
+    raggruppa in batch pieni indipendentemente dal documento di provenienza.
+    """
+    _require_ready()
+    futures: List[asyncio.Future] = []
+    
+    try:
+        loop = asyncio.get_running_loop()
+        profile = _resolve_profile(request.profile)
+        prepared = await loop.run_in_executor(
+            preprocess_executor, _prepare_documents, [doc.text for doc in request.documents], request.dedup
         )
+        
+        # Per ogni documento: riassunto dalla cache oppure i future dei suoi chunk
+        pending: List[Tuple[Optional[str], str, List[asyncio.Future]]] = []
+        doc_keys = [
+            _cache_key("doc:concat:tokens", cleaned_text, request.max_length, request.min_length, profile)
+            for cleaned_text, _, _ in prepared
+        ]
+        cached_docs = await _store_call(_cache_get, "doc", doc_keys)
+        for (_, acronyms, chunks), doc_key, cached in zip(prepared, doc_keys, cached_docs):
+            doc_futures = []
+            if cached is None and chunks:
+                # Solo il primo invio è soggetto alla back-pressure: la richiesta è
+                # accettata per intero, non rifiutata a metà dai suoi stessi chunk
+                doc_futures = await _submit_chunks(
+                    chunks, request.max_length, request.min_length, profile, acronyms, admitted=bool(futures)
+                )
+                futures.extend(doc_futures)
+            pending.append((cached, doc_key, doc_futures))
+        
+        results = []
+        for doc, (cached, doc_key, doc_futures) in zip(request.documents, pending):
+            summary = cached
+            if summary is None:
+                summary = " ".join(await asyncio.gather(*doc_futures))
+                await _store_call(summary_cache.put, doc_key, summary)
+            results.append(BatchDocumentResult(
+                id=doc.id,
+                summary=summary,
+                original_length=len(doc.text),
+                summary_length=len(summary)
+            ))
+        
+        return BatchSummarizationResponse(results=results, profile=profile)
+    
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        # Se un documento fallisce, i chunk degli altri ancora in coda non vanno generati
+        for future in futures:
+            future.cancel()
+
+
+class JobRequest(SummarizationRequest):
+    # Priorità del job: i valori più alti vengono elaborati per primi
+    priority: int = 0
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    priority: int
+    profile: Optional[str] = None
+    level: int
+    chunks_done: int
+    chunks_total: int
+    attempts: int
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+async def _run_job(job_id: str, request: SummarizationRequest) -> SummarizationResponse:
+    """
+    Esegue un job salvando il riassunto di ogni chunk appena pronto.
+    
+    Pulizia e chunking sono deterministici: ripartendo dopo un'interruzione si
+    ottengono gli stessi chunk e vengono generati solo quelli non ancora salvati,
+    con il profilo registrato al primo avvio ("auto" non viene risolto di nuovo).
+    """
+    loop = asyncio.get_running_loop()
+    profile = await _store_call(job_store.pin_profile, job_id, _resolve_profile(request.profile))
+    
+    text, dedup = await loop.run_in_executor(preprocess_executor, _deduplicate, request.text, request.dedup)
+    cleaned_text, acronyms = await loop.run_in_executor(
+        preprocess_executor, clean_text_and_acronyms, text
+    )
+    text, extractive = await loop.run_in_executor(
+        preprocess_executor,
+        _prefilter, cleaned_text, request.extractive_ratio, request.extractive_max_tokens
+    )
+    
+    done = await _store_call(job_store.chunk_summaries, job_id)
+    max_levels = config.HIERARCHICAL_MAX_LEVELS if request.mode == "hierarchical" else 1
+    levels = []
+    chunks_total = 0
+    
+    for level in range(max_levels):
+        started = time.perf_counter()
+        chunks = await loop.run_in_executor(preprocess_executor, _chunk, text)
+        chunks_total += len(chunks)
+        await _store_call(job_store.set_progress, job_id, level, chunks_total)
+        
+        summaries = [done.get((level, i)) for i in range(len(chunks))]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        
+        if missing:
+            # Coda dello scheduler piena: il job attende invece di fallire
+            while True:
+                try:
+                    futures = await _submit_chunks(
+                        [chunks[i] for i in missing], request.max_length, request.min_length,
+                        profile, acronyms
+                    )
+                    break
+                except QueueFullError:
+                    await asyncio.sleep(1.0)
+            
+            async def _indexed(index: int, future: asyncio.Future):
+                return index, await future
+            
+            try:
+                for next_done in asyncio.as_completed([_indexed(i, f) for i, f in zip(missing, futures)]):
+                    index, summary = await next_done
+                    summaries[index] = summary
+                    await _store_call(job_store.save_chunk, job_id, level, index, summary)
+            finally:
+                for future in futures:
+                    future.cancel()
+        
+        levels.append(LevelInfo(level=level, chunks=len(chunks), seconds=round(time.perf_counter() - started, 4)))
+        text = " ".join(summaries)
+        if len(chunks) <= 1:
+            break
+    
+    return SummarizationResponse(
+        summary=text,
+        original_length=len(request.text),
+        summary_length=len(text),
+        levels=levels if request.mode == "hierarchical" else None,
+        profile=profile,
+        extractive=extractive,
+        dedup=dedup
+    )
+
+
+async def _heartbeat(job_id: str):
+    """
+    Rinnova periodicamente il lease del job in esecuzione.
+    """
+    while True:
+        await asyncio.sleep(config.JOB_LEASE_SECONDS / 3)
+        await _store_call(job_store.heartbeat, job_id)
+
+
+async def _job_worker():
+    """
+    Consuma la coda dei job finché il servizio è attivo.
+    """
+    while True:
+        claimed = await _store_call(job_store.claim) if model_state["status"] == "ready" else None
+        if claimed is None:
+            # Coda vuota o modello non pronto: attende un nuovo job o il prossimo controllo
+            job_available.clear()
+            try:
+                await asyncio.wait_for(job_available.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        job_id, payload = claimed
+        heartbeat = asyncio.create_task(_heartbeat(job_id))
+        try:
+            response = await _run_job(job_id, SummarizationRequest(**payload))
+            await _store_call(job_store.complete, job_id, response.model_dump())
+        except asyncio.CancelledError:
+            # Arresto del servizio: il job resta "running" e verrà ripreso alla scadenza del lease
+            raise
+        except Exception as e:
+            print(f"✗ Job {job_id} fallito: {e}")
+            await _store_call(job_store.fail, job_id, str(e))
+        finally:
+            heartbeat.cancel()
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """
+    Accoda un job di summarization e restituisce subito il suo id.
+    I job vengono accettati anche mentre il modello è in caricamento.
+    """
+    payload = request.model_dump(exclude={"priority"})
+    job_id = await _store_call(job_store.create, payload, priority=request.priority)
+    job_available.set()
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    Stato e avanzamento (chunk completati / totali) di un job.
+    """
+    job = await _store_call(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job non trovato: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}/result", response_model=SummarizationResponse)
+async def get_job_result(job_id: str):
+    """
+    Risultato di un job completato: 409 se è ancora in corso, 500 se è fallito.
+    """
+    job = await _store_call(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job non trovato: {job_id}")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job non completato (stato: {job['status']})",
+            headers={"Retry-After": "5"}
+        )
+    return await _store_call(job_store.result, job_id)
 
 
 if __name__ == "__main__":
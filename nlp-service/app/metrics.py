@@ -0,0 +1,215 @@
+"""
+Metriche del servizio in formato testuale Prometheus, senza dipendenze esterne.
+Contatori e istogrammi sono per processo: con il launcher multi-worker ogni
+worker espone le proprie metriche.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+import threading
+import time
+
+
+# Limiti superiori (in secondi) dei bucket per le latenze
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_INF_LABEL = 'le="+Inf"'
+
+# Registro di tutte le metriche, nell'ordine di creazione
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """
+    Base comune: nome, descrizione ed etichette di una metrica.
+    """
+    kind = ""
+
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Contatore monotono, eventualmente suddiviso per etichette.
+    """
+    kind = "counter"
+
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """
+    Istogramma a bucket cumulativi (con somma e conteggio), come in Prometheus.
+    """
+    kind = "histogram"
+
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per etichetta: conteggi per bucket (non cumulativi), somma, conteggio totale
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_LABEL)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+def render() -> str:
+    """
+    Tutte le metriche registrate in formato testuale Prometheus.
+    """
+    return "\n".join(metric.render() for metric in _REGISTRY) + "\n"
+
+
+# Metriche della pipeline
+STAGE_SECONDS = Histogram(
+    "nlp_stage_seconds", "Durata degli stadi della pipeline per richiesta", ["stage"]
+)
+GENERATE_SECONDS = Histogram(
+    "nlp_generate_seconds", "Durata di una chiamata a generate() per micro-batch", ["profile"]
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "nlp_queue_wait_seconds", "Attesa dei chunk nella coda dello scheduler"
+)
+BATCH_SIZE = Histogram(
+    "nlp_batch_size", "Chunk per batch eseguito dallo scheduler", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+CHUNKS = Counter("nlp_chunks_total", "Chunk prodotti dal chunking")
+REPLICA_CHUNKS = Counter("nlp_replica_chunks_total", "Chunk eseguiti da ogni replica del modello", ["replica"])
+STOLEN_CHUNKS = Counter("nlp_stolen_chunks_total", "Chunk spostati tra repliche dal work stealing")
+INPUT_TOKENS = Counter("nlp_input_tokens_total", "Token in ingresso a generate()")
+OUTPUT_TOKENS = Counter("nlp_output_tokens_total", "Token generati")
+DEDUP_TOKENS = Counter("nlp_dedup_tokens_removed_total", "Token rimossi dalla deduplicazione prima dello chunking")
+CACHE_REQUESTS = Counter("nlp_cache_requests_total", "Consultazioni della cache dei riassunti", ["level", "result"])
+REQUESTS = Counter("nlp_requests_total", "Richieste completate", ["endpoint", "status"])
+
+
+class StageTimer:
+    """
+    Tempi degli stadi di una singola richiesta. Gli stadi ripetuti (es. pagina per
+    pagina) si sommano; a fine richiesta finish() registra un'osservazione per
+    stadio nell'istogramma globale.
+    """
+
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+    def add(self, name: str, seconds: float):
+        """
+        Aggiunge una durata allo stadio.
+        """
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+    def finish(self):
+        """
+        Registra le durate della richiesta nell'istogramma degli stadi.
+        """
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+
+
+    def breakdown(self) -> Dict[str, float]:
+        """
+        Durate degli stadi in millisecondi.
+        """
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+
+    def header(self) -> str:
+        """
+        Valore dell'header X-Debug-Timing, nel formato di Server-Timing.
+        """
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.breakdown().items())
@@ -0,0 +1,30 @@
+"""
+Profili di decoding del modello, importabili senza caricare torch e transformers.
+"""
+
+
+# Profili di decoding: compromesso tra qualità e latenza
+DECODING_PROFILES = {
+    # Greedy con KV-cache: una sola sequenza per input
+    "fast": {
+        "num_beams": 1,
+        "do_sample": False,
+        "use_cache": True,
+        "no_repeat_ngram_size": 3
+    },
+    "balanced": {
+        "num_beams": 2,
+        "length_penalty": 2.0,
+        "early_stopping": True,
+        "use_cache": True,
+        "no_repeat_ngram_size": 3
+    },
+    "quality": {
+        "num_beams": 4,
+        "length_penalty": 2.5,
+        "early_stopping": True,
+        "no_repeat_ngram_size": 3
+    }
+}
+
+DEFAULT_PROFILE = "quality"
@@ -0,0 +1,280 @@
+"""
+Pool di repliche del modello con i core partizionati tra le repliche e
+calibrazione dello split repliche × thread per la macchina.
+
+Sui nodi con molti core un solo generate() sui tensori piccoli di un chunk
+non sfrutta bene i thread intra-op di torch: più repliche con pochi thread
+ciascuna, che elaborano chunk diversi in parallelo, danno più throughput.
+La calibrazione prova gli split possibili con un carico di chunk di
+lunghezza realistica e salva il migliore in un file JSON, letto all'avvio
+con NLP_REPLICAS=auto (e creato al primo avvio se manca; con il launcher
+multi-worker una sola volta, prima dell'avvio dei worker).
+
+Utilizzo (dalla cartella nlp-service):
+    python app/replicas.py
+    python app/replicas.py --chunks 64 --output replicas.json
+"""
+from concurrent.futures import wait
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import argparse
+import json
+import os
+import time
+
+from profiles import DEFAULT_PROFILE
+from scheduler import Replica, ReplicaScheduler
+import config
+
+if TYPE_CHECKING:
+    from summarizer import Summarizer
+
+
+def available_cores() -> List[int]:
+    """
+    Core su cui il processo può girare (tiene conto del pinning del launcher).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def check_partitions(count: int, threads: int = 0, cores: Optional[List[int]] = None) -> int:
+    """
+    Core per partizione di `count` partizioni senza sovrapposizioni.
+
+    Args:
+        count: Numero totale di partizioni
+        threads: Core per partizione (0 = core disponibili divisi tra le partizioni)
+        cores: Core da partizionare (default: quelli disponibili al processo)
+
+    Raises:
+        ValueError: se le partizioni richiedono più core di quelli disponibili
+    """
+    available = cores or available_cores()
+    threads = threads or max(1, len(available) // count)
+    if count * threads > len(available):
+        raise ValueError(
+            f"{count} partizioni × {threads} core richiedono {count * threads} core, "
+            f"ma ne sono disponibili {len(available)}"
+        )
+    return threads
+
+
+def partition_cores(index: int, count: int, threads: int = 0, cores: Optional[List[int]] = None) -> List[int]:
+    """
+    Core assegnati alla partizione `index` di `count`: blocchi contigui dei core disponibili.
+
+    Args:
+        index: Indice della partizione (0 .. count-1), ad esempio un worker o una replica
+        count: Numero totale di partizioni
+        threads: Core per partizione (0 = core disponibili divisi tra le partizioni)
+        cores: Core da partizionare (default: quelli disponibili al processo)
+
+    Raises:
+        ValueError: se le partizioni si sovrapporrebbero (vedi check_partitions)
+    """
+    available = cores or available_cores()
+    threads = check_partitions(count, threads, available)
+    return available[index * threads:(index + 1) * threads]
+
+
+def create_replica_scheduler(
+    summarizer: "Summarizer",
+    replicas: int,
+    threads: int = 0,
+    pin_cores: bool = True,
+    cores: Optional[List[int]] = None,
+    **scheduler_args
+) -> ReplicaScheduler:
+    """
+    Crea `replicas` repliche del summarizer (pesi condivisi, tokenizer propri),
+    ognuna con un blocco di core, e lo scheduler che le alimenta.
+
+    Args:
+        summarizer: Summarizer già caricato
+        replicas: Numero di repliche
+        threads: Core e thread torch per replica (0 = core disponibili / repliche)
+        pin_cores: Vincola il thread di ogni replica ai propri core
+        cores: Core da partizionare (default: quelli disponibili al processo)
+        scheduler_args: Parametri di batching passati a ReplicaScheduler
+    """
+    pool = [
+        Replica(index, summarizer.replica(), partition_cores(index, replicas, threads, cores))
+        for index in range(replicas)
+    ]
+    return ReplicaScheduler(pool, pin_cores=pin_cores, **scheduler_args)
+
+
+def candidate_splits(cores: int) -> List[Tuple[int, int]]:
+    """
+    Split (repliche, thread per replica) che usano tutti i core senza sovrapposizioni.
+    """
+    return [(replicas, cores // replicas) for replicas in range(1, cores + 1) if cores % replicas == 0]
+
+
+def tune_replicas(
+    summarizer: "Summarizer",
+    chunks: int = 0,
+    max_length: int = 64,
+    min_length: int = 16,
+    profile: str = DEFAULT_PROFILE,
+    max_batch_size: int = 16,
+    pin_cores: bool = True,
+    cores: Optional[List[int]] = None,
+    verbose: bool = False
+) -> dict:
+    """
+    Misura il throughput di ogni split repliche × thread su un documento sintetico
+    e sceglie il migliore.
+
+    Ogni split esegue prima un chunk per replica (inizializzazione dei pool di
+    thread), poi tutti i chunk insieme, come per un documento lungo.
+
+    Args:
+        summarizer: Summarizer già caricato
+        chunks: Chunk del carico di prova (0 = il doppio dei core, almeno 16)
+        max_length: Lunghezza massima dei riassunti di prova (in token)
+        min_length: Lunghezza minima dei riassunti di prova (in token)
+        profile: Profilo di decoding usato nelle misure
+        max_batch_size: Chunk massimi per batch, come nello scheduler del servizio
+        pin_cores: Vincola le repliche ai propri core durante le misure
+        cores: Core da usare (default: quelli disponibili al processo)
+        verbose: Stampa il throughput di ogni split
+
+    Returns:
+        Split scelto ("replicas", "threads") e risultati di tutti gli split
+    """
+    cores = cores or available_cores()
+    chunks = chunks or max(16, 2 * len(cores))
+    # Chunk di lunghezza massima, come nel warm-up
+    sentence = "Il servizio riassume documenti in lingua italiana di varia lunghezza. "
+    texts = [sentence * (summarizer.max_input_length // 8)] * chunks
+
+    results = []
+    for replicas, threads in candidate_splits(len(cores)):
+        scheduler = create_replica_scheduler(
+            summarizer, replicas, threads, pin_cores=pin_cores, cores=cores,
+            max_batch_size=max_batch_size, max_wait_ms=0, max_queue_size=0
+        )
+        try:
+            wait(scheduler.submit(texts[:replicas], max_length=max_length, min_length=min_length, profile=profile))
+            started = time.perf_counter()
+            wait(scheduler.submit(texts, max_length=max_length, min_length=min_length, profile=profile))
+            seconds = time.perf_counter() - started
+        finally:
+            scheduler.shutdown()
+
+        results.append({
+            "replicas": replicas,
+            "threads": threads,
+            "seconds": round(seconds, 3),
+            "chunks_per_second": round(chunks / seconds, 3)
+        })
+        if verbose:
+            print(f"  {replicas:>3} repliche × {threads:>3} thread: {chunks / seconds:8.2f} chunk/s")
+
+    best = max(results, key=lambda result: result["chunks_per_second"])
+    return {
+        "replicas": best["replicas"],
+        "threads": best["threads"],
+        "cores": len(cores),
+        "model": summarizer.model_name,
+        "backend": summarizer.backend,
+        "chunks": chunks,
+        "profile": profile,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results
+    }
+
+
+def load_tuning(path: str, summarizer: "Summarizer", cores: Optional[List[int]] = None) -> Optional[dict]:
+    """
+    Legge una calibrazione salvata, se esiste ed è stata fatta per lo stesso
+    modello, backend e numero di core (altrimenti None).
+    """
+    if not path or not os.path.isfile(path):
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        tuning = json.load(f)
+
+    expected = {
+        "cores": len(cores or available_cores()),
+        "model": summarizer.model_name,
+        "backend": summarizer.backend
+    }
+    if any(tuning.get(name) != value for name, value in expected.items()):
+        return None
+    return tuning
+
+
+def save_tuning(path: str, tuning: dict):
+    """
+    Salva la calibrazione; la scrittura è atomica, così più worker possono salvarla insieme.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def replica_split(
+    summarizer: "Summarizer",
+    replicas: int,
+    threads: int = 0,
+    tuning_path: str = config.REPLICA_TUNING_PATH,
+    tune: bool = True,
+    **tune_args
+) -> Tuple[int, int]:
+    """
+    Split (repliche, thread per replica) da usare: quello indicato oppure, con
+    replicas=0 ("auto"), quello della calibrazione salvata in `tuning_path`,
+    eseguita e salvata ora se manca o non vale per questa macchina.
+
+    Con tune=False (es. nei worker del launcher, che trovano la calibrazione
+    già fatta dal processo principale) la calibrazione non viene mai eseguita:
+    se manca si usa una sola replica. I core passati in `tune_args` ("cores")
+    valgono sia per la calibrazione sia per la verifica di quella salvata.
+    """
+    if replicas > 0:
+        return replicas, threads
+
+    tuning = load_tuning(tuning_path, summarizer, tune_args.get("cores"))
+    if tuning is None:
+        if not tune:
+            return 1, 0
+        tuning = tune_replicas(summarizer, **tune_args)
+        save_tuning(tuning_path, tuning)
+    return tuning["replicas"], tuning["threads"]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Calibrazione dello split repliche × thread del modello")
+    parser.add_argument("--chunks", type=int, default=0, help="Chunk del carico di prova (0 = il doppio dei core)")
+    parser.add_argument("--max-length", type=int, default=64)
+    parser.add_argument("--min-length", type=int, default=16)
+    parser.add_argument("--profile", default=DEFAULT_PROFILE)
+    parser.add_argument("--output", default=config.REPLICA_TUNING_PATH, help="File JSON della calibrazione")
+    args = parser.parse_args()
+
+    # Carica il modello con la configurazione del servizio (come il launcher)
+    import main
+
+    summarizer = main.preload_model()
+    print(f"Calibrazione su {len(available_cores())} core:")
+    tuning = tune_replicas(
+        summarizer,
+        chunks=args.chunks,
+        max_length=args.max_length,
+        min_length=args.min_length,
+        profile=args.profile,
+        max_batch_size=config.SCHEDULER_MAX_BATCH_SIZE,
+        pin_cores=config.PIN_WORKERS,
+        verbose=True
+    )
+    save_tuning(args.output, tuning)
+    print(f"✓ Split scelto: {tuning['replicas']} repliche × {tuning['threads']} thread (salvato in {args.output})")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,615 @@
+"""
+Scheduler di batching dinamico per il modello di summarization.
+Raccoglie i chunk di più richieste concorrenti e li esegue in un'unica
+chiamata a generate(), restituendo a ogni richiesta i propri risultati.
+Con ReplicaScheduler i batch vengono eseguiti in parallelo da più repliche
+del modello, ognuna sui propri core.
+"""
+from concurrent.futures import Future
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Deque, Dict, FrozenSet, List, Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+
+import metrics
+
+# Solo per le annotazioni: il modulo dello scheduler non carica torch
+if TYPE_CHECKING:
+    from summarizer import Summarizer
+
+
+class QueueFullError(Exception):
+    """
+    Sollevata quando la coda dello scheduler non può accettare altri chunk.
+    """
+
+
+@dataclass
+class _PendingChunk:
+    """
+    Chunk in attesa di essere inserito in un batch.
+    """
+    text: str
+    key: Tuple
+    future: Future
+    token_ids: Optional[List[int]] = None
+    acronyms: Optional[FrozenSet[str]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Streaming dei frammenti di testo: il chunk viene eseguito da solo (vedi submit_stream)
+    on_text: Optional[Callable[[str], None]] = None
+    stop: Optional[threading.Event] = None
+
+
+class BatchScheduler:
+    """
+    Coda condivisa davanti al Summarizer.
+
+    Un thread dedicato forma i batch quando si raggiungono `max_batch_size`
+    chunk oppure quando il chunk più vecchio ha atteso `max_wait_ms`.
+    Solo chunk con gli stessi parametri di generazione finiscono nello stesso batch.
+    """
+
+    def __init__(
+        self,
+        summarizer: "Summarizer",
+        max_batch_size: int = 16,
+        max_wait_ms: float = 20.0,
+        max_queue_size: int = 256
+    ):
+        """
+        Inizializza lo scheduler e avvia il thread di lavoro.
+
+        Args:
+            summarizer: Summarizer condiviso su cui eseguire i batch
+            max_batch_size: Numero massimo di chunk per batch
+            max_wait_ms: Attesa massima (in millisecondi) prima di eseguire un batch incompleto
+            max_queue_size: Numero massimo di chunk in coda (0 = illimitato)
+        """
+        self.summarizer = summarizer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+
+        self._queue: Deque[_PendingChunk] = deque()
+        self._condition = threading.Condition()
+        self._running = True
+
+        # Metriche
+        self._batches = 0
+        self._chunks = 0
+        self._queue_wait_total = 0.0
+        self._batch_sizes: Dict[int, int] = {}
+        self._rejected = 0
+
+        self._workers: List[threading.Thread] = []
+        self._start_workers()
+
+
+    def _start_workers(self):
+        """
+        Avvia il thread di lavoro che esegue i batch.
+        """
+        self._workers = [threading.Thread(target=self._run, name="batch-scheduler", daemon=True)]
+        for worker in self._workers:
+            worker.start()
+
+
+    def submit(
+        self,
+        texts: List[str],
+        max_length: int = 150,
+        min_length: int = 50,
+        token_ids: Optional[List[List[int]]] = None,
+        profile: str = "quality",
+        acronyms: Optional[FrozenSet[str]] = None,
+        postprocess: bool = True,
+        admitted: bool = False
+    ) -> List[Future]:
+        """
+        Accoda i testi e restituisce un Future per ciascuno.
+        Se presenti, i token già calcolati (`token_ids`) evitano una nuova tokenizzazione
+        e gli acronimi del documento (`acronyms`) una nuova scansione dei testi.
+        Il profilo di decoding fa parte dei parametri che separano i batch;
+        con postprocess=False i Future restituiscono i riassunti grezzi.
+        Con admitted=True i testi appartengono a una richiesta già accettata
+        (es. le pagine successive di un file) e non sono soggetti alla back-pressure.
+        
+        Raises:
+            QueueFullError: se la coda non ha spazio per tutti i testi della richiesta
+        """
+        key = (max_length, min_length, profile, postprocess)
+        items = [
+            _PendingChunk(
+                text=text,
+                key=key,
+                future=Future(),
+                token_ids=token_ids[i] if token_ids is not None else None,
+                acronyms=acronyms
+            )
+            for i, text in enumerate(texts)
+        ]
+        self._accept(items, admitted)
+        return [item.future for item in items]
+
+
+    def submit_stream(
+        self,
+        texts: List[str],
+        on_text: Callable[[int, str], None],
+        max_length: int = 150,
+        min_length: int = 50,
+        token_ids: Optional[List[List[int]]] = None,
+        acronyms: Optional[FrozenSet[str]] = None,
+        stop: Optional[threading.Event] = None,
+        postprocess: bool = True
+    ) -> List[Future]:
+        """
+        Accoda testi da riassumere in streaming (decoding greedy): `on_text` riceve
+        dal thread di lavoro l'indice del testo e ogni frammento generato, i Future
+        i riassunti completi. I chunk passano dalla stessa coda degli altri
+        (back-pressure compresa) ma vengono eseguiti uno alla volta; impostando
+        `stop` le generazioni in corso si interrompono.
+        
+        Raises:
+            QueueFullError: se la coda è piena
+        """
+        key = ("stream", max_length, min_length, postprocess)
+        items = [
+            _PendingChunk(
+                text=text,
+                key=key,
+                future=Future(),
+                token_ids=token_ids[i] if token_ids is not None else None,
+                acronyms=acronyms,
+                on_text=partial(on_text, i),
+                stop=stop
+            )
+            for i, text in enumerate(texts)
+        ]
+        self._accept(items)
+        return [item.future for item in items]
+
+
+    def _accept(self, items: List[_PendingChunk], admitted: bool = False):
+        """
+        Accoda i chunk di una richiesta o la rifiuta per intero se la coda è piena
+        (a meno che la richiesta non sia già stata accettata).
+        """
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Scheduler arrestato")
+            # Back-pressure: la richiesta viene accettata per intero o rifiutata
+            # (a coda vuota si accetta comunque, anche se supera il limite da sola)
+            depth = self._pending()
+            if self.max_queue_size and depth and depth + len(items) > self.max_queue_size and not admitted:
+                self._rejected += 1
+                raise QueueFullError(
+                    f"Coda piena ({depth}/{self.max_queue_size} chunk in attesa)"
+                )
+            self._enqueue(items)
+            self._condition.notify_all()
+
+
+    async def summarize(
+        self,
+        texts: List[str],
+        max_length: int = 150,
+        min_length: int = 50,
+        token_ids: Optional[List[List[int]]] = None,
+        profile: str = "quality",
+        acronyms: Optional[FrozenSet[str]] = None
+    ) -> List[str]:
+        """
+        Riassume i testi passando dallo scheduler, senza bloccare l'event loop.
+        """
+        futures = self.submit(
+            texts, max_length=max_length, min_length=min_length, token_ids=token_ids,
+            profile=profile, acronyms=acronyms
+        )
+        return list(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
+
+
+    def queue_depth(self) -> int:
+        """
+        Numero di chunk attualmente in coda.
+        """
+        return self._pending()
+
+
+    def _enqueue(self, items: List[_PendingChunk]):
+        """
+        Inserisce i chunk nella coda (con il lock acquisito).
+        """
+        self._queue.extend(items)
+
+
+    def _pending(self) -> int:
+        return len(self._queue)
+
+
+    def _drain(self) -> List[_PendingChunk]:
+        """
+        Svuota la coda (con il lock acquisito) e restituisce i chunk rimasti.
+        """
+        pending = list(self._queue)
+        self._queue.clear()
+        return pending
+
+
+    def stats(self) -> dict:
+        """
+        Restituisce profondità della coda e metriche di riempimento dei batch.
+        """
+        with self._condition:
+            queue_depth = self._pending()
+            batches = self._batches
+            chunks = self._chunks
+            wait_total = self._queue_wait_total
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            rejected = self._rejected
+
+        return {
+            "queue_depth": queue_depth,
+            "max_queue_size": self.max_queue_size,
+            "rejected_requests": rejected,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": batches,
+            "chunks": chunks,
+            "avg_batch_size": chunks / batches if batches else 0.0,
+            "avg_batch_fill": chunks / (batches * self.max_batch_size) if batches else 0.0,
+            "avg_queue_wait_ms": wait_total / chunks * 1000.0 if chunks else 0.0,
+            "batch_size_histogram": batch_sizes
+        }
+
+
+    def shutdown(self):
+        """
+        Ferma il thread di lavoro. I chunk ancora in coda ricevono un errore.
+        """
+        with self._condition:
+            self._running = False
+            pending = self._drain()
+            self._condition.notify_all()
+
+        for item in pending:
+            # I chunk annullati dalla richiesta non hanno più nessuno in attesa
+            if item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("Scheduler arrestato"))
+        for worker in self._workers:
+            worker.join()
+
+
+    def _take_batch(self, queue: Deque[_PendingChunk]) -> Tuple[List[_PendingChunk], float]:
+        """
+        Preleva da una coda non vuota il prossimo batch, se è pronto (con il lock acquisito).
+        
+        Returns:
+            Batch (vuoto se non ancora pronto) e secondi di attesa rimanenti
+        """
+        # Il chunk più vecchio decide i parametri e la scadenza del batch
+        head = queue[0]
+        if head.on_text is not None:
+            # Streaming: un chunk alla volta, senza attendere altri chunk
+            queue.popleft()
+            return [head], 0.0
+        same_key = sum(1 for item in queue if item.key == head.key)
+        remaining = head.enqueued_at + self.max_wait - time.monotonic()
+
+        if same_key < self.max_batch_size and remaining > 0:
+            return [], remaining
+
+        batch, rest = [], deque()
+        for item in queue:
+            if item.key == head.key and len(batch) < self.max_batch_size:
+                batch.append(item)
+            else:
+                rest.append(item)
+        queue.clear()
+        queue.extend(rest)
+        return batch, 0.0
+
+
+    def _next_batch(self) -> List[_PendingChunk]:
+        """
+        Attende e preleva dalla coda il prossimo batch da eseguire.
+        """
+        with self._condition:
+            while self._running:
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+
+                batch, remaining = self._take_batch(self._queue)
+                if batch:
+                    return batch
+                self._condition.wait(timeout=remaining)
+
+        return []
+
+
+    def _run(self):
+        """
+        Ciclo del thread di lavoro: forma i batch e distribuisce i risultati.
+        """
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._execute(self.summarizer, batch)
+
+
+    def _execute(self, summarizer: "Summarizer", batch: List[_PendingChunk]) -> int:
+        """
+        Esegue un batch sul summarizer indicato e distribuisce i risultati.
+        
+        Returns:
+            Numero di chunk eseguiti (esclusi quelli delle richieste annullate)
+        """
+        # Scarta i chunk le cui richieste sono state annullate nel frattempo
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return 0
+
+        started = time.monotonic()
+        with self._condition:
+            self._batches += 1
+            self._chunks += len(batch)
+            self._queue_wait_total += sum(started - item.enqueued_at for item in batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+        metrics.BATCH_SIZE.observe(len(batch))
+        for item in batch:
+            metrics.QUEUE_WAIT_SECONDS.observe(started - item.enqueued_at)
+
+        try:
+            if batch[0].on_text is not None:
+                item = batch[0]
+                _, max_length, min_length, postprocess = item.key
+                summaries = [summarizer.stream_summary(
+                    item.text,
+                    item.on_text,
+                    max_length=max_length,
+                    min_length=min_length,
+                    token_ids=item.token_ids,
+                    acronyms=item.acronyms,
+                    stop=item.stop,
+                    postprocess=postprocess
+                )]
+            else:
+                max_length, min_length, profile, postprocess = batch[0].key
+                summaries = summarizer.summarize_batch(
+                    [item.text for item in batch],
+                    max_length=max_length,
+                    min_length=min_length,
+                    batch_size=len(batch),
+                    token_ids=[item.token_ids for item in batch],
+                    profile=profile,
+                    acronyms=[item.acronyms for item in batch],
+                    postprocess=postprocess
+                )
+        except Exception as e:
+            for item in batch:
+                item.future.set_exception(e)
+            return len(batch)
+
+        for item, summary in zip(batch, summaries):
+            item.future.set_result(summary)
+        return len(batch)
+
+
+@dataclass
+class Replica:
+    """
+    Replica del modello: summarizer, core assegnati e coda locale dei chunk.
+    """
+    index: int
+    summarizer: "Summarizer"
+    # Core su cui gira il thread della replica (vuoto = nessun vincolo, thread torch invariati)
+    cores: List[int] = field(default_factory=list)
+    queue: Deque[_PendingChunk] = field(default_factory=deque)
+    busy: bool = False
+
+    # Metriche
+    batches: int = 0
+    chunks: int = 0
+    stolen: int = 0
+    busy_seconds: float = 0.0
+
+
+class ReplicaScheduler(BatchScheduler):
+    """
+    Scheduler su più repliche del modello, ognuna con un thread dedicato
+    vincolato ai propri core e con il proprio numero di thread torch.
+
+    Ogni chunk accodato va alla replica con la coda locale più corta, quindi
+    anche i chunk di un solo documento lungo vengono elaborati in parallelo.
+    Ogni replica forma i batch dalla propria coda con le regole di
+    BatchScheduler; quando la sua coda è vuota ruba metà dei chunk in attesa
+    (i più recenti) alla replica occupata con la coda più lunga.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 20.0,
+        max_queue_size: int = 256,
+        pin_cores: bool = True
+    ):
+        """
+        Args:
+            replicas: Repliche su cui eseguire i batch (almeno una)
+            max_batch_size: Numero massimo di chunk per batch (per replica)
+            max_wait_ms: Attesa massima (in millisecondi) prima di eseguire un batch incompleto
+            max_queue_size: Numero massimo di chunk in coda, su tutte le repliche (0 = illimitato)
+            pin_cores: Vincola il thread di ogni replica ai core assegnati
+        """
+        if not replicas:
+            raise ValueError("Serve almeno una replica")
+        self.replicas = replicas
+        self.pin_cores = pin_cores
+        # Replica da cui parte la ricerca della coda più corta (a parità di carico)
+        self._cursor = 0
+        self._stolen = 0
+        super().__init__(
+            replicas[0].summarizer,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_queue_size=max_queue_size
+        )
+
+
+    def _start_workers(self):
+        """
+        Avvia un thread di lavoro per replica.
+        """
+        self._workers = [
+            threading.Thread(target=self._run_replica, args=(replica,), name=f"replica-{replica.index}", daemon=True)
+            for replica in self.replicas
+        ]
+        for worker in self._workers:
+            worker.start()
+
+
+    def _enqueue(self, items: List[_PendingChunk]):
+        count = len(self.replicas)
+        for item in items:
+            replica = min(
+                self.replicas,
+                key=lambda r: (len(r.queue) + r.busy, (r.index - self._cursor) % count)
+            )
+            replica.queue.append(item)
+            self._cursor = (replica.index + 1) % count
+
+
+    def _pending(self) -> int:
+        return sum(len(replica.queue) for replica in self.replicas)
+
+
+    def _drain(self) -> List[_PendingChunk]:
+        pending = []
+        for replica in self.replicas:
+            pending.extend(replica.queue)
+            replica.queue.clear()
+        return pending
+
+
+    def stats(self) -> dict:
+        """
+        Metriche di BatchScheduler più lo stato e il lavoro svolto da ogni replica.
+        """
+        result = super().stats()
+        with self._condition:
+            result["stolen_chunks"] = self._stolen
+            result["replicas"] = [
+                {
+                    "index": replica.index,
+                    "cores": replica.cores,
+                    "queue_depth": len(replica.queue),
+                    "busy": replica.busy,
+                    "batches": replica.batches,
+                    "chunks": replica.chunks,
+                    "stolen_chunks": replica.stolen,
+                    "busy_seconds": round(replica.busy_seconds, 3)
+                }
+                for replica in self.replicas
+            ]
+        return result
+
+
+    def _steal(self, thief: Replica) -> bool:
+        """
+        Sposta nella coda di `thief` metà dei chunk in attesa della replica occupata
+        con la coda più lunga (con il lock acquisito).
+        
+        Returns:
+            True se è stato rubato almeno un chunk
+        """
+        victims = [r for r in self.replicas if r is not thief and r.busy and r.queue]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda r: len(r.queue))
+
+        # Dalla fine della coda: i chunk più recenti, con i parametri dell'ultimo
+        key = victim.queue[-1].key
+        count = min((len(victim.queue) + 1) // 2, self.max_batch_size)
+        stolen, kept = [], deque()
+        for item in reversed(victim.queue):
+            if item.key == key and len(stolen) < count:
+                stolen.append(item)
+            else:
+                kept.appendleft(item)
+        victim.queue.clear()
+        victim.queue.extend(kept)
+
+        thief.queue.extend(reversed(stolen))
+        thief.stolen += len(stolen)
+        self._stolen += len(stolen)
+        metrics.STOLEN_CHUNKS.inc(len(stolen))
+        return True
+
+
+    def _next_replica_batch(self, replica: Replica) -> List[_PendingChunk]:
+        """
+        Attende il prossimo batch della replica, rubando chunk se la sua coda è vuota.
+        """
+        with self._condition:
+            while self._running:
+                if not replica.queue and not self._steal(replica):
+                    self._condition.wait()
+                    continue
+
+                batch, remaining = self._take_batch(replica.queue)
+                if batch:
+                    replica.busy = True
+                    # I chunk rimasti in coda ora possono essere rubati dalle repliche libere
+                    if replica.queue:
+                        self._condition.notify_all()
+                    return batch
+                self._condition.wait(timeout=remaining)
+
+        return []
+
+
+    def _bind_thread(self, replica: Replica):
+        """
+        Vincola il thread corrente ai core della replica e imposta i thread torch
+        (valore del processo, uguale per tutte le repliche).
+        """
+        if not replica.cores:
+            return
+        # Su Linux l'affinità del pid 0 vale per il thread chiamante e per i thread
+        # che crea dopo (il pool intra-op della replica)
+        if self.pin_cores and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, replica.cores)
+        replica.summarizer.set_num_threads(len(replica.cores))
+
+
+    def _run_replica(self, replica: Replica):
+        """
+        Ciclo del thread di una replica: preleva i batch e li esegue sul suo summarizer.
+        """
+        self._bind_thread(replica)
+
+        while True:
+            batch = self._next_replica_batch(replica)
+            if not batch:
+                return
+
+            started = time.monotonic()
+            executed = 0
+            try:
+                executed = self._execute(replica.summarizer, batch)
+            finally:
+                with self._condition:
+                    replica.busy = False
+                    replica.batches += 1 if executed else 0
+                    replica.chunks += executed
+                    replica.busy_seconds += time.monotonic() - started
+                    # Una replica libera può rubare dalle altre
+                    self._condition.notify_all()
+                metrics.REPLICA_CHUNKS.inc(executed, replica=replica.index)
@@ -2,9 +2,67 @@
 Il cuore del servizio NLP.
 Carica il modello it5-summarization per riassunti in italiano.
 """
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, TextStreamer
+from functools import lru_cache
+from threading import Event
+from typing import Callable, Dict, FrozenSet, List, Optional
 import torch
+import copy
+import os
 import re
+import time
+
+from cleaning import extract_acronyms
+from profiles import DECODING_PROFILES, DEFAULT_PROFILE
+from chunking import TokenChunk, chunk_by_content, chunk_by_tokens, chunk_text
+import metrics
+
+
+# Parole del riassunto: un acronimo si sostituisce solo a una parola intera
+_WORD_RE = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=256)
+def _acronym_lookup(acronyms: FrozenSet[str]) -> Dict[str, str]:
+    """
+    Mappa minuscolo -> acronimo, costruita una volta per insieme di acronimi (documento).
+    """
+    return {acronym.lower(): acronym for acronym in acronyms}
+
+
+class GenerationStopped(Exception):
+    """
+    Sollevata quando una generazione in streaming viene interrotta dall'evento
+    di stop: il testo prodotto fino a quel punto non è un riassunto completo.
+    """
+
+
+class _CallbackStreamer(TextStreamer):
+    """
+    Streamer che passa ogni frammento di testo decodificato a una funzione.
+    """
+    
+    def __init__(self, tokenizer, callback: Callable[[str], None]):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.callback = callback
+    
+    
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.callback(text)
+
+
+class _StopOnEvent(StoppingCriteria):
+    """
+    Interrompe generate() quando l'evento viene impostato.
+    """
+    
+    def __init__(self, event: Event):
+        self.event = event
+    
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
 
 
 class Summarizer:
@@ -12,25 +70,63 @@ class Summarizer:
     Wrapper per il modello it5-summarization ottimizzato per l'italiano.
     """
     
-    def __init__(self, model_name: str = "ARTeLab/it5-summarization-mlsum"):
+    BACKENDS = ("torch", "torch-int8", "onnx")
+    
+    def __init__(
+        self,
+        model_name: str = "ARTeLab/it5-summarization-mlsum",
+        num_threads: int = 0,
+        backend: str = "torch",
+        onnx_dir: Optional[str] = None,
+        snapshot_dir: Optional[str] = None
+    ):
         """
         Inizializza il modello it5-summarization.
         
         Args:
             model_name: Nome del modello su Hugging Face
+            num_threads: Thread intra-op di torch (0 = default di torch)
+            backend: Backend di inferenza: "torch" (fp32), "torch-int8" (quantizzazione
+                dinamica int8 dei layer lineari, solo CPU) oppure "onnx" (onnxruntime)
+            onnx_dir: Cartella con il modello ONNX già esportato; se vuota o inesistente
+                il modello viene esportato e, se indicata, salvato lì
+            snapshot_dir: Cartella con uno snapshot locale (safetensors) del modello,
+                caricato in memory map senza accesso a Hugging Face; se non esiste
+                ancora, viene creato dopo il primo caricamento
         """
-        print(f"Caricamento modello {model_name}...")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend non supportato: {backend} (disponibili: {', '.join(self.BACKENDS)})")
         
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Caricamento modello {model_name} (backend {backend})...")
+        
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        
+        # Quantizzazione int8 e onnxruntime sono ottimizzati per CPU
+        if backend == "torch" and torch.cuda.is_available():
+            self.device = "cuda"
+        else:
+            self.device = "cpu"
         print(f"Utilizzo device: {self.device}")
         
         self.model_name = model_name
+        self.backend = backend
+        
+        # Snapshot locale già presente: nessun download né risoluzione sull'hub
+        self._source = model_name
+        has_snapshot = bool(snapshot_dir) and os.path.isfile(os.path.join(snapshot_dir, "config.json"))
+        if has_snapshot:
+            self._source = snapshot_dir
+            print(f"Utilizzo snapshot locale {snapshot_dir}")
         
         # Carica tokenizer e modello
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        self.model.to(self.device)
-        self.model.eval()  # Modalità inferenza
+        self.tokenizer = AutoTokenizer.from_pretrained(self._source, local_files_only=has_snapshot)
+        self.model = self._load_model(
+            backend,
+            onnx_dir,
+            local_files_only=has_snapshot,
+            snapshot_dir=snapshot_dir if not has_snapshot else None
+        )
         
         # Limite di token per it5
         self.max_input_length = 512
@@ -38,22 +134,151 @@ class Summarizer:
         print(f"✓ Modello {model_name} caricato con successo!")
     
     
-    def _extract_acronyms(self, text: str) -> set:
+    def _load_model(
+        self,
+        backend: str,
+        onnx_dir: Optional[str],
+        local_files_only: bool = False,
+        snapshot_dir: Optional[str] = None
+    ):
+        """
+        Carica il modello per il backend scelto. Tutti i backend espongono generate().
+        Se indicato `snapshot_dir`, i pesi fp32 vengono salvati lì per gli avvii successivi.
+        """
+        if backend == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            except ImportError:
+                raise ImportError(
+                    "Il backend 'onnx' richiede optimum e onnxruntime: "
+                    "pip install optimum[onnxruntime]"
+                )
+            
+            # Encoder e decoder (con KV-cache) eseguiti da onnxruntime
+            if onnx_dir and os.path.isdir(onnx_dir) and os.listdir(onnx_dir):
+                return ORTModelForSeq2SeqLM.from_pretrained(onnx_dir, use_cache=True)
+            
+            model = ORTModelForSeq2SeqLM.from_pretrained(
+                self._source, export=True, use_cache=True, local_files_only=local_files_only
+            )
+            if onnx_dir:
+                model.save_pretrained(onnx_dir)
+            return model
+        
+        # I pesi safetensors vengono mappati in memoria invece che copiati
+        model = AutoModelForSeq2SeqLM.from_pretrained(
+            self._source,
+            local_files_only=local_files_only,
+            low_cpu_mem_usage=True,
+            use_safetensors=True if local_files_only else None
+        )
+        model.eval()  # Modalità inferenza
+        
+        if snapshot_dir:
+            self.save_snapshot(snapshot_dir, model)
+        
+        if backend == "torch-int8":
+            # Pesi dei layer lineari in int8, attivazioni quantizzate a runtime
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        
+        return model.to(self.device)
+    
+    
+    @classmethod
+    def from_components(cls, model, tokenizer, model_name: str, max_input_length: int = 512) -> "Summarizer":
+        """
+        Crea un Summarizer da modello e tokenizer già istanziati (su CPU, backend "torch"),
+        ad esempio un modello piccolo inizializzato a caso per benchmark offline.
+        """
+        summarizer = cls.__new__(cls)
+        summarizer.device = "cpu"
+        summarizer.backend = "torch"
+        summarizer.model_name = model_name
+        summarizer._source = model_name
+        summarizer.tokenizer = tokenizer
+        summarizer.model = model.to("cpu").eval()
+        summarizer.max_input_length = max_input_length
+        return summarizer
+    
+    
+    def replica(self) -> "Summarizer":
+        """
+        Replica da usare in un altro thread: condivide i pesi del modello (in sola
+        lettura durante l'inferenza) ma ha un proprio tokenizer, che non è thread-safe.
+        """
+        replica = copy.copy(self)
+        replica.tokenizer = copy.deepcopy(self.tokenizer)
+        return replica
+    
+    
+    def set_num_threads(self, num_threads: int):
+        """
+        Imposta i thread intra-op di torch. torch.set_num_threads vale per l'intero
+        processo, non per il thread chiamante: tutte le repliche di un processo
+        usano lo stesso numero di thread.
+        """
+        torch.set_num_threads(num_threads)
+    
+    
+    def save_snapshot(self, snapshot_dir: str, model=None):
+        """
+        Salva modello (safetensors) e tokenizer in una cartella locale, per avvii più rapidi.
+        """
+        os.makedirs(snapshot_dir, exist_ok=True)
+        (model or self.model).save_pretrained(snapshot_dir, safe_serialization=True)
+        self.tokenizer.save_pretrained(snapshot_dir)
+        print(f"✓ Snapshot salvato in {snapshot_dir}")
+    
+    
+    def warmup(self, batch_sizes: List[int], max_length: int = 150, min_length: int = 50) -> float:
+        """
+        Esegue batch fittizi di lunghezza realistica per inizializzare kernel e
+        allocazioni prima delle richieste reali.
+        
+        Args:
+            batch_sizes: Dimensioni dei batch da eseguire (es. [1, 16])
+            max_length: Lunghezza massima del riassunto (in token)
+            min_length: Lunghezza minima del riassunto (in token)
+            
+        Returns:
+            Durata del warm-up in secondi
+        """
+        started = time.perf_counter()
+        sentence = "Il servizio riassume documenti in lingua italiana di varia lunghezza. "
+        text = sentence * (self.max_input_length // 8)
+        
+        for batch_size in batch_sizes:
+            if batch_size > 0:
+                self.summarize_batch(
+                    [text] * batch_size,
+                    max_length=max_length,
+                    min_length=min_length,
+                    batch_size=batch_size
+                )
+        
+        return time.perf_counter() - started
+    
+    
+    def _extract_acronyms(self, text: str) -> FrozenSet[str]:
         """
         Estrae acronimi (parole tutte maiuscole di 2-5 lettere) dal testo.
         """
-        # Trova parole di 2-5 lettere tutte maiuscole
-        acronyms = re.findall(r'\b[A-Z]{2,5}\b', text)
-        return set(acronyms)
+        return extract_acronyms(text)
     
     
-    def _fix_capitalization(self, summary: str, original_text: str) -> str:
+    def _fix_capitalization(
+        self,
+        summary: str,
+        original_text: str = "",
+        acronyms: Optional[FrozenSet[str]] = None
+    ) -> str:
         """
         Corregge capitalizzazione e acronimi nel riassunto.
         
         Args:
             summary: Riassunto generato dal modello
             original_text: Testo originale da cui estrarre acronimi
+            acronyms: Acronimi già estratti dal documento (evita di scandire `original_text`)
             
         Returns:
             Riassunto con capitalizzazione corretta
@@ -62,14 +287,15 @@ class Summarizer:
         if summary:
             summary = summary[0].upper() + summary[1:] if len(summary) > 1 else summary.upper()
         
-        # 2. Trova acronimi nel testo originale
-        acronyms = self._extract_acronyms(original_text)
+        # 2. Acronimi del documento (estratti durante la pulizia) o del testo originale
+        if acronyms is None:
+            acronyms = self._extract_acronyms(original_text)
         
-        # 3. Sostituisci acronimi in minuscolo con versione maiuscola
-        for acronym in acronyms:
-            # Usa word boundary per non sostituire acronimi dentro altre parole
-            pattern = r'\b' + re.escape(acronym.lower()) + r'\b'
-            summary = re.sub(pattern, acronym, summary, flags=re.IGNORECASE)
+        # 3. Sostituisci acronimi in minuscolo con versione maiuscola, in un solo
+        # passaggio sulle parole del riassunto
+        if acronyms:
+            lookup = _acronym_lookup(acronyms)
+            summary = _WORD_RE.sub(lambda m: lookup.get(m.group().lower(), m.group()), summary)
         
         # 4. Aggiungi punto finale se manca
         if summary and summary[-1] not in '.!?':
@@ -78,7 +304,13 @@ class Summarizer:
         return summary
     
     
-    def summarize(self, text: str, max_length: int = 150, min_length: int = 50) -> str:
+    def summarize(
+        self,
+        text: str,
+        max_length: int = 150,
+        min_length: int = 50,
+        profile: str = DEFAULT_PROFILE
+    ) -> str:
         """
         Genera un riassunto del testo in italiano.
         
@@ -86,41 +318,239 @@ class Summarizer:
             text: Testo da riassumere
             max_length: Lunghezza massima del riassunto (in token)
             min_length: Lunghezza minima del riassunto (in token)
+            profile: Profilo di decoding ("fast", "balanced", "quality")
             
         Returns:
             Testo riassunto
         """
-        # Tokenizza l'input (it5-summarization non richiede prefisso "summarize:")
-        inputs = self.tokenizer(
-            text,
-            max_length=self.max_input_length,
-            truncation=True,
-            return_tensors="pt",
-            padding=True
-        ).to(self.device)
+        return self.summarize_batch([text], max_length=max_length, min_length=min_length, profile=profile)[0]
+    
+    
+    def summarize_batch(
+        self,
+        texts: List[str],
+        max_length: int = 150,
+        min_length: int = 50,
+        batch_size: int = 8,
+        token_ids: Optional[List[Optional[List[int]]]] = None,
+        profile: str = DEFAULT_PROFILE,
+        acronyms: Optional[List[Optional[FrozenSet[str]]]] = None,
+        postprocess: bool = True
+    ) -> List[str]:
+        """
+        Genera i riassunti di più testi con un numero ridotto di chiamate a generate().
+        
+        I testi vengono tokenizzati insieme, ordinati per lunghezza (per ridurre
+        il padding all'interno di ogni micro-batch) e riassunti a gruppi di
+        `batch_size`. L'ordine dei risultati corrisponde a quello di `texts`.
+        
+        Args:
+            texts: Testi da riassumere
+            max_length: Lunghezza massima di ogni riassunto (in token)
+            min_length: Lunghezza minima di ogni riassunto (in token)
+            batch_size: Numero massimo di testi per chiamata a generate()
+            token_ids: Token già calcolati per ciascun testo (senza token speciali),
+                ad esempio da chunking.chunk_by_tokens; None dove vanno calcolati
+            profile: Profilo di decoding ("fast", "balanced", "quality")
+            acronyms: Acronimi del documento di ciascun testo; None dove vanno
+                estratti dal testo stesso
+            postprocess: False per i riassunti grezzi, senza _fix_capitalization
+                (es. da salvare in cache, indipendenti dagli acronimi del documento)
+            
+        Returns:
+            Lista di riassunti, nello stesso ordine dei testi in input
+        """
+        if not texts:
+            return []
+        
+        if token_ids is None:
+            token_ids = [None] * len(texts)
+        if acronyms is None:
+            acronyms = [None] * len(texts)
+        
+        # Tokenizza in un'unica chiamata (senza padding) solo i testi senza token
+        input_ids: List[Optional[List[int]]] = [
+            self.build_inputs(ids) if ids is not None else None for ids in token_ids
+        ]
+        missing = [i for i, ids in enumerate(input_ids) if ids is None]
+        if missing:
+            encodings = self.tokenizer(
+                [texts[i] for i in missing],
+                max_length=self.max_input_length,
+                truncation=True
+            )
+            for i, ids in zip(missing, encodings["input_ids"]):
+                input_ids[i] = ids
+        
+        # Ordina per lunghezza così ogni micro-batch ha padding minimo
+        order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+        
+        summaries: List[Optional[str]] = [None] * len(texts)
+        for start in range(0, len(order), max(1, batch_size)):
+            indices = order[start:start + batch_size]
+            batch_summaries = self._generate(
+                [input_ids[i] for i in indices],
+                max_length=max_length,
+                min_length=min_length,
+                profile=profile
+            )
+            
+            # Post-processing: correggi capitalizzazione e acronimi
+            for i, summary in zip(indices, batch_summaries):
+                summaries[i] = summary.strip()
+                if postprocess:
+                    summaries[i] = self._fix_capitalization(summaries[i], texts[i], acronyms[i])
+        
+        return summaries
+    
+    
+    def stream_summary(
+        self,
+        text: str,
+        on_text: Callable[[str], None],
+        max_length: int = 150,
+        min_length: int = 50,
+        token_ids: Optional[List[int]] = None,
+        acronyms: Optional[FrozenSet[str]] = None,
+        stop: Optional[Event] = None,
+        postprocess: bool = True
+    ) -> str:
+        """
+        Genera il riassunto di un singolo testo nel thread chiamante, passando a
+        `on_text` i frammenti appena prodotti.
+        
+        Lo streaming non è compatibile con la beam search: qui si usa sempre il
+        profilo "fast" (decoding greedy). I frammenti sono testo grezzo; il
+        riassunto restituito ha il post-processing di _fix_capitalization,
+        salvo con postprocess=False.
+        
+        Args:
+            text: Testo da riassumere
+            on_text: Funzione chiamata con ogni frammento di testo
+            max_length: Lunghezza massima del riassunto (in token)
+            min_length: Lunghezza minima del riassunto (in token)
+            token_ids: Token già calcolati del testo (senza token speciali)
+            acronyms: Acronimi del documento (None = estratti dal testo)
+            stop: Evento che interrompe la generazione (es. client disconnesso)
+            postprocess: False per il riassunto grezzo, senza _fix_capitalization
+            
+        Returns:
+            Riassunto completo
         
-        # Genera il riassunto
+        Raises:
+            GenerationStopped: se `stop` è stato impostato durante la generazione
+        """
+        if token_ids is not None:
+            input_ids = self.build_inputs(token_ids)
+        else:
+            input_ids = self.tokenizer(
+                text,
+                max_length=self.max_input_length,
+                truncation=True
+            )["input_ids"]
+        
+        inputs = torch.tensor([input_ids], device=self.device)
+        pieces = []
+        
+        def _on_piece(piece: str):
+            pieces.append(piece)
+            on_text(piece)
+        
+        streamer = _CallbackStreamer(self.tokenizer, _on_piece)
+        stopping = StoppingCriteriaList([_StopOnEvent(stop)]) if stop is not None else None
+        
+        started = time.perf_counter()
         with torch.no_grad():
-            summary_ids = self.model.generate(
-                inputs["input_ids"],
+            self.model.generate(
+                inputs,
+                attention_mask=torch.ones_like(inputs),
                 max_length=max_length,
                 min_length=min_length,
-                num_beams=4,
-                length_penalty=2.5,
-                early_stopping=True,
-                no_repeat_ngram_size=3
+                streamer=streamer,
+                stopping_criteria=stopping,
+                **DECODING_PROFILES["fast"]
             )
+        metrics.GENERATE_SECONDS.observe(time.perf_counter() - started, profile="fast")
+        
+        # Il riassunto troncato non va restituito come risultato (finirebbe in cache)
+        if stop is not None and stop.is_set():
+            raise GenerationStopped("Generazione interrotta")
         
-        # Decodifica il riassunto
-        summary = self.tokenizer.decode(
-            summary_ids[0], 
-            skip_special_tokens=True
+        summary = "".join(pieces).strip()
+        return self._fix_capitalization(summary, text, acronyms) if postprocess else summary
+    
+    
+    def chunk(self, text: str, overlap: int = 32, content_defined: bool = False) -> List[TokenChunk]:
+        """
+        Chunking con il tokenizer del modello: ogni chunk rientra esattamente nel
+        limite di input e porta con sé i token già calcolati.
+        Con un tokenizer "lento" (senza offset) si usa la stima basata sui caratteri.
+        
+        Args:
+            text: Testo pulito
+            overlap: Sovrapposizione (in token) tra chunk consecutivi
+            content_defined: Confini definiti dal contenuto (vedi chunking.chunk_by_content),
+                stabili tra versioni successive dello stesso documento
+        """
+        if getattr(self.tokenizer, "is_fast", False):
+            chunker = chunk_by_content if content_defined else chunk_by_tokens
+            return chunker(text, self.tokenizer, max_tokens=self.max_chunk_tokens, overlap=overlap)
+        
+        return [
+            TokenChunk(text=chunk, input_ids=None, start=-1, end=-1)
+            for chunk in chunk_text(text, max_tokens=self.max_input_length)
+        ]
+    
+    
+    @property
+    def max_chunk_tokens(self) -> int:
+        """
+        Numero massimo di token di contenuto per chunk (esclusi i token speciali).
+        """
+        return self.max_input_length - self.tokenizer.num_special_tokens_to_add()
+    
+    
+    def build_inputs(self, token_ids: List[int]) -> List[int]:
+        """
+        Aggiunge i token speciali (es. </s>) a una sequenza già tokenizzata.
+        """
+        return self.tokenizer.build_inputs_with_special_tokens(
+            list(token_ids[:self.max_chunk_tokens])
         )
+    
+    
+    def _generate(
+        self,
+        input_ids: List[List[int]],
+        max_length: int,
+        min_length: int,
+        profile: str = DEFAULT_PROFILE
+    ) -> List[str]:
+        """
+        Esegue una singola chiamata a generate() su un micro-batch già tokenizzato.
+        """
+        batch = self.tokenizer.pad(
+            {"input_ids": input_ids},
+            padding=True,
+            return_tensors="pt"
+        ).to(self.device)
         
-        # Post-processing: correggi capitalizzazione e acronimi
-        summary = self._fix_capitalization(summary.strip(), text)
+        # Genera i riassunti
+        started = time.perf_counter()
+        with torch.no_grad():
+            summary_ids = self.model.generate(
+                batch["input_ids"],
+                attention_mask=batch["attention_mask"],
+                max_length=max_length,
+                min_length=min_length,
+                **DECODING_PROFILES[profile]
+            )
+        metrics.GENERATE_SECONDS.observe(time.perf_counter() - started, profile=profile)
+        metrics.INPUT_TOKENS.inc(int(batch["attention_mask"].sum()))
+        metrics.OUTPUT_TOKENS.inc(int((summary_ids != self.tokenizer.pad_token_id).sum()))
         
-        return summary
+        # Decodifica i riassunti
+        return self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
     
     
     def get_token_count(self, text: str) -> int:
@@ -0,0 +1,109 @@
+"""
+Benchmark della pulizia del testo.
+Verifica che clean_text e iter_clean_text producano lo stesso risultato
+dell'implementazione precedente (multi-regex) e ne misura lo speedup.
+
+Utilizzo (dalla cartella nlp-service):
+    python benchmarks/bench_cleaning.py
+"""
+from pathlib import Path
+from typing import List
+import json
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from cleaning import clean_text, iter_clean_text  # noqa: E402
+
+
+EXAMPLES_DIR = Path(__file__).resolve().parent.parent.parent / "test_examples"
+
+
+def legacy_clean_text(text: str) -> str:
+    """
+    Implementazione originale di clean_text, usata come riferimento.
+    """
+    if not text or not text.strip():
+        return ""
+    text = ''.join(char for char in text if char.isprintable() or char in '\n\t ')
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
+    text = re.sub(r'([!?.])\1+', r'\1', text)
+    return text.strip()
+
+
+def load_examples() -> List[str]:
+    """
+    Testi di esempio da test_examples/*.json.
+    """
+    return [json.loads(path.read_text(encoding="utf-8"))["text"] for path in sorted(EXAMPLES_DIR.glob("*.json"))]
+
+
+def random_text(rng: random.Random, size: int) -> str:
+    """
+    Testo sintetico con i casi difficili: spazi e newline multipli, caratteri di
+    controllo e invisibili, punteggiatura ripetuta, URL ed email.
+    """
+    pieces = [
+        "parola", "Dott.", "art.", "  ", " \n\n ", "\t", ".", "!!", "??", " ,", " .", "...",
+        "http://example.com/a?b=1", "https://x.it", "mario.rossi@example.it", "a@b",
+        "\x00", "\x0b", "\r", "\xa0", "​", " ", "città", "perché", "€", " ! !"
+    ]
+    out = []
+    length = 0
+    while length < size:
+        piece = rng.choice(pieces)
+        out.append(piece + (" " if rng.random() < 0.6 else ""))
+        length += len(out[-1])
+    return "".join(out)
+
+
+def split_blocks(rng: random.Random, text: str) -> List[str]:
+    """
+    Divide il testo in blocchi di lunghezza casuale.
+    """
+    blocks = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 200)
+        blocks.append(text[pos:pos + step])
+        pos += step
+    return blocks
+
+
+def check_equivalence(samples: List[str], rng: random.Random) -> int:
+    """
+    Confronta le nuove implementazioni con quella originale; restituisce il numero di casi verificati.
+    """
+    for sample in samples:
+        expected = legacy_clean_text(sample)
+        assert clean_text(sample) == expected, f"clean_text diverge su: {sample[:80]!r}"
+        streamed = "".join(iter_clean_text(split_blocks(rng, sample)))
+        assert streamed == expected, f"iter_clean_text diverge su: {sample[:80]!r}"
+    return len(samples)
+
+
+def main():
+    rng = random.Random(42)
+    examples = load_examples()
+    samples = examples + [random_text(rng, rng.randint(0, 2000)) for _ in range(2000)]
+    print(f"Equivalenza verificata su {check_equivalence(samples, rng)} testi")
+
+    base = " ".join(examples) if examples else random_text(rng, 10_000)
+    print(f"{'dimensione':>12} {'legacy (ms)':>12} {'nuovo (ms)':>12} {'speedup':>8}")
+    for size in (10_000, 100_000, 1_000_000, 5_000_000):
+        text = (base * (size // len(base) + 1))[:size]
+        repeat = max(1, 2_000_000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_clean_text(text), number=repeat, repeat=3)) / repeat
+        new = min(timeit.repeat(lambda: clean_text(text), number=repeat, repeat=3)) / repeat
+        print(f"{size:>12,} {legacy * 1000:>12.2f} {new * 1000:>12.2f} {legacy / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
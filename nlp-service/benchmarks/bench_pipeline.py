@@ -0,0 +1,381 @@
+"""
+Benchmark della pipeline di summarization, stadio per stadio.
+
+Misura estrazione (TXT, HTML, DOCX e i PDF passati con --files, anche per
+ciascun backend di estrazione disponibile), deduplicazione,
+clean_text, chunking (Summarizer.chunk, come nel servizio), tokenizzazione, model.generate
+e _fix_capitalization su corpora di
+dimensione crescente (test_examples e testo sintetico). Per ogni stadio riporta
+throughput (documenti/s, token/s), percentili di latenza e crescita della RSS
+di picco del processo durante lo stadio, e può salvare i risultati in JSON per
+il confronto tra commit.
+
+Con --model tiny (default) usa un modello T5 minuscolo inizializzato a caso e
+un tokenizer "fast" a byte: nessun download, quindi funziona anche offline. I tempi
+di generate misurano l'overhead della pipeline, non la qualità del modello.
+
+Utilizzo (dalla cartella nlp-service):
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 5000 50000 --output bench.json
+    python benchmarks/bench_pipeline.py --model ARTeLab/it5-summarization-mlsum --files doc.pdf
+    python benchmarks/bench_pipeline.py --compare bench_prima.json bench_dopo.json
+"""
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from cleaning import clean_text, clean_text_and_acronyms  # noqa: E402
+from dedup import deduplicate_text  # noqa: E402
+from chunking import estimate_token_count, split_into_sentences  # noqa: E402
+from extractor import available_backends, iter_text, prefer_backends  # noqa: E402
+from extractor import extract_from_docx, extract_from_html, extract_from_pdf, extract_from_txt  # noqa: E402
+import config  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+EXAMPLES_DIR = Path(__file__).resolve().parent.parent.parent / "test_examples"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    RSS di picco del processo (in MB), dove disponibile.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux riporta kilobyte, macOS byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Percentile con interpolazione lineare (q tra 0 e 100).
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(stage: str, corpus: str, docs: List, run: Callable, tokens: int, repeat: int) -> dict:
+    """
+    Esegue `run` su ogni documento `repeat` volte e riassume i tempi.
+
+    Args:
+        stage: Nome dello stadio
+        corpus: Nome del corpus
+        docs: Input dello stadio (uno per documento)
+        run: Funzione da misurare, chiamata con un documento
+        tokens: Token (stimati) elaborati da un passaggio sull'intero corpus
+        repeat: Passaggi sull'intero corpus
+    """
+    latencies = []
+    # ru_maxrss è il picco dell'intero processo: per lo stadio conta di quanto lo alza
+    rss_before = peak_rss_mb()
+    for _ in range(repeat):
+        for doc in docs:
+            started = time.perf_counter()
+            run(doc)
+            latencies.append(time.perf_counter() - started)
+
+    total = sum(latencies)
+    rss_after = peak_rss_mb()
+    return {
+        "stage": stage,
+        "corpus": corpus,
+        "docs": len(docs),
+        "runs": len(latencies),
+        "docs_per_s": round(len(latencies) / total, 2) if total else None,
+        "tokens_per_s": round(tokens * repeat / total, 1) if total else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 3),
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p90": round(percentile(latencies, 90) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3)
+        },
+        "process_peak_rss_mb": rss_after,
+        "peak_rss_growth_mb": round(rss_after - rss_before, 1) if rss_after is not None else None
+    }
+
+
+def measure_backends(fmt: str, corpus: str, docs: List[bytes], tokens: int, repeat: int) -> List[dict]:
+    """
+    Estrazione con ciascun backend disponibile per il formato (stadio "extract_<formato>[<backend>]").
+    """
+    results = []
+    for backend in available_backends().get(fmt, []):
+        if not backend["available"]:
+            continue
+        prefer_backends({fmt: backend["name"]})
+        run = lambda doc: "\n".join(iter_text(fmt, io.BytesIO(doc)))  # noqa: E731
+        results.append(measure(f"extract_{fmt}[{backend['name']}]", corpus, docs, run, tokens, repeat))
+    prefer_backends({})
+    return results
+
+
+def load_examples() -> List[str]:
+    """
+    Testi di esempio da test_examples/*.json.
+    """
+    return [json.loads(path.read_text(encoding="utf-8"))["text"] for path in sorted(EXAMPLES_DIR.glob("*.json"))]
+
+
+def synthetic_text(rng: random.Random, sentences: List[str], size: int) -> str:
+    """
+    Documento sintetico di circa `size` caratteri: frasi degli esempi in ordine
+    casuale, con paragrafi, acronimi, URL e rumore tipico dei testi estratti.
+    """
+    noise = ["", "", "", "  ", " \n\n", " (ONU)", " UE", " https://example.it/doc", "!!", " Pag. 3"]
+    out = []
+    length = 0
+    while length < size:
+        piece = rng.choice(sentences) + rng.choice(noise)
+        out.append(piece)
+        length += len(piece) + 1
+    return " ".join(out)[:size]
+
+
+def to_html(text: str) -> bytes:
+    paragraphs = "".join(f"<p>{p}</p>\n" for p in text.split("\n\n"))
+    return f"<html><head><title>Doc</title><script>var x = 1;</script></head><body>{paragraphs}</body></html>".encode("utf-8")
+
+
+def to_docx(text: str) -> Optional[bytes]:
+    try:
+        import docx
+    except ImportError:
+        return None
+    document = docx.Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def load_summarizer(model: str):
+    """
+    Summarizer reale (nome su Hugging Face) oppure modello minuscolo casuale ("tiny").
+    """
+    from summarizer import Summarizer
+
+    if model != "tiny":
+        return Summarizer(model)
+
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors
+    from transformers import T5Config, T5ForConditionalGeneration, T5TokenizerFast
+
+    torch.manual_seed(0)
+    # Tokenizer "fast" a byte costruito localmente: come i tokenizer reali fornisce
+    # gli offset, quindi Summarizer.chunk segue lo stesso percorso del servizio
+    vocabulary = {"<pad>": 0, "</s>": 1, "<unk>": 2}
+    for byte in sorted(pre_tokenizers.ByteLevel.alphabet()):
+        vocabulary[byte] = len(vocabulary)
+    backend = Tokenizer(models.BPE(vocab=vocabulary, merges=[], unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = decoders.ByteLevel()
+    backend.post_processor = processors.TemplateProcessing(single="$A </s>", special_tokens=[("</s>", 1)])
+    tokenizer = T5TokenizerFast(
+        tokenizer_object=backend, extra_ids=0, pad_token="<pad>", eos_token="</s>", unk_token="<unk>"
+    )
+    config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=64,
+        d_ff=128,
+        d_kv=16,
+        num_layers=2,
+        num_decoder_layers=2,
+        num_heads=4,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id
+    )
+    return Summarizer.from_components(T5ForConditionalGeneration(config), tokenizer, "tiny-random-t5")
+
+
+def run_benchmarks(args) -> List[dict]:
+    rng = random.Random(args.seed)
+    examples = load_examples()
+    sentences = [s for text in examples for s in split_into_sentences(clean_text(text))]
+
+    # Corpora: esempi reali più documenti sintetici di dimensione crescente
+    corpora: Dict[str, List[str]] = {"test_examples": examples}
+    for size in args.sizes:
+        corpora[f"synthetic_{size}"] = [synthetic_text(rng, sentences, size) for _ in range(args.docs)]
+
+    results = []
+    for name, texts in corpora.items():
+        tokens = sum(estimate_token_count(text) for text in texts)
+        print(f"Corpus {name}: {len(texts)} documenti, ~{tokens} token")
+
+        # Estrazione
+        txt_docs = [text.encode("utf-8") for text in texts]
+        results.append(measure("extract_txt", name, txt_docs, extract_from_txt, tokens, args.repeat))
+        html_docs = [to_html(text) for text in texts]
+        results.append(measure("extract_html", name, html_docs, extract_from_html, tokens, args.repeat))
+        results.extend(measure_backends("html", name, html_docs, tokens, args.repeat))
+        docx_docs = [to_docx(text) for text in texts]
+        if all(doc is not None for doc in docx_docs):
+            results.append(measure("extract_docx", name, docx_docs, extract_from_docx, tokens, args.repeat))
+
+        # Deduplicazione e pulizia (il chunking usa il tokenizer: vedi sotto)
+        results.append(measure("dedup", name, texts, deduplicate_text, tokens, args.repeat))
+        results.append(measure("clean_text", name, texts, clean_text, tokens, args.repeat))
+
+    # PDF reali passati da riga di comando
+    pdfs = [Path(path).read_bytes() for path in args.files if path.lower().endswith(".pdf")]
+    if pdfs:
+        texts = [extract_from_pdf(pdf) for pdf in pdfs]
+        tokens = sum(estimate_token_count(text) for text in texts)
+        results.append(measure("extract_pdf", "files", pdfs, extract_from_pdf, tokens, args.repeat))
+        results.extend(measure_backends("pdf", "files", pdfs, tokens, args.repeat))
+
+    if args.skip_model:
+        return results
+
+    summarizer = load_summarizer(args.model)
+    tokenizer = summarizer.tokenizer
+
+    for name, texts in corpora.items():
+        cleaned = [clean_text_and_acronyms(text) for text in texts]
+        tokens = sum(estimate_token_count(text) for text, _ in cleaned)
+
+        # Chunking sul tokenizer del modello, come _chunk del servizio
+        results.append(measure(
+            "chunk", name, [text for text, _ in cleaned],
+            lambda text: summarizer.chunk(text, overlap=config.CHUNK_OVERLAP_TOKENS),
+            tokens, args.repeat
+        ))
+        chunks = [summarizer.chunk(text, overlap=config.CHUNK_OVERLAP_TOKENS) for text, _ in cleaned]
+        chunk_tokens = sum(len(chunk.input_ids) for doc in chunks for chunk in doc)
+
+        results.append(measure(
+            "tokenize", name, [[chunk.text for chunk in doc] for doc in chunks],
+            lambda doc: tokenizer(doc, max_length=summarizer.max_input_length, truncation=True),
+            chunk_tokens, args.repeat
+        ))
+
+        # generate: solo i primi chunk di ogni documento, per contenere i tempi
+        inputs = [
+            [summarizer.build_inputs(chunk.input_ids) for chunk in doc[:args.max_generate_chunks]]
+            for doc in chunks
+        ]
+        generated_tokens = sum(len(ids) for doc in inputs for ids in doc)
+        results.append(measure(
+            "generate", name, inputs,
+            lambda ids: summarizer._generate(ids, max_length=args.max_length, min_length=args.min_length, profile=args.profile),
+            generated_tokens, 1
+        ))
+
+        # Post-processing su riassunti realistici (frasi del documento)
+        outputs = [
+            (" ".join(split_into_sentences(text)[:3]).lower(), acronyms) for text, acronyms in cleaned
+        ]
+        results.append(measure(
+            "fix_capitalization", name, outputs,
+            lambda doc: summarizer._fix_capitalization(doc[0], acronyms=doc[1]),
+            sum(estimate_token_count(summary) for summary, _ in outputs), args.repeat
+        ))
+
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def print_table(results: List[dict]):
+    print(f"\n{'stadio':<20} {'corpus':<18} {'doc/s':>10} {'token/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'+RSS MB':>8}")
+    for r in results:
+        print(
+            f"{r['stage']:<20} {r['corpus']:<18} {r['docs_per_s'] or 0:>10.1f} {r['tokens_per_s'] or 0:>12.0f} "
+            f"{r['latency_ms']['p50']:>10.3f} {r['latency_ms']['p99']:>10.3f} {r['peak_rss_growth_mb'] or 0:>8.1f}"
+        )
+
+
+def compare(before_path: str, after_path: str):
+    """
+    Confronta due file JSON di risultati: rapporto tra le latenze p50 per stadio e corpus.
+    """
+    before = json.loads(Path(before_path).read_text(encoding="utf-8"))
+    after = json.loads(Path(after_path).read_text(encoding="utf-8"))
+    previous = {(r["stage"], r["corpus"]): r for r in before["results"]}
+
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    print(f"{'stadio':<20} {'corpus':<18} {'p50 prima':>10} {'p50 dopo':>10} {'speedup':>8}")
+    for r in after["results"]:
+        old = previous.get((r["stage"], r["corpus"]))
+        if old is None:
+            continue
+        p50_before, p50_after = old["latency_ms"]["p50"], r["latency_ms"]["p50"]
+        speedup = p50_before / p50_after if p50_after else float("inf")
+        print(f"{r['stage']:<20} {r['corpus']:<18} {p50_before:>10.3f} {p50_after:>10.3f} {speedup:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della pipeline di summarization")
+    parser.add_argument("--model", default="tiny", help="Nome del modello oppure 'tiny' (casuale, offline)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[2000, 20000, 200000],
+                        help="Dimensioni (caratteri) dei documenti sintetici")
+    parser.add_argument("--docs", type=int, default=3, help="Documenti sintetici per dimensione")
+    parser.add_argument("--repeat", type=int, default=3, help="Passaggi sul corpus per gli stadi CPU")
+    parser.add_argument("--files", nargs="*", default=[], help="PDF reali da includere nell'estrazione")
+    parser.add_argument("--max-generate-chunks", type=int, default=4)
+    parser.add_argument("--max-length", type=int, default=32)
+    parser.add_argument("--min-length", type=int, default=8)
+    parser.add_argument("--profile", default="fast", choices=["fast", "balanced", "quality"])
+    parser.add_argument("--skip-model", action="store_true", help="Misura solo gli stadi senza modello")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="File JSON in cui salvare i risultati")
+    parser.add_argument("--compare", nargs=2, metavar=("PRIMA", "DOPO"),
+                        help="Confronta due file JSON di risultati invece di eseguire il benchmark")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run_benchmarks(args)
+    print_table(results)
+
+    if args.output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "model": args.model,
+                "sizes": args.sizes,
+                "docs": args.docs,
+                "repeat": args.repeat
+            },
+            "results": results
+        }
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nRisultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Profilo dei tempi di import all'avvio, modulo per modulo.
+
+Importa ogni modulo indicato in un processo Python nuovo con `-X importtime`
+e riporta il tempo totale, i moduli più costosi (tempo cumulativo, figli
+compresi), il tempo per pacchetto di primo livello, la RSS dopo l'import e
+quali dipendenze pesanti (torch, transformers, estrattori) sono state caricate.
+
+Utilizzo (dalla cartella nlp-service):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py main batch extractor --repeat 5 --output startup.json
+    python benchmarks/bench_startup.py --compare startup_prima.json startup_dopo.json
+"""
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_pipeline import git_commit
+
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Dipendenze che non dovrebbero essere caricate da chi non le usa
+HEAVY_PACKAGES = ("torch", "transformers", "numpy", "PyPDF2", "pypdfium2", "docx", "bs4", "lxml")
+
+# Eseguito nel processo figlio dopo l'import: RSS di picco (dove disponibile) e pacchetti caricati
+_PROBE = """
+import json, sys
+try:
+    import resource
+    # Linux riporta kilobyte, macOS byte
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+except ImportError:  # Windows
+    rss_mb = None
+print(json.dumps({{"rss_mb": rss_mb, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def profile_import(module: str) -> dict:
+    """
+    Importa `module` in un processo nuovo e raccoglie i tempi di `-X importtime`.
+
+    Returns:
+        Tempo totale (ms), tempi cumulativi e propri per modulo (ms), RSS e pacchetti pesanti caricati
+    """
+    code = f"import {module}\n" + _PROBE.format(heavy=HEAVY_PACKAGES)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+
+    cumulative: Dict[str, float] = {}
+    self_time: Dict[str, float] = {}
+    for line in completed.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, total, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        cumulative[name] = cumulative.get(name, 0.0) + int(total) / 1000
+        self_time[name] = self_time.get(name, 0.0) + int(own) / 1000
+
+    probe = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "total_ms": cumulative.get(module, sum(self_time.values())),
+        "cumulative_ms": cumulative,
+        "self_ms": self_time,
+        "rss_mb": round(probe["rss_mb"], 1) if probe["rss_mb"] is not None else None,
+        "heavy_loaded": probe["loaded"]
+    }
+
+
+def summarize(module: str, runs: List[dict], top: int) -> dict:
+    """
+    Riassume più esecuzioni: mediana del totale, moduli e pacchetti più costosi dell'esecuzione mediana.
+    """
+    ordered = sorted(runs, key=lambda run: run["total_ms"])
+    median = ordered[len(ordered) // 2]
+
+    packages: Dict[str, float] = {}
+    for name, ms in median["self_ms"].items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + ms
+
+    return {
+        "module": module,
+        "runs": len(runs),
+        "total_ms": round(statistics.median(run["total_ms"] for run in runs), 1),
+        "rss_mb": median["rss_mb"],
+        "heavy_loaded": median["heavy_loaded"],
+        "top_modules": [
+            {"module": name, "cumulative_ms": round(ms, 1)}
+            for name, ms in sorted(median["cumulative_ms"].items(), key=lambda item: -item[1])[:top]
+            if name != module
+        ],
+        "packages": [
+            {"package": name, "self_ms": round(ms, 1)}
+            for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ]
+    }
+
+
+def print_report(result: dict):
+    print(f"\nimport {result['module']}: {result['total_ms']:.1f} ms, RSS {result['rss_mb'] or 0:.1f} MB")
+    print(f"  dipendenze pesanti caricate: {', '.join(result['heavy_loaded']) or 'nessuna'}")
+    print(f"  {'modulo':<40} {'cumulativo ms':>14}")
+    for entry in result["top_modules"]:
+        print(f"  {entry['module']:<40} {entry['cumulative_ms']:>14.1f}")
+    print(f"  {'pacchetto':<40} {'proprio ms':>14}")
+    for entry in result["packages"]:
+        print(f"  {entry['package']:<40} {entry['self_ms']:>14.1f}")
+
+
+def compare(before_path: str, after_path: str):
+    """
+    Confronta due file JSON di risultati: tempo di import e RSS per modulo.
+    """
+    before = json.loads(Path(before_path).read_text(encoding="utf-8"))
+    after = json.loads(Path(after_path).read_text(encoding="utf-8"))
+    previous = {r["module"]: r for r in before["results"]}
+
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    print(f"{'modulo':<16} {'ms prima':>10} {'ms dopo':>10} {'speedup':>8} {'MB prima':>10} {'MB dopo':>10}")
+    for r in after["results"]:
+        old = previous.get(r["module"])
+        if old is None:
+            continue
+        speedup = old["total_ms"] / r["total_ms"] if r["total_ms"] else float("inf")
+        print(
+            f"{r['module']:<16} {old['total_ms']:>10.1f} {r['total_ms']:>10.1f} {speedup:>7.2f}x "
+            f"{old['rss_mb'] or 0:>10.1f} {r['rss_mb'] or 0:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profilo dei tempi di import all'avvio")
+    parser.add_argument("modules", nargs="*", default=["main", "batch", "extractor"],
+                        help="Moduli di app/ da importare (uno per processo)")
+    parser.add_argument("--repeat", type=int, default=3, help="Processi per modulo (si riporta la mediana)")
+    parser.add_argument("--top", type=int, default=15, help="Moduli e pacchetti da mostrare")
+    parser.add_argument("--output", help="File JSON in cui salvare i risultati")
+    parser.add_argument("--compare", nargs=2, metavar=("PRIMA", "DOPO"),
+                        help="Confronta due file JSON di risultati invece di eseguire il profilo")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for module in args.modules:
+        runs = [profile_import(module) for _ in range(max(1, args.repeat))]
+        results.append(summarize(module, runs, args.top))
+        print_report(results[-1])
+
+    if args.output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat
+            },
+            "results": results
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nRisultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
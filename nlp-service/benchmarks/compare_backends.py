@@ -0,0 +1,144 @@
+"""
+Confronto qualità/velocità tra i backend di inferenza del Summarizer.
+
+Riassume i testi di test_examples con ogni backend e riporta, per ciascuno:
+- tempo di caricamento e latenza media per testo;
+- sovrapposizione con i riassunti del backend di riferimento ("torch"),
+  misurata con ROUGE-1 e ROUGE-L (F1).
+
+Utilizzo (dalla cartella nlp-service):
+    python benchmarks/compare_backends.py
+    python benchmarks/compare_backends.py --backends torch torch-int8 --output risultati.json
+"""
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import json
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from summarizer import Summarizer  # noqa: E402
+from cleaning import clean_text  # noqa: E402
+
+
+EXAMPLES_DIR = Path(__file__).resolve().parent.parent.parent / "test_examples"
+
+
+def _tokens(text: str) -> List[str]:
+    return text.lower().split()
+
+
+def rouge_1(candidate: str, reference: str) -> float:
+    """
+    ROUGE-1 F1 (sovrapposizione di unigrammi).
+    """
+    cand, ref = _tokens(candidate), _tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    ref_counts: Dict[str, int] = {}
+    for token in ref:
+        ref_counts[token] = ref_counts.get(token, 0) + 1
+    overlap = 0
+    for token in cand:
+        if ref_counts.get(token, 0) > 0:
+            ref_counts[token] -= 1
+            overlap += 1
+    if overlap == 0:
+        return 0.0
+    precision, recall = overlap / len(cand), overlap / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_l(candidate: str, reference: str) -> float:
+    """
+    ROUGE-L F1 (sottosequenza comune più lunga).
+    """
+    cand, ref = _tokens(candidate), _tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    previous = [0] * (len(ref) + 1)
+    for token in cand:
+        current = [0]
+        for j, ref_token in enumerate(ref):
+            current.append(previous[j] + 1 if token == ref_token else max(previous[j + 1], current[j]))
+        previous = current
+    lcs = previous[-1]
+    if lcs == 0:
+        return 0.0
+    precision, recall = lcs / len(cand), lcs / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_backend(backend: str, model_name: str, texts: List[str], max_length: int, min_length: int) -> dict:
+    """
+    Carica il backend e riassume tutti i testi, misurando i tempi.
+    """
+    started = time.perf_counter()
+    summarizer = Summarizer(model_name, backend=backend)
+    load_seconds = time.perf_counter() - started
+
+    # Primo passaggio di riscaldamento, non misurato
+    summarizer.summarize(texts[0], max_length=max_length, min_length=min_length)
+
+    summaries, latencies = [], []
+    for text in texts:
+        started = time.perf_counter()
+        summaries.append(summarizer.summarize(text, max_length=max_length, min_length=min_length))
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "mean_latency_seconds": round(statistics.mean(latencies), 4),
+        "max_latency_seconds": round(max(latencies), 4),
+        "summaries": summaries
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronto tra i backend del Summarizer")
+    parser.add_argument("--backends", nargs="+", default=list(Summarizer.BACKENDS))
+    parser.add_argument("--model", default="ARTeLab/it5-summarization-mlsum")
+    parser.add_argument("--max-length", type=int, default=150)
+    parser.add_argument("--min-length", type=int, default=50)
+    parser.add_argument("--output", help="File JSON in cui salvare i risultati")
+    args = parser.parse_args()
+
+    texts = [
+        clean_text(json.loads(path.read_text(encoding="utf-8"))["text"])
+        for path in sorted(EXAMPLES_DIR.glob("*.json"))
+    ]
+
+    results = []
+    for backend in args.backends:
+        try:
+            results.append(run_backend(backend, args.model, texts, args.max_length, args.min_length))
+        except ImportError as e:
+            print(f"Backend {backend} non disponibile: {e}")
+
+    if not results:
+        return
+
+    reference = next((r for r in results if r["backend"] == "torch"), results[0])
+    baseline_latency = reference["mean_latency_seconds"]
+
+    print(f"{'backend':<12} {'load (s)':>9} {'latenza (s)':>12} {'speedup':>8} {'ROUGE-1':>8} {'ROUGE-L':>8}")
+    for result in results:
+        pairs = list(zip(result["summaries"], reference["summaries"]))
+        result["rouge_1"] = round(statistics.mean(rouge_1(c, r) for c, r in pairs), 4)
+        result["rouge_l"] = round(statistics.mean(rouge_l(c, r) for c, r in pairs), 4)
+        result["speedup"] = round(baseline_latency / result["mean_latency_seconds"], 2)
+        print(
+            f"{result['backend']:<12} {result['load_seconds']:>9.2f} {result['mean_latency_seconds']:>12.3f} "
+            f"{result['speedup']:>7.2f}x {result['rouge_1']:>8.3f} {result['rouge_l']:>8.3f}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Fixture comuni: il servizio con il modello minuscolo casuale dei benchmark
+("tiny"), così i test girano offline e in pochi secondi.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def service(tmp_path_factory):
+    """
+    Modulo main con database temporanei e modello "tiny" precaricato.
+    """
+    data = tmp_path_factory.mktemp("data")
+    os.environ["NLP_JOBS_DB_PATH"] = str(data / "jobs.db")
+    os.environ["NLP_DOCUMENTS_DB_PATH"] = str(data / "documents.db")
+    os.environ["NLP_CACHE_DB_PATH"] = ""
+
+    import bench_pipeline
+    import main
+
+    main.preloaded = bench_pipeline.load_summarizer("tiny")
+    main.config.WARMUP_BATCH_SIZES = []
+    return main
+
+
+@pytest.fixture
+def settings():
+    """
+    Valori di config da sovrascrivere per il test (ridefinibile nei moduli di test).
+    """
+    return {}
+
+
+def _configure(service, settings, monkeypatch):
+    import asyncio
+    from cache import SummaryCache
+
+    for name, value in settings.items():
+        monkeypatch.setattr(service.config, name, value)
+    monkeypatch.setattr(service, "summary_cache", SummaryCache())
+    # Ogni avvio ricrea lo scheduler: si attende il nuovo, non lo stato del precedente
+    monkeypatch.setitem(service.model_state, "status", "loading")
+    # Ogni client ha il proprio event loop: l'evento dei job non può essere condiviso
+    monkeypatch.setattr(service, "job_available", asyncio.Event())
+
+
+def _wait_ready(client):
+    for _ in range(300):
+        if client.get("/ready").status_code == 200:
+            return
+        time.sleep(0.1)
+
+
+@pytest.fixture
+def client(service, settings, monkeypatch):
+    """
+    Client del servizio pronto, con cache vuota e scheduler creato con `settings`.
+    """
+    from fastapi.testclient import TestClient
+
+    _configure(service, settings, monkeypatch)
+    with TestClient(service.app) as client:
+        _wait_ready(client)
+        yield client
+
+
+@pytest.fixture
+def server(service, settings, monkeypatch):
+    """
+    Client httpx verso il servizio avviato con uvicorn su una porta locale.
+    A differenza di TestClient, che legge l'intera risposta, permette di
+    chiudere la connessione a metà di uno stream.
+    """
+    import httpx
+    import uvicorn
+
+    _configure(service, settings, monkeypatch)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    host, port = sock.getsockname()
+    server = uvicorn.Server(uvicorn.Config(service.app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+
+    try:
+        with httpx.Client(base_url=f"http://{host}:{port}", timeout=60) as client:
+            while not server.started:
+                time.sleep(0.05)
+            _wait_ready(client)
+            yield client
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
@@ -0,0 +1,43 @@
+"""
+Test di /summarize/batch.
+"""
+import pytest
+
+
+@pytest.fixture
+def settings():
+    return {"SCHEDULER_MAX_QUEUE_SIZE": 8}
+
+
+def test_batch_larger_than_queue_is_accepted(client, service):
+    # Ogni documento produce almeno un chunk: la richiesta supera da sola la coda
+    documents = [
+        {"id": str(i), "text": f"Documento numero {i}. Il governo ha approvato la legge di bilancio. " * 3}
+        for i in range(3 * service.config.SCHEDULER_MAX_QUEUE_SIZE)
+    ]
+
+    response = client.post("/summarize/batch", json={
+        "documents": documents, "max_length": 8, "min_length": 2, "profile": "fast", "dedup": False
+    })
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["id"] for result in results] == [document["id"] for document in documents]
+    assert all(result["summary"] for result in results)
+
+
+def test_batch_rejected_when_queue_is_full(client, service):
+    # La back-pressure resta valida per la richiesta nel suo insieme
+    service.scheduler.max_queue_size = 1
+    blocker = service.scheduler.submit(["occupa la coda"] * 4, max_length=8, min_length=2)
+
+    try:
+        response = client.post("/summarize/batch", json={
+            "documents": [{"text": "Il governo ha approvato la legge di bilancio."}],
+            "max_length": 8, "min_length": 2, "profile": "fast"
+        })
+    finally:
+        for future in blocker:
+            future.cancel()
+
+    assert response.status_code == 503
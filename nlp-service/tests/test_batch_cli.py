@@ -0,0 +1,21 @@
+"""
+Test del checkpoint di batch.py (riassunto offline dei corpora).
+"""
+import json
+
+from batch import load_checkpoint
+
+
+def test_checkpoint_retries_failed_documents(tmp_path):
+    output = tmp_path / "riassunti.jsonl"
+    records = [
+        {"id": "a", "summary": "riassunto"},
+        {"id": "b", "error": "File PDF non leggibile"},
+        {"id": "c", "error": "timeout"},
+        {"id": "c", "summary": "riassunto alla ripresa"},
+    ]
+    output.write_text("".join(json.dumps(record) + "\n" for record in records) + '{"id": "d", "su')
+
+    assert load_checkpoint(str(output)) == {"a", "c"}
+    # L'ultima riga incompleta viene rimossa
+    assert output.read_text().endswith('"riassunto alla ripresa"}\n')
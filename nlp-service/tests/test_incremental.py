@@ -0,0 +1,40 @@
+"""
+Test del riassunto incrementale (document_id).
+"""
+import summarizer
+
+
+TEXT = " ".join(
+    f"Paragrafo {i}: il consiglio comunale di Ferrara ha discusso il bilancio dell'UE e le opere pubbliche."
+    for i in range(40)
+)
+PARAMS = {"max_length": 8, "min_length": 2, "document_id": "delibera-1"}
+
+
+def test_versions_survive_auto_profile_changes(client, service, monkeypatch):
+    first = client.post("/summarize", json={"text": TEXT, "profile": "auto", **PARAMS}).json()
+
+    # Sotto carico "auto" si risolve in un altro profilo: la versione salvata resta valida
+    monkeypatch.setattr(service.config, "AUTO_PROFILE_FAST_DEPTH", 0)
+    second = client.post("/summarize", json={"text": TEXT, "profile": "auto", **PARAMS}).json()
+
+    assert first["profile"] != second["profile"]
+    assert second["incremental"]["chunks_total"] > 1
+    assert second["incremental"]["chunks_reused"] == second["incremental"]["chunks_total"]
+    assert second["summary"] == first["summary"]
+
+
+def test_reused_summaries_are_postprocessed_once(client, monkeypatch):
+    fix = summarizer.Summarizer._fix_capitalization
+    monkeypatch.setattr(
+        summarizer.Summarizer, "_fix_capitalization",
+        lambda self, summary, text, acronyms=None: fix(self, summary, text, acronyms) + "|"
+    )
+
+    first = client.post("/summarize", json={"text": TEXT, "profile": "fast", **PARAMS}).json()
+    second = client.post("/summarize", json={"text": TEXT + " Fine.", "profile": "fast", **PARAMS}).json()
+
+    assert second["incremental"]["chunks_reused"] > 0
+    for response in (first, second):
+        assert "||" not in response["summary"]
+        assert response["summary"].count("|") == response["incremental"]["chunks_total"]
@@ -0,0 +1,40 @@
+"""
+Test dei job asincroni (/jobs).
+"""
+import time
+
+
+TEXT = " ".join(f"Frase {i}: la regione ha stanziato nuovi fondi per la sanità pubblica." for i in range(60))
+
+
+def _wait_done(client, job_id: str, timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.1)
+    raise TimeoutError(job_id)
+
+
+def test_job_records_resolved_profile(client):
+    job_id = client.post("/jobs", json={"text": TEXT, "max_length": 8, "min_length": 2}).json()["job_id"]
+
+    status = _wait_done(client, job_id)
+
+    assert status["status"] == "done"
+    assert status["profile"] == client.get(f"/jobs/{job_id}/result").json()["profile"] == "quality"
+
+
+def test_resumed_job_keeps_its_profile(client, service):
+    # Job interrotto dopo il primo avvio, quando "auto" era stato risolto in "fast"
+    payload = {"text": TEXT, "max_length": 8, "min_length": 2, "profile": "auto", "mode": "concat"}
+    job_id = service.job_store.create(payload)
+    assert service.job_store.pin_profile(job_id, "fast") == "fast"
+
+    status = _wait_done(client, job_id)
+
+    # Ora la coda è vuota e "auto" varrebbe "quality": la ripresa usa il profilo registrato
+    assert status["status"] == "done"
+    assert status["profile"] == "fast"
+    assert client.get(f"/jobs/{job_id}/result").json()["profile"] == "fast"
@@ -0,0 +1,24 @@
+"""
+Test della partizione dei core tra worker e repliche.
+"""
+import pytest
+
+from replicas import check_partitions, partition_cores
+
+
+CORES = list(range(8))
+
+
+def test_partitions_are_disjoint():
+    partitions = [partition_cores(index, 4, cores=CORES) for index in range(4)]
+
+    assert partitions == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert check_partitions(2, 3, CORES) == 3
+
+
+def test_oversubscribed_layout_is_rejected():
+    # 4 worker × 4 core su 8 core: due worker per core
+    with pytest.raises(ValueError):
+        partition_cores(0, 4, 4, CORES)
+    with pytest.raises(ValueError):
+        check_partitions(16, 0, CORES)
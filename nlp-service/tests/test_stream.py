@@ -0,0 +1,66 @@
+"""
+Test di /summarize/stream.
+"""
+import json
+import time
+
+import pytest
+
+from cache import SummaryCache
+import summarizer
+
+
+TEXT = "Il tribunale di Roma ha respinto i ricorsi presentati contro la nuova legge sul clima."
+PARAMS = {"max_length": 200, "min_length": 200}
+
+
+@pytest.fixture
+def eager_streamer(monkeypatch):
+    """
+    Un frammento per token, rallentato: il modello "tiny" non genera spazi, quindi
+    TextStreamer tratterrebbe tutto il testo fino alla fine della generazione,
+    che sarebbe comunque conclusa prima della disconnessione del client.
+    """
+    def put(self, value):
+        if self.next_tokens_are_prompt:
+            self.next_tokens_are_prompt = False
+            return
+        time.sleep(0.01)
+        self.on_finalized_text(self.tokenizer.decode(value.flatten(), skip_special_tokens=True))
+
+    monkeypatch.setattr(summarizer._CallbackStreamer, "put", put)
+
+
+def _wait_idle(service, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while service.scheduler.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # Il chunk interrotto esce da generate() al passo successivo
+    time.sleep(0.5)
+
+
+def test_token_stream(client):
+    response = client.post("/summarize/stream", json={"text": TEXT, "tokens": True, **PARAMS})
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0]["type"] == "token"
+    assert [event["type"] for event in events[-2:]] == ["chunk", "final"]
+    assert events[-1]["summary"] == events[-2]["summary"]
+
+
+def test_disconnect_does_not_cache_truncated_summary(server, service, monkeypatch, eager_streamer):
+    with server.stream("POST", "/summarize/stream", json={"text": TEXT, "tokens": True, **PARAMS}) as stream:
+        for line in stream.iter_lines():
+            assert json.loads(line)["type"] == "token"
+            break
+    # Uscendo dal blocco la connessione viene chiusa a metà della generazione
+    _wait_idle(service)
+
+    # Il riassunto generato dopo la disconnessione deve essere quello completo
+    after = server.post("/summarize", json={"text": TEXT, "profile": "fast", **PARAMS})
+    monkeypatch.setattr(service, "summary_cache", SummaryCache())
+    fresh = server.post("/summarize", json={"text": TEXT, "profile": "fast", **PARAMS})
+
+    assert after.status_code == fresh.status_code == 200
+    assert after.json()["summary"] == fresh.json()["summary"]